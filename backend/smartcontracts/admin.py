@@ -0,0 +1,33 @@
+from django.contrib import admin
+from .models import AnchorCheckpoint, AnchorRange, ChainJob, IndexerCheckpoint, OnchainSurvey
+
+
+@admin.register(ChainJob)
+class ChainJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "survey", "op", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status", "op")
+    search_fields = ("last_error", "tx_hash")
+
+
+@admin.register(IndexerCheckpoint)
+class IndexerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("contract_address", "last_block", "updated_at")
+
+
+@admin.register(OnchainSurvey)
+class OnchainSurveyAdmin(admin.ModelAdmin):
+    list_display = ("survey_id", "status", "submitter", "chunk_count", "enc_chunk_count", "file_hash_count", "updated_block")
+    list_filter = ("status",)
+
+
+class AnchorRangeInline(admin.TabularInline):
+    model = AnchorRange
+    extra = 0
+    readonly_fields = ("start_index", "count", "tx_hash", "block_number", "confirmed", "created_at")
+
+
+@admin.register(AnchorCheckpoint)
+class AnchorCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("survey", "encrypted", "status", "confirmed_chunks", "sent_chunks", "total_chunks", "chunk_size", "updated_at")
+    list_filter = ("status", "encrypted")
+    inlines = [AnchorRangeInline]
@@ -0,0 +1,313 @@
+"""On-chain file storage (raw or encrypted chunks) with persisted progress.
+
+`anchor_file()` streams a survey file into ``addFileChunks`` transactions (or, in
+encrypted mode, AES-GCM payloads into ``addEncryptedChunks`` SSTORE2 writes) through
+`eth.send_window` and records every transaction as an `AnchorRange` of its
+`AnchorCheckpoint` as soon as it is broadcast, and again once it is mined. A run
+that fails partway can be resumed: the resume picks up at the live on-chain chunk
+count, after checking that the chunks already stored match the local file
+(keccak from the indexed ``FileChunk``/``EncryptedChunkStored`` events, or from
+the receipts of the recorded transactions), so chunks already paid for are never
+sent again. Encryption and compression are deterministic per chunk (see
+`surveys.encryption`, `surveys.compression`), so re-sealed chunks hash the same as
+the stored payloads. Raw chunks can be stored as compressed frames; compressed
+payloads are packed into transactions by gas (`packing.group_payloads`), so a
+transaction may carry more chunks than planned.
+"""
+import os
+from collections import deque
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from web3 import Web3
+
+from .models import AnchorCheckpoint, AnchorRange, OnchainChunk
+
+try:
+    # A checkpoint left 'running' without progress for this long is assumed orphaned by a dead run
+    LEASE_SECONDS = int(os.getenv("ANCHOR_LEASE_SECONDS", "600") or 600)
+except Exception:
+    LEASE_SECONDS = 600
+
+
+class AnchorError(RuntimeError):
+    """Anchoring could not start or stopped; `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, detail: str, status_code: int = 502, transactions: Optional[list] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.transactions = transactions or []
+
+
+def _keccak_hex(data: bytes) -> str:
+    return Web3.keccak(data).hex().removeprefix("0x")
+
+
+def _held(cp: AnchorCheckpoint) -> bool:
+    # Every broadcast and receipt saves the checkpoint, so updated_at is the run's heartbeat
+    return cp.status == "running" and cp.updated_at >= timezone.now() - timedelta(seconds=LEASE_SECONDS)
+
+
+def _claim(cp: AnchorCheckpoint) -> None:
+    """Take `cp` over for a resume; only one run per checkpoint at a time."""
+    now = timezone.now()
+    taken = (
+        AnchorCheckpoint.objects.filter(pk=cp.pk)
+        .exclude(status="complete")
+        .filter(~Q(status="running") | Q(updated_at__lt=now - timedelta(seconds=LEASE_SECONDS)))
+        .update(status="running", last_error="", updated_at=now)
+    )
+    cp.refresh_from_db()
+    if not taken:
+        if cp.status == "complete":
+            raise AnchorError("Full file already anchored on-chain", 400)
+        raise AnchorError("Anchoring of this file is already running", 409)
+
+
+def _settle(cp: AnchorCheckpoint) -> None:
+    """Resolve ranges whose receipt was never seen before deciding where to resume."""
+    from . import eth
+
+    open_ranges = list(cp.ranges.filter(confirmed=False))
+    if not open_ranges:
+        return
+    receipts = eth.get_tx_receipts(r.tx_hash for r in open_ranges)
+    waiting = [r for r in open_ranges if receipts.get(r.tx_hash) is None]
+    known = eth.get_tx_known(r.tx_hash for r in waiting)
+    if any(known.values()):
+        # Resending now could store the same chunks twice once the old transaction mines
+        raise AnchorError("Earlier anchoring transactions are still pending; retry the resume later", 409)
+    for r in open_ranges:
+        rc = receipts.get(r.tx_hash)
+        if rc is not None and rc.get("status") == 1:
+            r.confirmed, r.block_number = True, rc.get("blockNumber")
+            r.save(update_fields=["confirmed", "block_number"])
+        else:
+            # Reverted or dropped: its chunks were not stored
+            r.delete()
+
+
+def _onchain_hashes(cp: AnchorCheckpoint, upto: int) -> Dict[int, str]:
+    """keccak of on-chain chunks [0, upto) of the survey, from the index, then from our receipts."""
+    from . import eth
+
+    sid = cp.survey_id
+    event = "EncryptedChunkStored" if cp.encrypted else "FileChunk"
+    hashes = {
+        c.index: c.chunk_hash
+        for c in OnchainChunk.objects.filter(survey_id=sid, encrypted=cp.encrypted, index__lt=upto).only("index", "chunk_hash")
+    }
+    if len(hashes) < upto:
+        ranges = [r for r in cp.ranges.filter(confirmed=True) if any(i not in hashes for i in range(r.start_index, min(upto, r.start_index + r.count)))]
+        if ranges:
+            for ev in eth.get_receipt_events(r.tx_hash for r in ranges):
+                a = ev["args"]
+                if ev["event"] == event and int(a["surveyId"]) == sid and int(a["index"]) < upto:
+                    hashes.setdefault(int(a["index"]), bytes(a["chunkHash"]).hex())
+    return hashes
+
+
+def _read_chunks(fh, chunk_size: int, start: int, stop: Optional[int] = None) -> Iterator[tuple[int, bytes]]:
+    """(index, bytes) of consecutive chunks read from `fh`'s current position."""
+    index = start
+    while stop is None or index < stop:
+        b = fh.read(chunk_size)
+        if not b:
+            return
+        yield index, b
+        index += 1
+
+
+def _verify_prefix(cp: AnchorCheckpoint, fh, upto: int, seal: Callable) -> None:
+    """Check on-chain chunks [0, upto) against the local file; leaves `fh` at chunk `upto`."""
+    hashes = _onchain_hashes(cp, upto)
+    missing = [i for i in range(upto) if i not in hashes]
+    if missing:
+        raise AnchorError(f"Cannot verify {len(missing)} on-chain chunk(s) (first: {missing[0]}); run the chain indexer and retry", 409)
+    for i, payload in enumerate(seal(_read_chunks(fh, cp.chunk_size, 0, upto))):
+        if _keccak_hex(payload) != hashes[i].lower().removeprefix("0x"):
+            raise AnchorError(f"On-chain chunk {i} does not match the local file; cannot resume", 409)
+
+
+def anchor_file(survey, fh, size: int, resume: bool = False, encrypted: bool = False, codec: str = "") -> Dict[str, Any]:
+    """Store `fh` (the survey file, opened at offset 0) as raw, compressed or encrypted chunks on-chain.
+
+    `codec` (``zlib``/``lzma``, raw mode only) stores compressed frames. Fresh runs plan
+    the packing with `packing.plan_chunks`; resumes reuse the checkpoint's chunk size
+    and codec. Raises `AnchorError` when nothing can be sent or a send fails.
+    """
+    from surveys import compression
+    from transactions.models import Transaction
+
+    from . import eth
+    from .packing import group_payloads, plan_chunks
+
+    fn_name = "addEncryptedChunks" if encrypted else "addFileChunks"
+    overhead = 0
+    key = b""
+    if codec and (encrypted or codec not in compression.CODECS):
+        raise AnchorError(f"Unsupported compression {codec!r} for this mode", 400)
+    if encrypted:
+        from surveys import encryption
+
+        try:
+            key = encryption.ensure_key(survey)
+        except encryption.EncryptionError as e:
+            raise AnchorError(str(e), 503)
+        overhead = encryption.OVERHEAD
+
+    def seal(items):
+        # Stored payload of each (index, chunk): the chunk itself, its compressed frame or
+        # its AES-GCM seal (both on the process pool)
+        if encrypted:
+            return encryption.encrypt_chunks(key, survey.id, items)
+        if codec:
+            return compression.encode_chunks(codec, items)
+        return (b for _, b in items)
+
+    cp = AnchorCheckpoint.objects.filter(survey=survey, encrypted=encrypted).first()
+    plan = None
+    if resume:
+        if cp is None:
+            raise AnchorError("Nothing to resume: no anchoring checkpoint for this survey", 409)
+        _claim(cp)
+        codec = cp.codec
+        overhead = overhead or (compression.HEADER_BYTES if codec else 0)
+        try:
+            if cp.file_checksum and survey.checksum_sha256 and cp.file_checksum != survey.checksum_sha256:
+                raise AnchorError("The survey file changed since anchoring started; cannot resume", 409)
+            _settle(cp)
+            start = int(eth.get_encrypted_chunk_count(survey.id) if encrypted else eth.get_file_chunk_count(survey.id))
+            if start > cp.total_chunks:
+                raise AnchorError(f"{start} chunks on-chain but only {cp.total_chunks} planned; cannot resume", 409)
+            _verify_prefix(cp, fh, start, seal)
+        except Exception as e:
+            err = e if isinstance(e, AnchorError) else AnchorError(f"Failed to read anchoring progress: {e}", 502)
+            # Give the claim back so the next resume can start
+            cp.status, cp.last_error = "failed", str(err)
+            cp.save(update_fields=["status", "last_error", "updated_at"])
+            raise err
+    else:
+        if codec:
+            # Planned as if every chunk fell back to a raw frame; compression only lowers the gas
+            overhead = compression.HEADER_BYTES
+        plan = plan_chunks(size, fn_name=fn_name, overhead=overhead)
+        try:
+            with db_transaction.atomic():
+                old = AnchorCheckpoint.objects.select_for_update().filter(survey=survey, encrypted=encrypted).first()
+                if old is not None and _held(old):
+                    raise AnchorError("Anchoring of this file is already running", 409)
+                AnchorCheckpoint.objects.filter(survey=survey, encrypted=encrypted).delete()
+                cp = AnchorCheckpoint.objects.create(
+                    survey=survey,
+                    encrypted=encrypted,
+                    codec=codec,
+                    file_checksum=survey.checksum_sha256 or "",
+                    file_size=size,
+                    chunk_size=plan.chunk_size,
+                    chunks_per_tx=plan.chunks_per_tx,
+                    total_chunks=plan.chunk_count,
+                )
+        except IntegrityError:
+            # A concurrent fresh run created its checkpoint first
+            raise AnchorError("Anchoring of this file is already running", 409)
+        start = 0
+        if encrypted:
+            survey.enc_chunk_size = plan.chunk_size
+            survey.save(update_fields=["enc_chunk_size", "updated_at"])
+        elif survey.chunk_codec != codec:
+            survey.chunk_codec = codec
+            survey.save(update_fields=["chunk_codec", "updated_at"])
+    chunk_size, per_tx, total = cp.chunk_size, cp.chunks_per_tx, cp.total_chunks
+    cp.status, cp.last_error = "running", ""
+    cp.sent_chunks = cp.confirmed_chunks = start
+    cp.save(update_fields=["status", "last_error", "sent_chunks", "confirmed_chunks", "updated_at"])
+
+    stats = {"input_bytes": 0, "stored_bytes": 0, "raw_chunks": 0}
+    # Chunks per call, in call order (appended by the reader thread, taken by `_sent`)
+    counts: "deque[int]" = deque()
+
+    def _chunks():
+        for i, b in _read_chunks(fh, chunk_size, start):
+            stats["input_bytes"] += len(b)
+            yield i, b
+
+    def _payloads():
+        for payload in seal(_chunks()):
+            stats["stored_bytes"] += len(payload)
+            if codec and compression.frame_codec(payload) == compression.CODEC_RAW:
+                stats["raw_chunks"] += 1
+            yield payload
+
+    def _calls():
+        # Lazily read (and seal) chunks call by call so only the in-flight window is held in memory
+        for batch in group_payloads(_payloads(), chunk_size, per_tx, fn_name, overhead):
+            counts.append(len(batch))
+            yield (fn_name, (int(survey.id), batch))
+
+    ranges: Dict[str, AnchorRange] = {}
+    tx_hashes: list[str] = []
+    next_index = start
+
+    def _sent(position: int, txh: str) -> None:
+        nonlocal next_index
+        r = AnchorRange.objects.create(checkpoint=cp, start_index=next_index, count=counts.popleft(), tx_hash=txh)
+        ranges[txh] = r
+        next_index = cp.sent_chunks = r.start_index + r.count
+        cp.save(update_fields=["sent_chunks", "updated_at"])
+
+    def _record(txh: str, blk: Optional[int], tx_status: Optional[int]) -> None:
+        tx_hashes.append(txh)
+        Transaction.objects.create(survey=survey, public_anchor_tx_hash=txh, public_block_number=blk, private_tx_hash=txh)
+        r = ranges.pop(txh, None)
+        if tx_status is not None and tx_status != 1:
+            # Reverted: its chunks were not stored (as in `_settle`); stop sending
+            start_index = r.start_index if r is not None else cp.confirmed_chunks
+            if r is not None:
+                r.delete()
+            raise RuntimeError(f"transaction {txh} reverted (chunks from {start_index}); resume to continue")
+        if r is not None and blk is not None:
+            r.confirmed, r.block_number = True, blk
+            r.save(update_fields=["confirmed", "block_number"])
+            if r.start_index != cp.confirmed_chunks:
+                # An earlier receipt is missing: the confirmed prefix stops there
+                return
+            cp.confirmed_chunks = r.start_index + r.count
+            cp.save(update_fields=["confirmed_chunks", "updated_at"])
+
+    # Pipelined: reading, signing/sending and receipt collection overlap, with up to
+    # ETH_TX_WINDOW chunk transactions in flight at once
+    failure: Optional[Exception] = None
+    try:
+        eth.send_window(_calls(), on_result=_record, on_sent=_sent)
+    except Exception as e:
+        failure = e
+    if failure is None and cp.confirmed_chunks < total:
+        failure = RuntimeError("some receipts did not arrive in time; resume to continue")
+    cp.status = "failed" if failure is not None else "complete"
+    cp.last_error = "" if failure is None else str(failure)
+    cp.save(update_fields=["status", "last_error", "updated_at"])
+    if failure is not None:
+        raise AnchorError(f"On-chain storage failed: {failure}", 502, tx_hashes)
+    result = {
+        "anchored_chunks": total - start,
+        "transactions": tx_hashes,
+        "mode": "encrypted" if encrypted else ("compressed" if codec else "raw"),
+        "chunk_size": chunk_size,
+        "total_chunks": total,
+        "resumed_from": start if resume else None,
+        "plan": plan.as_dict() if plan is not None else None,
+    }
+    if codec:
+        # Counts cover the chunks sent by this run
+        result["compression"] = {
+            "codec": codec,
+            "input_bytes": stats["input_bytes"],
+            "stored_bytes": stats["stored_bytes"],
+            "bytes_saved": stats["input_bytes"] - stats["stored_bytes"],
+            "raw_chunks": stats["raw_chunks"],
+        }
+    return result
@@ -0,0 +1,489 @@
+"""Asyncio client for SurveyRegistry reads.
+
+One `AsyncWeb3` per process talks to ``ETH_RPC_URL`` over a shared aiohttp
+session whose connector keeps at most ``ETH_RPC_POOL_SIZE`` keep-alive
+connections open. Coroutines run on a private event loop in a daemon thread, so
+sync Django code calls `run()` (or the wrappers in `eth.py`) and fan-out
+helpers such as `read_file_chunks` issue many RPCs at once over the same pool.
+Every call is bounded by ``ETH_RPC_TIMEOUT_SECONDS``. Bulk chunk and receipt
+reads are packed into JSON-RPC batch payloads of ``ETH_RPC_BATCH_SIZE`` calls.
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Iterable, Optional, Sequence, Tuple, TypeVar
+
+import aiohttp
+from hexbytes import HexBytes
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+
+T = TypeVar("T")
+
+
+def pool_size() -> int:
+    try:
+        return max(1, int(os.getenv("ETH_RPC_POOL_SIZE", "16") or 16))
+    except Exception:
+        return 16
+
+
+def batch_size() -> int:
+    try:
+        return max(1, int(os.getenv("ETH_RPC_BATCH_SIZE", "100") or 100))
+    except Exception:
+        return 100
+
+
+def call_timeout() -> float:
+    try:
+        return max(0.1, float(os.getenv("ETH_RPC_TIMEOUT_SECONDS", "20") or 20))
+    except Exception:
+        return 20.0
+
+
+class _Client:
+    def __init__(self, rpc: str) -> None:
+        self.rpc = rpc
+        self.w3: Optional[AsyncWeb3] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.contract: Optional[Any] = None
+        self.limit = asyncio.Semaphore(pool_size())
+
+    async def open(self) -> None:
+        timeout = aiohttp.ClientTimeout(total=call_timeout())
+        provider = AsyncHTTPProvider(self.rpc, request_kwargs={"timeout": timeout})
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size(), keepalive_timeout=60),
+            timeout=timeout,
+        )
+        await provider.cache_async_session(self.session)
+        self.w3 = AsyncWeb3(provider)
+        # The validation middleware asks the node for eth_chainId before every
+        # eth_call; this client only reads, so drop it and halve the round trips
+        try:
+            self.w3.middleware_onion.remove("validation")
+        except Exception:
+            pass
+        from .eth import ABI_PATH, contract_address
+
+        address = contract_address()
+        if address and ABI_PATH.exists():
+            with open(ABI_PATH, "r") as f:
+                abi = json.load(f)
+            self.contract = self.w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi)
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_client: Optional[_Client] = None
+_client_lock: Optional[asyncio.Lock] = None
+_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid, _client, _client_lock
+    with _lock:
+        # A forked worker inherits the object but not the thread running it
+        if _loop is None or _loop_pid != os.getpid() or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="eth-async", daemon=True).start()
+            _loop, _loop_pid, _client, _client_lock = loop, os.getpid(), None, None
+        return _loop
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the client loop from sync code and return its result."""
+    loop = _get_loop()
+    fut = asyncio.run_coroutine_threadsafe(coro, loop)  # type: ignore[arg-type]
+    try:
+        return fut.result(timeout)
+    except TimeoutError:
+        fut.cancel()
+        raise
+
+
+def submit(coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+    """Schedule a coroutine on the client loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())  # type: ignore[arg-type]
+
+
+async def get_client() -> Optional[_Client]:
+    """The process-wide client, or None when ``ETH_RPC_URL`` is not set. Must run on the client loop."""
+    global _client, _client_lock
+    if _client is not None:
+        return _client
+    if _client_lock is None:
+        _client_lock = asyncio.Lock()
+    async with _client_lock:
+        if _client is None:
+            rpc = os.getenv("ETH_RPC_URL", "").strip()
+            if not rpc:
+                return None
+            client = _Client(rpc)
+            await client.open()
+            _client = client
+    return _client
+
+
+def reset() -> None:
+    """Drop the client (e.g. after the RPC URL or contract address changed)."""
+    global _client
+    client, _client = _client, None
+    if client is not None and _loop is not None and not _loop.is_closed():
+        try:
+            run(client.close(), timeout=5)
+        except Exception:
+            pass
+
+
+async def _contract() -> Any:
+    client = await get_client()
+    if not client or client.contract is None:
+        raise RuntimeError("Ethereum not configured (missing contract)")
+    return client.contract
+
+
+async def _call(fn: Any) -> Any:
+    client = await get_client()
+    assert client is not None
+    async with client.limit:
+        return await asyncio.wait_for(fn.call(), call_timeout())
+
+
+def as_bytes(data: Any) -> bytes:
+    # Web3 typically returns bytes for bytes memory; ensure it's bytes
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    try:
+        return Web3.to_bytes(data)
+    except Exception:
+        try:
+            return bytes.fromhex(str(data).removeprefix("0x"))
+        except Exception:
+            return data
+
+
+async def file_chunk_count(survey_id: int) -> int:
+    c = await _contract()
+    return int(await _call(c.functions.getFileChunkCount(int(survey_id))))
+
+
+async def file_chunk(survey_id: int, index: int) -> bytes:
+    c = await _contract()
+    return as_bytes(await _call(c.functions.getFileChunk(int(survey_id), int(index))))
+
+
+async def _chunk_batch(fn_name: str, survey_id: int, indices: Iterable[int]) -> list[bytes]:
+    c = await _contract()
+    client = await get_client()
+    assert client is not None and client.w3 is not None
+    idx = [int(i) for i in indices]
+    calls = [
+        ("eth_call", [{"to": c.address, "data": c.encodeABI(fn_name=fn_name, args=[int(survey_id), i])}, "latest"])
+        for i in idx
+    ]
+    out: list[bytes] = []
+    for i, r in zip(idx, await rpc_batch(calls)):
+        if isinstance(r, Exception):
+            raise RuntimeError(f"chunk {i}: {r}")
+        out.append(bytes(client.w3.codec.decode(["bytes"], HexBytes(r))[0]))
+    return out
+
+
+async def file_chunks(survey_id: int, indices: Iterable[int]) -> list[bytes]:
+    """Read several raw chunks with batched eth_calls; results follow `indices` order."""
+    return await _chunk_batch("getFileChunk", survey_id, indices)
+
+
+async def encrypted_chunks(survey_id: int, indices: Iterable[int]) -> list[bytes]:
+    """Read several SSTORE2 encrypted payloads with batched eth_calls; results follow `indices` order."""
+    return await _chunk_batch("readEncryptedChunk", survey_id, indices)
+
+
+async def encrypted_chunk_count(survey_id: int) -> int:
+    c = await _contract()
+    return int(await _call(c.functions.getEncryptedChunkCount(int(survey_id))))
+
+
+async def encrypted_chunk(survey_id: int, index: int) -> bytes:
+    c = await _contract()
+    return as_bytes(await _call(c.functions.readEncryptedChunk(int(survey_id), int(index))))
+
+
+async def onchain_record(survey_id: int) -> Dict[str, Any]:
+    c = await _contract()
+    r = await _call(c.functions.surveys(int(survey_id)))
+    # r is a tuple per struct order
+    if isinstance(r, (list, tuple)) and len(r) >= 5:
+        return {"projectId": r[0], "ipfsCid": r[1], "checksum": r[2], "status": r[3], "submitter": r[4]}
+    # Fallback: try attribute-style
+    return {k: getattr(r, k, None) for k in ("projectId", "ipfsCid", "checksum", "status", "submitter")}
+
+
+async def survey_flags(survey_ids: Iterable[int]) -> Dict[int, Tuple[bool, int]]:
+    """(has_record, chunk_count) per survey id.
+
+    Uses the aggregate ``getSurveyFlags`` view (one eth_call for the whole list);
+    contracts deployed before it existed are read with one batched request of
+    ``surveys(id)`` and ``getFileChunkCount(id)`` calls instead.
+    """
+    ids = list(dict.fromkeys(int(i) for i in survey_ids))
+    if not ids:
+        return {}
+    c = await _contract()
+    try:
+        has_record, counts = await _call(c.functions.getSurveyFlags(ids))
+        return {sid: (bool(h), int(n)) for sid, h, n in zip(ids, has_record, counts)}
+    except Exception:
+        pass
+    client = await get_client()
+    assert client is not None and client.w3 is not None
+    calls = []
+    for sid in ids:
+        calls.append(("eth_call", [{"to": c.address, "data": c.encodeABI(fn_name="surveys", args=[sid])}, "latest"]))
+        calls.append(("eth_call", [{"to": c.address, "data": c.encodeABI(fn_name="getFileChunkCount", args=[sid])}, "latest"]))
+    results = await rpc_batch(calls)
+    out: Dict[int, Tuple[bool, int]] = {}
+    for n, sid in enumerate(ids):
+        rec, cnt = results[2 * n], results[2 * n + 1]
+        if isinstance(rec, Exception) or isinstance(cnt, Exception):
+            continue
+        submitter = client.w3.codec.decode(["uint256", "string", "string", "uint8", "address"], HexBytes(rec))[4]
+        count = client.w3.codec.decode(["uint256"], HexBytes(cnt))[0]
+        out[sid] = (int(submitter, 16) != 0, int(count))
+    return out
+
+
+def _decode_logs(c: Any, logs: Iterable[Any]) -> list[Dict[str, Any]]:
+    from eth_utils import event_abi_to_log_topic
+
+    by_topic = {HexBytes(event_abi_to_log_topic(e)): e["name"] for e in c.abi if e.get("type") == "event"}
+    out: list[Dict[str, Any]] = []
+    for log in logs:
+        if str(log.get("address", "")).lower() != str(c.address).lower():
+            continue
+        name = by_topic.get(HexBytes(log["topics"][0])) if log["topics"] else None
+        if name is None:
+            continue
+        log = {**log, "topics": [HexBytes(t) for t in log["topics"]], "data": HexBytes(log["data"])}
+        for k in ("blockNumber", "logIndex", "transactionIndex"):
+            log[k] = _int(log.get(k))
+        ev = getattr(c.events, name)().process_log(log)
+        out.append(
+            {
+                "event": name,
+                "args": dict(ev["args"]),
+                "blockNumber": int(log["blockNumber"]),
+                "transactionHash": HexBytes(log["transactionHash"]).hex(),
+                "logIndex": int(log["logIndex"]),
+            }
+        )
+    out.sort(key=lambda e: (e["blockNumber"], e["logIndex"]))
+    return out
+
+
+async def contract_events(from_block: int, to_block: int) -> list[Dict[str, Any]]:
+    """Decoded SurveyRegistry events in [from_block, to_block], in chain order.
+
+    Each item has ``event``, ``args``, ``blockNumber``, ``transactionHash`` and ``logIndex``.
+    """
+    c = await _contract()
+    client = await get_client()
+    assert client is not None and client.w3 is not None
+    from eth_utils import event_abi_to_log_topic
+
+    topics = [HexBytes(event_abi_to_log_topic(e)) for e in c.abi if e.get("type") == "event"]
+    params = {"address": c.address, "fromBlock": int(from_block), "toBlock": int(to_block), "topics": [topics]}
+    async with client.limit:
+        logs = await asyncio.wait_for(client.w3.eth.get_logs(params), call_timeout())  # type: ignore[arg-type]
+    return _decode_logs(c, logs)
+
+
+async def receipt_events(tx_hashes: Iterable[str]) -> list[Dict[str, Any]]:
+    """Decoded SurveyRegistry events emitted by the given transactions (one batch of receipts)."""
+    c = await _contract()
+    receipts = await tx_receipts(tx_hashes)
+    return _decode_logs(c, (log for rc in receipts.values() if rc for log in rc.get("logs") or []))
+
+
+async def tx_receipt(tx_hash: str) -> Optional[Any]:
+    client = await get_client()
+    if not client or client.w3 is None:
+        return None
+    async with client.limit:
+        try:
+            return await asyncio.wait_for(client.w3.eth.get_transaction_receipt(tx_hash), call_timeout())  # type: ignore[arg-type]
+        except Exception:
+            return None
+
+
+async def block_number() -> int:
+    client = await get_client()
+    if not client or client.w3 is None:
+        raise RuntimeError("Ethereum not configured (missing RPC)")
+    async with client.limit:
+        return int(await asyncio.wait_for(client.w3.eth.block_number, call_timeout()))  # type: ignore[arg-type]
+
+
+# Block number -> timestamp; blocks don't change once mined, so entries never expire
+_block_ts: "OrderedDict[int, int]" = OrderedDict()
+BLOCK_TS_CACHE_SIZE = 4096
+
+
+def _remember_ts(block: int, ts: Optional[int]) -> None:
+    if ts is None:
+        return
+    _block_ts[block] = ts
+    _block_ts.move_to_end(block)
+    while len(_block_ts) > BLOCK_TS_CACHE_SIZE:
+        _block_ts.popitem(last=False)
+
+
+async def block_timestamp(block_number: int) -> Optional[int]:
+    if block_number in _block_ts:
+        return _block_ts[block_number]
+    client = await get_client()
+    if not client or client.w3 is None:
+        return None
+    async with client.limit:
+        blk = await asyncio.wait_for(client.w3.eth.get_block(block_number), call_timeout())
+    ts = getattr(blk, "timestamp", None)
+    _remember_ts(block_number, None if ts is None else int(ts))
+    return None if ts is None else int(ts)
+
+
+async def block_timestamps(block_numbers: Iterable[int]) -> Dict[int, Optional[int]]:
+    """Timestamps for several blocks; cached blocks cost nothing, the rest go out in one batch."""
+    blocks = sorted({int(b) for b in block_numbers})
+    missing = [b for b in blocks if b not in _block_ts]
+    if missing:
+        results = await rpc_batch([("eth_getBlockByNumber", [hex(b), False]) for b in missing])
+        for b, r in zip(missing, results):
+            _remember_ts(b, _int(r.get("timestamp")) if isinstance(r, dict) else None)
+    return {b: _block_ts.get(b) for b in blocks}
+
+
+def _int(v: Any) -> Optional[int]:
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return int(v, 16) if v.startswith("0x") else int(v)
+    return int(v)
+
+
+def _details(rc: Any, ts: Optional[int]) -> Dict[str, Any]:
+    get = rc.get if isinstance(rc, dict) else (lambda k: getattr(rc, k, None))
+    block_number = _int(get("blockNumber"))
+    gas_used = _int(get("gasUsed"))
+    eff_price = _int(get("effectiveGasPrice"))
+    fee_wei = None
+    if gas_used is not None and eff_price is not None:
+        fee_wei = gas_used * eff_price
+    return {
+        "blockNumber": block_number,
+        "status": _int(get("status")),
+        "gasUsed": gas_used,
+        "effectiveGasPrice": eff_price,
+        "feeWei": fee_wei,
+        "blockTimestamp": ts,
+    }
+
+
+async def tx_details(tx_hash: str) -> Optional[Dict[str, Any]]:
+    rc = await tx_receipt(tx_hash)
+    if rc is None:
+        return None
+    block_number = getattr(rc, "blockNumber", None)
+    ts = None
+    if block_number is not None:
+        try:
+            ts = await block_timestamp(block_number)
+        except Exception:
+            ts = None
+    return _details(rc, ts)
+
+
+async def tx_receipts(tx_hashes: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Raw receipts (JSON-RPC form, hex quantities) for several transactions, fetched in batches."""
+    hashes = list(dict.fromkeys(h for h in tx_hashes if h))
+    results = await rpc_batch([("eth_getTransactionReceipt", [h]) for h in hashes])
+    return {h: (None if isinstance(r, Exception) or not r else r) for h, r in zip(hashes, results)}
+
+
+async def tx_details_many(tx_hashes: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Receipt details for several transactions, keyed by hash: one batch of receipts, one of uncached blocks."""
+    receipts = await tx_receipts(tx_hashes)
+    stamps = await block_timestamps(_int(rc["blockNumber"]) for rc in receipts.values() if rc and rc.get("blockNumber"))  # type: ignore[misc]
+    return {
+        h: (None if rc is None else _details(rc, stamps.get(_int(rc.get("blockNumber")))))
+        for h, rc in receipts.items()
+    }
+
+
+class RPCError(RuntimeError):
+    """A single call inside a JSON-RPC batch failed."""
+
+
+async def _post(client: _Client, payload: Any) -> Tuple[int, Any]:
+    """(HTTP status, decoded JSON body or None when the body is not JSON)."""
+    assert client.session is not None
+    async with client.limit:
+        async def send() -> Tuple[int, Any]:
+            async with client.session.post(client.rpc, json=payload) as resp:  # type: ignore[union-attr]
+                try:
+                    return resp.status, await resp.json(content_type=None)
+                except ValueError:
+                    return resp.status, None
+
+        return await asyncio.wait_for(send(), call_timeout())
+
+
+async def _post_one(client: _Client, payload: Dict[str, Any]) -> Any:
+    status, body = await _post(client, payload)
+    if not isinstance(body, dict) and status >= 400:
+        raise RuntimeError(f"node answered HTTP {status}")
+    return _unpack(body)
+
+
+def _unpack(response: Any) -> Any:
+    if not isinstance(response, dict):
+        return RPCError("malformed JSON-RPC response")
+    if response.get("error"):
+        err = response["error"]
+        return RPCError(str(err.get("message", err) if isinstance(err, dict) else err))
+    return response.get("result")
+
+
+async def rpc_batch(calls: Sequence[Tuple[str, list]], size: Optional[int] = None) -> list[Any]:
+    """Send raw JSON-RPC calls packed into batch payloads of `size` (default ``ETH_RPC_BATCH_SIZE``).
+
+    Results come back in call order; a call that failed is returned as an `RPCError`
+    instance rather than raised. Batches go out concurrently, bounded by the pool
+    size. A node that rejects batch payloads gets the calls one by one instead.
+    """
+    client = await get_client()
+    if not client:
+        raise RuntimeError("Ethereum not configured (missing RPC)")
+    size = max(1, int(size or batch_size()))
+
+    async def send(offset: int, group: Sequence[Tuple[str, list]]) -> list[Any]:
+        payload = [{"jsonrpc": "2.0", "id": offset + i, "method": m, "params": p} for i, (m, p) in enumerate(group)]
+        if len(payload) == 1:
+            return [await _post_one(client, payload[0])]
+        status, body = await _post(client, payload)
+        if status >= 400 or not isinstance(body, list):
+            # Batching disabled on the node: it answers with one error object or an HTTP error
+            return list(await asyncio.gather(*(_post_one(client, p) for p in payload)))
+        by_id = {r.get("id"): r for r in body if isinstance(r, dict)}
+        return [_unpack(by_id.get(offset + i)) for i in range(len(group))]
+
+    groups = [calls[i : i + size] for i in range(0, len(calls), size)]
+    results = await asyncio.gather(*(send(n * size, g) for n, g in enumerate(groups)))
+    return [r for g in results for r in g]
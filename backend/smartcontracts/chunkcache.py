@@ -0,0 +1,269 @@
+"""On-disk LRU cache of on-chain chunk payloads.
+
+Anchored chunks never change, so downloads and recoveries read them from a local
+cache under ``CHUNK_CACHE_DIR`` (default ``BASE_DIR/var/chunk_cache``, outside the
+publicly served ``MEDIA_ROOT``) bounded to ``CHUNK_CACHE_MB`` (0 disables it).
+Entries are keyed by survey id, raw/encrypted, chunk index and the chunk's keccak
+from the event index (`OnchainChunk`); only indexed chunks are cached, and every
+entry is checked against that keccak when it is read (a mismatch drops the entry
+and counts as ``corrupt``). Files are written to a temporary name and renamed into
+place, so readers never see partial entries. Recency is the file mtime (touched
+on every hit), so all workers evict in the same order; each process keeps an
+in-memory LRU index that it rebuilds from the directory every ``RESCAN_SECONDS``.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+from django.conf import settings
+from web3 import Web3
+
+from .models import OnchainChunk
+
+# How often a process re-reads the directory to account for other workers' entries
+RESCAN_SECONDS = 60.0
+
+
+def cache_dir() -> Path:
+    return Path(os.getenv("CHUNK_CACHE_DIR", "") or (Path(settings.BASE_DIR) / "var" / "chunk_cache"))
+
+
+def cache_max_bytes() -> int:
+    try:
+        return max(0, int(float(os.getenv("CHUNK_CACHE_MB", "256") or 0) * 1024 * 1024))
+    except Exception:
+        return 256 * 1024 * 1024
+
+
+def _keccak_hex(data: bytes) -> str:
+    return Web3.keccak(data).hex().removeprefix("0x")
+
+
+class ChunkCache:
+    """Size-bounded LRU directory of chunk payloads with hit/miss/eviction counters."""
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._bytes = 0
+        self._scanned_at: Optional[float] = None
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "corrupt": 0, "writes": 0}
+
+    def path(self, survey_id: int, encrypted: bool, index: int, keccak: str) -> Path:
+        kind = "e" if encrypted else "r"
+        return self.root / str(int(survey_id)) / f"{kind}{int(index)}-{keccak.lower().removeprefix('0x')}.bin"
+
+    def _scan(self) -> None:
+        # Rebuild the LRU index from the directory, oldest mtime first (caller holds the lock)
+        found = []
+        if self.root.is_dir():
+            for d in self.root.iterdir():
+                if not d.is_dir():
+                    continue
+                for f in d.iterdir():
+                    if f.suffix != ".bin" or f.name.startswith("."):
+                        continue
+                    try:
+                        st = f.stat()
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, f, st.st_size))
+        found.sort(key=lambda t: t[0])
+        self._entries = OrderedDict((f, size) for _, f, size in found)
+        self._bytes = sum(self._entries.values())
+        self._scanned_at = time.monotonic()
+
+    def _maybe_scan(self) -> None:
+        if self._scanned_at is None or time.monotonic() - self._scanned_at > RESCAN_SECONDS:
+            self._scan()
+
+    def _forget(self, path: Path) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._bytes -= size
+
+    def has(self, survey_id: int, encrypted: bool, index: int, keccak: str) -> bool:
+        """Whether an entry exists (not verified, not counted)."""
+        return self.path(survey_id, encrypted, index, keccak).is_file()
+
+    def record_misses(self, n: int = 1) -> None:
+        """Count lookups that were answered by `has()` instead of `get()`."""
+        with self._lock:
+            self._counts["misses"] += n
+
+    def get(self, survey_id: int, encrypted: bool, index: int, keccak: str) -> Optional[bytes]:
+        """The cached payload, or None on a miss or when it no longer matches `keccak`."""
+        p = self.path(survey_id, encrypted, index, keccak)
+        try:
+            data = p.read_bytes()
+        except OSError:
+            with self._lock:
+                self._counts["misses"] += 1
+                self._forget(p)
+            return None
+        if _keccak_hex(data) != keccak.lower().removeprefix("0x"):
+            with self._lock:
+                self._counts["corrupt"] += 1
+                self._counts["misses"] += 1
+                self._forget(p)
+            p.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(p)
+        except OSError:
+            pass
+        with self._lock:
+            self._counts["hits"] += 1
+            if p in self._entries:
+                self._entries.move_to_end(p)
+        return data
+
+    def put(self, survey_id: int, encrypted: bool, index: int, keccak: str, data: bytes) -> bool:
+        """Store `data` if it hashes to `keccak`; evicts least recently used entries past the size limit."""
+        if len(data) > self.max_bytes or _keccak_hex(data) != keccak.lower().removeprefix("0x"):
+            return False
+        p = self.path(survey_id, encrypted, index, keccak)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=".tmp-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, p)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        victims = []
+        with self._lock:
+            self._maybe_scan()
+            self._forget(p)
+            self._entries[p] = len(data)
+            self._bytes += len(data)
+            self._counts["writes"] += 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                self._counts["evictions"] += 1
+                victims.append(old)
+        for old in victims:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+        return True
+
+    def clear(self) -> int:
+        """Delete every entry. Returns how many files were removed."""
+        removed = 0
+        with self._lock:
+            self._scan()
+            for p in list(self._entries):
+                try:
+                    p.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._bytes = 0
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._maybe_scan()
+            return {**self._counts, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+_cache: Optional[ChunkCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ChunkCache]:
+    """The process-wide cache, or None when ``CHUNK_CACHE_MB`` is 0."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            limit = cache_max_bytes()
+            if limit <= 0:
+                return None
+            _cache = ChunkCache(cache_dir(), limit)
+        return _cache
+
+
+def chunk_cache_stats() -> Dict[str, int]:
+    """Counters of this process's chunk cache (plus current entries/bytes on disk)."""
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _indexed_hashes(survey_id: int, encrypted: bool, indices: Sequence[int]) -> Dict[int, str]:
+    qs = OnchainChunk.objects.filter(survey_id=int(survey_id), encrypted=encrypted)
+    if len(indices) == 1:
+        qs = qs.filter(index=indices[0])
+    elif indices:
+        qs = qs.filter(index__gte=min(indices), index__lte=max(indices))
+    return dict(qs.values_list("index", "chunk_hash"))
+
+
+def iter_chunks(survey_id: int, total: int, encrypted: bool = False, counts: Optional[Dict[str, int]] = None) -> Iterator[bytes]:
+    """Yield on-chain chunks [0, total) in order, from the cache where possible.
+
+    Chunks that are not cached are read from the node with read-ahead
+    (`eth.iter_chunks`) and cached once they match their indexed keccak. `counts`, if
+    given, receives this call's ``cached``/``fetched`` totals.
+    """
+    from . import eth
+
+    cache = get_cache()
+    indices = list(range(max(0, int(total))))
+    hashes = _indexed_hashes(survey_id, encrypted, indices) if cache is not None else {}
+    missing = [i for i in indices if i not in hashes or not cache.has(survey_id, encrypted, i, hashes[i])]
+    if cache is not None:
+        cache.record_misses(len(missing))
+    fetched = eth.iter_chunks(survey_id, missing, encrypted=encrypted)
+    pending = set(missing)
+    tally = counts if counts is not None else {}
+    tally.setdefault("cached", 0)
+    tally.setdefault("fetched", 0)
+    for i in indices:
+        payload = None
+        if i not in pending:
+            payload = cache.get(survey_id, encrypted, i, hashes[i])
+            if payload is None:
+                # Evicted or corrupted since the check above: read this one directly
+                payload = eth.read_encrypted_chunk(survey_id, i) if encrypted else eth.read_file_chunk(survey_id, i)
+                cache.put(survey_id, encrypted, i, hashes[i], payload)
+                tally["fetched"] += 1
+            else:
+                tally["cached"] += 1
+        else:
+            payload = next(fetched)
+            tally["fetched"] += 1
+            if cache is not None and i in hashes:
+                cache.put(survey_id, encrypted, i, hashes[i], payload)
+        yield payload
+
+
+def read_chunk(survey_id: int, index: int, encrypted: bool = False) -> bytes:
+    """One on-chain chunk payload, from the cache when it is there."""
+    from . import eth
+
+    cache = get_cache()
+    keccak = _indexed_hashes(survey_id, encrypted, [index]).get(int(index)) if cache is not None else None
+    if keccak:
+        payload = cache.get(survey_id, encrypted, index, keccak)
+        if payload is not None:
+            return payload
+    elif cache is not None:
+        cache.record_misses()
+    payload = eth.read_encrypted_chunk(survey_id, index) if encrypted else eth.read_file_chunk(survey_id, index)
+    if keccak and payload:
+        cache.put(survey_id, encrypted, index, keccak, payload)
+    return payload
@@ -0,0 +1,150 @@
+"""Background receipt confirmer for recorded transactions.
+
+The `tx_confirmer` command polls `Transaction` rows that are not final yet, reads
+their receipts in batched JSON-RPC requests and stores block number, receipt
+status and confirmation depth on the row. A hash without a receipt is checked
+again with per-row exponential backoff and given up on (``dropped``) after
+``TX_CONFIRM_MAX_CHECKS`` tries. API read paths only look at the stored columns.
+"""
+import os
+from datetime import timedelta
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+try:
+    # Blocks on top of (and including) the receipt's block before a tx counts as confirmed
+    REQUIRED_CONFIRMATIONS = max(1, int(os.getenv("TX_CONFIRMATIONS", "1") or 1))
+except Exception:
+    REQUIRED_CONFIRMATIONS = 1
+try:
+    BACKOFF_BASE = float(os.getenv("TX_CONFIRM_BACKOFF_SECONDS", "3") or 3)
+except Exception:
+    BACKOFF_BASE = 3.0
+try:
+    BACKOFF_CAP = float(os.getenv("TX_CONFIRM_BACKOFF_CAP_SECONDS", "600") or 600)
+except Exception:
+    BACKOFF_CAP = 600.0
+try:
+    MAX_CHECKS = int(os.getenv("TX_CONFIRM_MAX_CHECKS", "40") or 40)
+except Exception:
+    MAX_CHECKS = 40
+# Rows claimed by a worker are hidden from other workers this long
+LEASE_SECONDS = 60
+
+OPEN_STATES = ("pending", "mined")
+FINAL_STATES = ("confirmed", "reverted")
+
+STATE_FIELDS = [
+    "public_block_number",
+    "receipt_status",
+    "confirmations",
+    "confirm_state",
+    "confirm_checks",
+    "confirm_next_at",
+    "updated_at",
+]
+DETAIL_FIELDS = ["gas_used", "effective_gas_price", "fee_wei", "block_timestamp", "finalized"]
+
+
+def backoff_seconds(checks: int) -> float:
+    return min(BACKOFF_CAP, BACKOFF_BASE * (2 ** max(0, checks - 1)))
+
+
+def claim_due(limit: int = 100) -> list:
+    from transactions.models import Transaction
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        rows = list(
+            Transaction.objects.select_for_update(skip_locked=True)
+            .filter(confirm_state__in=OPEN_STATES, confirm_next_at__lte=now)
+            .order_by("confirm_next_at", "id")[:limit]
+        )
+        if rows:
+            Transaction.objects.filter(pk__in=[t.pk for t in rows]).update(confirm_next_at=now + timedelta(seconds=LEASE_SECONDS))
+    return rows
+
+
+def confirm(rows: list) -> int:
+    """Refresh confirmation state for claimed rows. Returns how many changed state."""
+    from .eth import get_block_number, get_block_timestamps, get_tx_receipts
+
+    if not rows:
+        return 0
+    now = timezone.now()
+    try:
+        head = get_block_number()
+        receipts = get_tx_receipts(t.public_anchor_tx_hash or t.private_tx_hash for t in rows)
+    except Exception:
+        # Node unreachable: try again later without counting it against the hashes
+        for t in rows:
+            t.confirm_next_at = now + timedelta(seconds=backoff_seconds(t.confirm_checks + 1))
+            t.save(update_fields=["confirm_next_at"])
+        return 0
+    changed = 0
+    final: list = []
+    for t in rows:
+        before = t.confirm_state
+        rc = receipts.get(t.public_anchor_tx_hash or t.private_tx_hash)
+        t.confirm_checks += 1
+        if rc is None or rc.get("blockNumber") is None:
+            # Not mined yet, or the block holding it was reorganised away
+            t.confirm_state = "dropped" if t.confirm_checks >= MAX_CHECKS else "pending"
+            t.confirmations = 0
+            t.confirm_next_at = now + timedelta(seconds=backoff_seconds(t.confirm_checks))
+        else:
+            t.public_block_number = int(rc["blockNumber"])
+            t.receipt_status = rc.get("status")
+            t.confirmations = max(0, head - t.public_block_number + 1)
+            if t.receipt_status == 0:
+                t.confirm_state = "reverted"
+            elif t.confirmations >= REQUIRED_CONFIRMATIONS:
+                t.confirm_state = "confirmed"
+            if t.confirm_state in FINAL_STATES:
+                final.append((t, rc))
+            else:
+                t.confirm_state = "mined"
+                # Depth grows with every block; no need to back off
+                t.confirm_next_at = now + timedelta(seconds=BACKOFF_BASE)
+        changed += int(t.confirm_state != before)
+    # Final receipts never change again: store their gas/fee/timestamp columns now
+    stamps = get_block_timestamps(t.public_block_number for t, _ in final) if final else {}
+    for t, rc in final:
+        t.store_details(rc.get("gasUsed"), rc.get("effectiveGasPrice"), stamps.get(t.public_block_number))
+    for t in rows:
+        t.save(update_fields=STATE_FIELDS + DETAIL_FIELDS)
+    return changed
+
+
+def backfill_details(limit: int = 500) -> int:
+    """Store receipt details on final rows that lack them (rows confirmed before the columns existed).
+
+    One batched receipt request and one batch of uncached blocks per call. Returns rows updated.
+    """
+    from transactions.models import Transaction
+
+    from .eth import get_tx_details_many
+
+    rows = list(
+        Transaction.objects.filter(confirm_state__in=FINAL_STATES, finalized=False).order_by("id")[:limit]
+    )
+    if not rows:
+        return 0
+    details = get_tx_details_many(t.public_anchor_tx_hash or t.private_tx_hash for t in rows)
+    done = 0
+    for t in rows:
+        d = details.get(t.public_anchor_tx_hash or t.private_tx_hash)
+        if not d:
+            continue
+        t.store_details(d.get("gasUsed"), d.get("effectiveGasPrice"), d.get("blockTimestamp"))
+        t.save(update_fields=DETAIL_FIELDS + ["updated_at"])
+        done += 1
+    return done
+
+
+def process_due(limit: int = 100) -> int:
+    """Claim and refresh up to `limit` due transactions. Returns how many were checked."""
+    rows = claim_due(limit)
+    confirm(rows)
+    return len(rows)
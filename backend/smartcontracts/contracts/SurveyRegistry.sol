@@ -61,6 +61,15 @@ contract SurveyRegistry {
         emit FileAttached(surveyId, checksum, msg.sender, block.timestamp);
     }
 
+    // Append several file hashes in one transaction (one FileAttached event each)
+    function addFileHashes(uint256 surveyId, bytes32[] calldata checksums) external {
+        require(surveys[surveyId].submitter != address(0), "SURVEY_NOT_FOUND");
+        for (uint256 i = 0; i < checksums.length; i++) {
+            _fileHashes[surveyId].push(checksums[i]);
+            emit FileAttached(surveyId, checksums[i], msg.sender, block.timestamp);
+        }
+    }
+
     // Return all file hashes for a survey
     function getFileHashes(uint256 surveyId) external view returns (bytes32[] memory) {
         return _fileHashes[surveyId];
@@ -90,6 +99,16 @@ contract SurveyRegistry {
         return _fileChunks[surveyId][index];
     }
 
+    // Aggregate view for list pages: one eth_call resolves the on-chain flags of many surveys
+    function getSurveyFlags(uint256[] calldata surveyIds) external view returns (bool[] memory hasRecord, uint256[] memory chunkCounts) {
+        hasRecord = new bool[](surveyIds.length);
+        chunkCounts = new uint256[](surveyIds.length);
+        for (uint256 i = 0; i < surveyIds.length; i++) {
+            hasRecord[i] = surveys[surveyIds[i]].submitter != address(0);
+            chunkCounts[i] = _fileChunks[surveyIds[i]].length;
+        }
+    }
+
     // Encrypted storage via SSTORE2
     function addEncryptedChunks(uint256 surveyId, bytes[] calldata payloads) external {
         require(surveys[surveyId].submitter != address(0), "SURVEY_NOT_FOUND");
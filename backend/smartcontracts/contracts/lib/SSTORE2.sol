@@ -11,9 +11,12 @@ library SSTORE2 {
     function write(bytes memory data) internal returns (address pointer) {
         // Prefix with a single 0x00 byte so code can be read entirely via extcodecopy starting at offset 1.
         bytes memory code = bytes.concat(bytes1(0x00), data);
+        // Init code that returns `code` as the deployed runtime code:
+        // PUSH4 len, DUP1, PUSH1 14, PUSH1 0, CODECOPY, PUSH1 0, RETURN (14 bytes), then `code`
+        bytes memory creation = bytes.concat(hex"63", bytes4(uint32(code.length)), hex"80600e6000396000f3", code);
         assembly {
             // create(value, codePtr, codeSize)
-            pointer := create(0, add(code, 0x20), mload(code))
+            pointer := create(0, add(creation, 0x20), mload(creation))
         }
         if (pointer == address(0)) revert WriteError();
     }
@@ -1,15 +1,26 @@
+import hashlib
+import math
 import os
-from typing import Any, Dict, Optional, Tuple
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
 from pathlib import Path
 from web3 import Web3
 from web3.types import TxParams
 from eth_account import Account
+from eth_account.signers.local import LocalAccount
 import json
 
+from . import async_eth as _aio
+
 # Lazy singletons
 _w3: Optional[Web3] = None
 _contract = None
 _from_addr: Optional[str] = None
+# Set by `use_web3`; takes precedence over ETH_CONTRACT_ADDRESS
+_contract_address: Optional[str] = None
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 ABI_PATH = BASE_DIR / "smartcontracts" / "abi" / "survey_registry.json"
@@ -28,36 +39,29 @@ def get_web3() -> Optional[Web3]:
 
 def get_encrypted_chunk_count(survey_id: int) -> int:
     """Read-only: return the number of encrypted chunks for a survey."""
-    contract = _get_contract()
-    if not contract:
-        raise RuntimeError("Ethereum not configured (missing contract)")
     try:
-        return int(contract.functions.getEncryptedChunkCount(int(survey_id)).call())
+        return _aio.run(_aio.encrypted_chunk_count(survey_id))
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"read getEncryptedChunkCount failed: {e}")
 
 
 def read_encrypted_chunk(survey_id: int, index: int) -> bytes:
     """Read-only: return the encrypted chunk bytes (nonce||ciphertext||tag) for given index."""
-    contract = _get_contract()
-    if not contract:
-        raise RuntimeError("Ethereum not configured (missing contract)")
     try:
-        data = contract.functions.readEncryptedChunk(int(survey_id), int(index)).call()
-        # Web3 typically returns bytes for bytes memory; ensure it's bytes
-        if isinstance(data, (bytes, bytearray)):
-            return bytes(data)
-        try:
-            return Web3.to_bytes(data)
-        except Exception:
-            try:
-                return bytes.fromhex(str(data).removeprefix("0x"))
-            except Exception:
-                return data
+        return _aio.run(_aio.encrypted_chunk(survey_id, index))
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"read readEncryptedChunk failed: {e}")
 
 
+def contract_address() -> str:
+    """Address of the SurveyRegistry in use ("" when not configured)."""
+    return _contract_address or os.getenv("ETH_CONTRACT_ADDRESS", "").strip()
+
+
 def _get_contract() -> Optional[Any]:
     global _contract, _from_addr
     if _contract is not None:
@@ -65,7 +69,7 @@ def _get_contract() -> Optional[Any]:
     w3 = get_web3()
     if not w3:
         return None
-    address = os.getenv("ETH_CONTRACT_ADDRESS", "").strip()
+    address = contract_address()
     if not address:
         return None
     if not ABI_PATH.exists():
@@ -74,103 +78,596 @@ def _get_contract() -> Optional[Any]:
         abi = json.load(f)
     _contract = w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi)
     # derive from address
-    pk = os.getenv("ETH_PRIVATE_KEY", "").strip()
-    if pk:
-        acct = Account.from_key(pk)
-        _from_addr = acct.address
+    try:
+        _from_addr = _signer().address
+    except RuntimeError:
+        pass
     return _contract
 
 
-def _build_and_send_tx(fn_name: str, *args) -> Tuple[str, Optional[int]]:
-    """Build and send a contract TX. Returns (tx_hash, block_number or None)."""
-    w3 = get_web3()
-    contract = _get_contract()
-    if not w3 or not contract:
-        raise RuntimeError("Ethereum not configured (missing RPC/contract/ABI)")
+class NonceManager:
+    """Thread-safe, process-local nonce allocator.
+
+    The first nonce for an address comes from the node's pending count; after that
+    nonces are handed out locally so several transactions can be in flight at once.
+    `resync()` re-reads the node after a nonce error or a failed broadcast.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._next: Dict[str, int] = {}
+
+    def next(self, w3: Web3, address: str) -> int:
+        with self._lock:
+            if address not in self._next:
+                self._next[address] = int(w3.eth.get_transaction_count(address, "pending"))
+            n = self._next[address]
+            self._next[address] = n + 1
+            return n
+
+    def resync(self, w3: Web3, address: str) -> None:
+        with self._lock:
+            self._next[address] = int(w3.eth.get_transaction_count(address, "pending"))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._next.clear()
+
+
+_nonces = NonceManager()
+
+# Lower-cased fragments of nonce rejections from geth, hardhat, besu and eth-tester
+_NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "nonce_too_low",
+    "nonce_too_high",
+    "invalid nonce",
+    "invalid transaction nonce",
+    "already known",
+    "replacement transaction underpriced",
+)
+
+
+def _is_nonce_error(e: Exception) -> bool:
+    msg = str(e).lower()
+    return any(m in msg for m in _NONCE_ERRORS)
+
+
+def use_web3(w3: Optional[Web3], contract_address: Optional[str] = None) -> None:
+    """Point this module at a specific Web3 instance (e.g. an in-process test backend).
 
+    `contract_address` overrides ``ETH_CONTRACT_ADDRESS`` for this process until the next
+    call; `use_web3(None)` goes back to the configured node and contract.
+    """
+    global _w3, _contract, _contract_address
+    _w3 = w3
+    _contract = None
+    _contract_address = contract_address.strip() if contract_address else None
+    _nonces.reset()
+    _context.invalidate()
+    _aio.reset()
+
+
+_DEFAULT_TTL = object()
+
+
+class ChainContext:
+    """Process-local TTL cache for values every transaction needs from the node.
+
+    Each key is loaded on first use and reused until its TTL runs out (``ttl=None``
+    keeps it until `invalidate()`). Hit/miss counters are kept per key.
+    """
+
+    def __init__(self, ttl: float = 15.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    def get(self, key: str, loader: Callable[[], Any], ttl: Any = _DEFAULT_TTL) -> Any:
+        ttl = self.ttl if ttl is _DEFAULT_TTL else ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self._hits[key] = self._hits.get(key, 0) + 1
+                return entry[1]
+            self._misses[key] = self._misses.get(key, 0) + 1
+        # Load outside the lock so a slow RPC doesn't serialize unrelated keys
+        value = loader()
+        with self._lock:
+            self._values[key] = (None if ttl is None else now + ttl, value)
+        return value
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop the given keys, or everything when called without arguments."""
+        with self._lock:
+            if not keys:
+                self._values.clear()
+            for k in keys:
+                self._values.pop(k, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            keys = set(self._hits) | set(self._misses)
+            return {k: {"hits": self._hits.get(k, 0), "misses": self._misses.get(k, 0)} for k in sorted(keys)}
+
+
+def context_ttl() -> float:
+    try:
+        return max(0.0, float(os.getenv("ETH_CONTEXT_TTL_SECONDS", "15") or 15))
+    except Exception:
+        return 15.0
+
+
+_context = ChainContext(context_ttl())
+
+# Lower-cased fragments of fee rejections; the cached fee suggestion is dropped on these
+_FEE_ERRORS = ("underpriced", "fee too low", "less than block base fee", "max fee per gas less than")
+
+
+def chain_context_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of the chain-context cache, per key."""
+    return _context.stats()
+
+
+def invalidate_chain_context(*keys: str) -> None:
+    """Forget cached chain id / gas limit / fees / signer (all of them when no keys are given)."""
+    _context.invalidate(*keys)
+
+
+def _signer() -> LocalAccount:
     pk = os.getenv("ETH_PRIVATE_KEY", "").strip()
     if not pk:
         raise RuntimeError("Missing ETH_PRIVATE_KEY")
-    acct = Account.from_key(pk)
-    from_addr = acct.address
+    # Keyed by the key itself so rotating ETH_PRIVATE_KEY picks up the new account
+    return _context.get(f"signer:{hashlib.sha256(pk.encode()).hexdigest()}", lambda: Account.from_key(pk), ttl=None)
 
-    chain_id = int(os.getenv("ETH_CHAIN_ID", "0") or 0) or w3.eth.chain_id
-    nonce = w3.eth.get_transaction_count(from_addr, "pending")
 
-    fn = getattr(contract.functions, fn_name)(*args)
-    # Estimate gas
+def _chain_id(w3: Web3) -> int:
+    return _context.get("chain_id", lambda: int(os.getenv("ETH_CHAIN_ID", "0") or 0) or int(w3.eth.chain_id), ttl=None)
+
+
+def _block_gas_limit(w3: Web3) -> int:
+    def load() -> int:
+        try:
+            latest_blk = w3.eth.get_block("latest")
+            return int(getattr(latest_blk, "gasLimit", getattr(latest_blk, "gas_limit", 30_000_000)) or 30_000_000)
+        except Exception:
+            return 30_000_000
+
+    return _context.get("block_gas_limit", load)
+
+
+def _fee_suggestion(w3: Web3) -> Tuple[int, int]:
+    """(max_priority_fee, gas_price) as suggested by the node."""
+
+    def load() -> Tuple[int, int]:
+        try:
+            max_priority = w3.eth.max_priority_fee
+        except Exception:
+            max_priority = Web3.to_wei(2, "gwei")
+        try:
+            base_gas = w3.eth.gas_price
+        except Exception:
+            base_gas = Web3.to_wei(20, "gwei")
+        return int(max_priority), int(base_gas)
+
+    return _context.get("fees", load)
+
+
+class GasModel:
+    """Per-function gas limits learned from our own receipts.
+
+    Samples are keyed by function name and a calldata-length bucket (quarter
+    octaves, so a bucket spans at most ~19% in length). A bucket with at least
+    ``min_samples`` successful receipts supplies the gas limit directly: the largest
+    gasUsed seen, scaled up for longer calldata, times ``margin``. Cold buckets, and
+    buckets dropped after a failure, fall back to ``estimate_gas``. A transaction that
+    ran out of a modeled limit must be resent (`observe` reports it).
+    """
+
+    def __init__(self, margin: float = 1.25, min_samples: int = 2) -> None:
+        self.margin = margin
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        # key -> [samples, peak gasUsed, calldata length at the peak]
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        # tx hash -> (key, calldata length, gas limit sent, whether the limit was modeled)
+        self._inflight: Dict[str, Tuple[Tuple[str, int], int, int, bool]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(fn_name: str, length: int) -> Tuple[str, int]:
+        return fn_name, int(math.log2(max(1, length)) * 4)
+
+    def predict(self, fn_name: str, length: int) -> Optional[int]:
+        with self._lock:
+            b = self._buckets.get(self.key(fn_name, length))
+            if b is None or b[0] < self.min_samples:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return int(b[1] * max(1.0, length / max(1, b[2])) * self.margin)
+
+    def sent(self, tx_hash: str, fn_name: str, length: int, gas_limit: int, modeled: bool = False) -> None:
+        with self._lock:
+            self._inflight[tx_hash] = (self.key(fn_name, length), length, gas_limit, modeled)
+            # Hashes nobody waits for would otherwise pile up
+            while len(self._inflight) > 4096:
+                self._inflight.pop(next(iter(self._inflight)))
+
+    def observe(self, tx_hash: str, receipt: Any) -> bool:
+        """Learn from the receipt of a transaction sent through `send_tx`.
+
+        Returns True when it reverted after using up a modeled gas limit, i.e. it should
+        be sent again with an estimated limit.
+        """
+        with self._lock:
+            entry = self._inflight.pop(tx_hash, None)
+            if entry is None or receipt is None:
+                return False
+            key, length, gas_limit, modeled = entry
+            used = int(getattr(receipt, "gasUsed", 0) or 0)
+            if int(getattr(receipt, "status", 1) or 0) != 1:
+                # Ran out of (or close to) the limit we supplied: stop trusting this bucket
+                if used >= gas_limit * 0.98:
+                    self._buckets.pop(key, None)
+                    return modeled
+                return False
+            b = self._buckets.setdefault(key, [0, 0, length])
+            b[0] += 1
+            if used * max(1, b[2]) >= b[1] * max(1, length):
+                b[1], b[2] = used, length
+            return False
+
+    def rate(self, fn_name: str, base: int = 0) -> Optional[float]:
+        """Highest observed gas per calldata byte (above `base`) across warm buckets of `fn_name`."""
+        with self._lock:
+            rates = [
+                (b[1] - base) / b[2]
+                for (name, _), b in self._buckets.items()
+                if name == fn_name and b[0] >= self.min_samples and b[2] > 0 and b[1] > base
+            ]
+        return max(rates) if rates else None
+
+    def forget(self, fn_name: str, length: int) -> None:
+        with self._lock:
+            self._buckets.pop(self.key(fn_name, length), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "buckets": len(self._buckets)}
+
+
+def _gas_margin() -> float:
     try:
-        gas_estimate = fn.estimate_gas({"from": from_addr})
+        return max(1.0, float(os.getenv("ETH_GAS_MODEL_MARGIN", "1.25") or 1.25))
     except Exception:
-        # Conservative fallback; we'll still cap by block gas limit below
-        gas_estimate = 10_000_000
+        return 1.25
 
-    # Determine safe gas limit under current block gas cap
+
+def _gas_min_samples() -> int:
     try:
-        latest_blk = w3.eth.get_block("latest")
-        blk_limit = int(getattr(latest_blk, "gasLimit", getattr(latest_blk, "gas_limit", 30_000_000)) or 30_000_000)
+        return max(1, int(os.getenv("ETH_GAS_MODEL_MIN_SAMPLES", "2") or 2))
     except Exception:
-        blk_limit = 30_000_000
+        return 2
+
+
+_gas_model = GasModel(_gas_margin(), _gas_min_samples())
+
+# Lower-cased fragments of broadcast rejections caused by a too-small gas limit
+_GAS_ERRORS = ("intrinsic gas too low", "out of gas", "gas too low", "insufficient gas")
+
+
+def gas_model_stats() -> Dict[str, Any]:
+    return _gas_model.stats()
+
+
+def gas_rate(fn_name: str, base: int = 0) -> Optional[float]:
+    """Learned gas per calldata byte for `fn_name`, or None while the model is cold."""
+    return _gas_model.rate(fn_name, base)
+
+
+def block_gas_limit() -> int:
+    """Latest block gas limit (cached with the chain context)."""
+    w3 = get_web3()
+    if not w3:
+        raise RuntimeError("Ethereum not configured (missing RPC)")
+    return _block_gas_limit(w3)
+
+
+def send_tx(fn_name: str, *args, estimate: bool = False) -> str:
+    """Build, sign and broadcast a contract TX without waiting for it to be mined. Returns the tx hash.
+
+    `estimate` skips the gas model and always simulates the call for its gas limit.
+    """
+    w3 = get_web3()
+    contract = _get_contract()
+    if not w3 or not contract:
+        raise RuntimeError("Ethereum not configured (missing RPC/contract/ABI)")
+
+    acct = _signer()
+    from_addr = acct.address
+    chain_id = _chain_id(w3)
+
+    fn = getattr(contract.functions, fn_name)(*args)
+    length = len(Web3.to_bytes(hexstr=fn._encode_transaction_data()))
     # Leave headroom (5%) to avoid exceeding block limit after intrinsic gas, etc.
-    safe_cap = max(21_000, int(blk_limit * 0.95))
-    gas_limit = int(gas_estimate * 1.1)
-    if gas_limit > safe_cap:
-        gas_limit = safe_cap
+    safe_cap = max(21_000, int(_block_gas_limit(w3) * 0.95))
+
+    def estimated() -> int:
+        try:
+            return int(fn.estimate_gas({"from": from_addr}) * 1.2)
+        except Exception:
+            # Conservative fallback; still capped by the block gas limit
+            return 10_000_000
+
+    # A warm gas model skips the estimate_gas simulation entirely
+    modeled = None if estimate else _gas_model.predict(fn_name, length)
+    gas_limit = min(safe_cap, modeled or estimated())
 
     # EIP-1559 params
+    max_priority, base_gas = _fee_suggestion(w3)
+
+    for attempt in range(2):
+        nonce = _nonces.next(w3, from_addr)
+        tx: TxParams = {
+            "from": from_addr,
+            "nonce": nonce,
+            "chainId": chain_id,
+            "gas": gas_limit,
+            "maxFeePerGas": int(base_gas * 2),
+            "maxPriorityFeePerGas": int(max_priority),
+        }
+        try:
+            built = fn.build_transaction(tx)
+            signed = acct.sign_transaction(built)
+            h = w3.eth.send_raw_transaction(signed.rawTransaction).hex()
+            _gas_model.sent(h, fn_name, length, gas_limit, modeled is not None)
+            return h
+        except Exception as e:
+            # The nonce was not consumed (or the local view is stale): re-read it from the node
+            _nonces.resync(w3, from_addr)
+            msg = str(e).lower()
+            if any(m in msg for m in _FEE_ERRORS):
+                _context.invalidate("fees")
+            if not attempt and modeled and any(m in msg for m in _GAS_ERRORS):
+                # The model was wrong for this payload: estimate instead and retry once
+                _gas_model.forget(fn_name, length)
+                modeled = None
+                gas_limit = min(safe_cap, estimated())
+                continue
+            if attempt or not _is_nonce_error(e):
+                raise
+    raise RuntimeError("unreachable")
+
+
+def wait_for_receipts(tx_hashes: list[str], timeout: float = 20) -> Dict[str, Optional[Any]]:
+    """Wait for several already-broadcast transactions; missing receipts map to None."""
+    w3 = get_web3()
+    if not w3:
+        raise RuntimeError("Ethereum not configured (missing RPC)")
+    deadline = time.monotonic() + timeout
+    out: Dict[str, Optional[Any]] = {}
+    for h in tx_hashes:
+        out[h], _ = _wait_receipt(w3, h, max(0.1, deadline - time.monotonic()))
+    return out
+
+
+def _wait_receipt(w3: Web3, tx_hash: str, timeout: float) -> Tuple[Optional[Any], bool]:
+    """(receipt or None, whether it ran out of a modeled gas limit and should be resent)."""
     try:
-        max_priority = w3.eth.max_priority_fee
-    except Exception:
-        max_priority = Web3.to_wei(2, "gwei")
-    try:
-        base_gas = w3.eth.gas_price
+        rc = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
     except Exception:
-        base_gas = Web3.to_wei(20, "gwei")
-
-    tx: TxParams = {
-        "from": from_addr,
-        "nonce": nonce,
-        "chainId": chain_id,
-        "gas": int(gas_estimate * 1.2),
-        "maxFeePerGas": int(base_gas * 2),
-        "maxPriorityFeePerGas": int(max_priority),
-    }
+        rc = None
+    return rc, _gas_model.observe(tx_hash, rc)
 
-    built = fn.build_transaction(tx)
-    signed = w3.eth.account.sign_transaction(built, private_key=pk)
-    tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
-    h = tx_hash.hex()
-    # Try to get receipt quickly (non-blocking feel) with short timeout
+
+class WindowSendError(RuntimeError):
+    """A pipelined send failed; `results` holds the transactions that did go out, in order."""
+
+    def __init__(self, message: str, results: list[Tuple[str, Optional[int], Optional[int]]]):
+        super().__init__(message)
+        self.results = results
+
+
+def window_size() -> int:
     try:
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=20)
-        return h, receipt.blockNumber if receipt else None
+        return max(1, int(os.getenv("ETH_TX_WINDOW", "4") or 4))
     except Exception:
-        return h, None
+        return 4
 
 
-def record_submission(survey_id: int, project_id: int, ipfs_cid: str, checksum: str) -> Tuple[str, Optional[int]]:
-    return _build_and_send_tx("recordSubmission", int(survey_id), int(project_id), ipfs_cid, checksum)
+_DONE = object()
 
 
-def mark_approved(survey_id: int) -> Tuple[str, Optional[int]]:
-    return _build_and_send_tx("markApproved", int(survey_id))
+def _prefetch(items: Iterable[Any], depth: int) -> Iterable[Any]:
+    """Iterate `items` on a reader thread, keeping at most `depth` produced items buffered."""
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
 
+    def _read() -> None:
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        q.put((item, None), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            q.put((_DONE, None))
+        except BaseException as e:  # surfaced to the consumer
+            q.put((_DONE, e))
+
+    threading.Thread(target=_read, name="eth-prefetch", daemon=True).start()
+    try:
+        while True:
+            item, err = q.get()
+            if item is _DONE:
+                if err is not None:
+                    raise err
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def send_window(
+    calls: Iterable[Tuple[str, tuple]],
+    window: Optional[int] = None,
+    timeout: float = 120,
+    on_result: Optional[Callable[[str, Optional[int], Optional[int]], None]] = None,
+    on_sent: Optional[Callable[[int, str], None]] = None,
+) -> list[Tuple[str, Optional[int], Optional[int]]]:
+    """Pipeline contract calls: keep up to `window` transactions in flight.
+
+    `calls` is consumed lazily on a reader thread (at most `window` calls buffered), the
+    caller's thread signs and broadcasts with nonces from the local manager, and a
+    collector thread waits for receipts oldest-first. Memory is bounded by the window,
+    not by the number of calls. Results are (tx_hash, block_number, receipt status) in
+    call order, with None for both when no receipt arrived; a mined transaction may have
+    reverted (status 0). `on_result` is invoked for each on the caller's thread as soon
+    as it is known, and `on_sent(position, tx_hash)` right after each broadcast.
+    A failed send, or an exception from a callback, stops further sends and raises
+    `WindowSendError` after the already-broadcast transactions have been waited for.
+    """
+    window = max(1, int(window or window_size()))
+    results: list[Tuple[str, Optional[int], Optional[int]]] = []
+    slots = threading.Semaphore(window)
+    inflight: "queue.Queue[Any]" = queue.Queue()
+    done: "queue.Queue[Tuple[str, Optional[int], Optional[int]]]" = queue.Queue()
+
+    def _collect() -> None:
+        while True:
+            h = inflight.get()
+            if h is _DONE:
+                return
+            rc = wait_for_receipts([h], timeout=timeout).get(h)
+            if rc is None:
+                done.put((h, None, None))
+            else:
+                done.put((h, getattr(rc, "blockNumber", None), int(getattr(rc, "status", 1))))
+            slots.release()
+
+    def _flush() -> None:
+        # Every result is handed to `on_result`; the first callback error is raised afterwards
+        error: Optional[Exception] = None
+        while True:
+            try:
+                h, blk, st = done.get_nowait()
+            except queue.Empty:
+                break
+            results.append((h, blk, st))
+            if on_result is not None:
+                try:
+                    on_result(h, blk, st)
+                except Exception as e:
+                    error = error or e
+        if error is not None:
+            raise error
+
+    collector = threading.Thread(target=_collect, name="eth-receipts", daemon=True)
+    collector.start()
+    failure: Optional[BaseException] = None
+    try:
+        for position, (fn_name, args) in enumerate(_prefetch(calls, window)):
+            # Blocks while `window` transactions are still waiting for receipts
+            slots.acquire()
+            try:
+                h = send_tx(fn_name, *args)
+            except Exception:
+                slots.release()
+                raise
+            inflight.put(h)
+            if on_sent is not None:
+                on_sent(position, h)
+            _flush()
+    except Exception as e:
+        failure = e
+    inflight.put(_DONE)
+    collector.join()
+    try:
+        _flush()
+    except Exception as e:
+        failure = failure or e
+    if failure is not None:
+        raise WindowSendError(str(failure), results) from failure
+    return results
 
-def mark_rejected(survey_id: int) -> Tuple[str, Optional[int]]:
-    return _build_and_send_tx("markRejected", int(survey_id))
 
+class ReceiptPending(RuntimeError):
+    """A transaction went out but no receipt arrived in time; it may still be mined."""
 
-def add_file_hash(survey_id: int, checksum_hex: str) -> Tuple[str, Optional[int]]:
-    """Append a file hash (sha256) to a survey's attachment list on-chain.
-    checksum_hex must be a 64-hex sha256 string (with or without 0x).
+    def __init__(self, fn_name: str, tx_hash: str):
+        super().__init__(f"{fn_name} transaction {tx_hash} sent, no receipt yet")
+        self.tx_hash = tx_hash
+
+
+def _build_and_send_tx(fn_name: str, *args, on_sent: Optional[Callable[[str], None]] = None) -> Tuple[str, int]:
+    """Build and send a contract TX and wait for it to be mined. Returns (tx_hash, block_number).
+
+    `on_sent(tx_hash)` is called after each broadcast, before waiting for the receipt.
+    Raises `ReceiptPending` when the receipt does not arrive within the wait, and
+    RuntimeError when the transaction reverted.
     """
+    w3 = get_web3()
+    h = send_tx(fn_name, *args)
+    if on_sent is not None:
+        on_sent(h)
+    # Try to get receipt quickly (non-blocking feel) with short timeout
+    rc, resend = _wait_receipt(w3, h, 20)
+    if resend:
+        # The gas model under-estimated this call: nothing was stored, send it again
+        h = send_tx(fn_name, *args, estimate=True)
+        if on_sent is not None:
+            on_sent(h)
+        rc, _ = _wait_receipt(w3, h, 20)
+    if rc is None:
+        raise ReceiptPending(fn_name, h)
+    if int(getattr(rc, "status", 1)) != 1:
+        raise RuntimeError(f"{fn_name} transaction {h} reverted")
+    return h, rc.blockNumber
+
+
+def record_submission(survey_id: int, project_id: int, ipfs_cid: str, checksum: str, on_sent: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[int]]:
+    return _build_and_send_tx("recordSubmission", int(survey_id), int(project_id), ipfs_cid, checksum, on_sent=on_sent)
+
+
+def mark_approved(survey_id: int, on_sent: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[int]]:
+    return _build_and_send_tx("markApproved", int(survey_id), on_sent=on_sent)
+
+
+def mark_rejected(survey_id: int, on_sent: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[int]]:
+    return _build_and_send_tx("markRejected", int(survey_id), on_sent=on_sent)
+
+
+def _checksum_bytes32(checksum_hex: str) -> bytes:
     h = checksum_hex.lower().strip()
     if h.startswith("0x"):
         h = h[2:]
     if len(h) != 64:
         raise ValueError("checksum must be 32-byte (64 hex chars)")
-    arg = Web3.to_bytes(hexstr="0x" + h)
-    return _build_and_send_tx("addFileHash", int(survey_id), arg)
+    return Web3.to_bytes(hexstr="0x" + h)
+
+
+def add_file_hash(survey_id: int, checksum_hex: str, on_sent: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[int]]:
+    """Append a file hash (sha256) to a survey's attachment list on-chain.
+    checksum_hex must be a 64-hex sha256 string (with or without 0x).
+    """
+    return _build_and_send_tx("addFileHash", int(survey_id), _checksum_bytes32(checksum_hex), on_sent=on_sent)
+
+
+def add_file_hashes(survey_id: int, checksums_hex: list[str], on_sent: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[int]]:
+    """Append several file hashes (sha256 hex) to a survey in one tx (bytes32[])."""
+    if not checksums_hex:
+        raise ValueError("at least one checksum is required")
+    return _build_and_send_tx("addFileHashes", int(survey_id), [_checksum_bytes32(h) for h in checksums_hex], on_sent=on_sent)
 
 
 def add_file_chunk(survey_id: int, chunk: bytes) -> Tuple[str, Optional[int]]:
@@ -184,34 +681,94 @@ def add_file_chunks(survey_id: int, chunks: list[bytes]) -> Tuple[str, Optional[
 
 
 def get_file_chunk_count(survey_id: int) -> int:
-    contract = _get_contract()
-    if not contract:
-        raise RuntimeError("Ethereum not configured (missing contract)")
     try:
-        return int(contract.functions.getFileChunkCount(int(survey_id)).call())
+        return _aio.run(_aio.file_chunk_count(survey_id))
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"read getFileChunkCount failed: {e}")
 
 
 def read_file_chunk(survey_id: int, index: int) -> bytes:
-    contract = _get_contract()
-    if not contract:
-        raise RuntimeError("Ethereum not configured (missing contract)")
     try:
-        data = contract.functions.getFileChunk(int(survey_id), int(index)).call()
-        if isinstance(data, (bytes, bytearray)):
-            return bytes(data)
-        try:
-            return Web3.to_bytes(data)
-        except Exception:
-            try:
-                return bytes.fromhex(str(data).removeprefix("0x"))
-            except Exception:
-                return data
+        return _aio.run(_aio.file_chunk(survey_id, index))
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"read getFileChunk failed: {e}")
 
 
+def read_file_chunks(survey_id: int, indices: Iterable[int]) -> list[bytes]:
+    """Read several raw chunks in JSON-RPC batches (``ETH_RPC_BATCH_SIZE`` per request), in `indices` order."""
+    try:
+        return _aio.run(_aio.file_chunks(survey_id, indices))
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"read getFileChunk failed: {e}")
+
+
+def read_encrypted_chunks(survey_id: int, indices: Iterable[int]) -> list[bytes]:
+    """Read several encrypted payloads in JSON-RPC batches (``ETH_RPC_BATCH_SIZE`` per request), in `indices` order."""
+    try:
+        return _aio.run(_aio.encrypted_chunks(survey_id, indices))
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"read readEncryptedChunk failed: {e}")
+
+
+def recover_slice() -> int:
+    try:
+        return max(1, int(os.getenv("RECOVER_SLICE", "256") or 256))
+    except Exception:
+        return 256
+
+
+def recover_ahead() -> int:
+    try:
+        return max(1, int(os.getenv("RECOVER_PREFETCH_SLICES", "3") or 3))
+    except Exception:
+        return 3
+
+
+def iter_chunks(survey_id: int, indices: Sequence[int], encrypted: bool = False) -> Iterator[bytes]:
+    """Yield the on-chain chunks at `indices` in order, raw or encrypted payloads.
+
+    Chunks are read in slices of ``RECOVER_SLICE`` (each a set of JSON-RPC batches)
+    with up to ``RECOVER_PREFETCH_SLICES`` slices in flight, so reads overlap with
+    the consumer while memory stays bounded by the slices held.
+    """
+    read = _aio.encrypted_chunks if encrypted else _aio.file_chunks
+    name = "readEncryptedChunk" if encrypted else "getFileChunk"
+    size, ahead = recover_slice(), recover_ahead()
+    slices = iter(range(0, len(indices), size))
+    pending: "deque[Any]" = deque()
+
+    def _fill() -> None:
+        while len(pending) < ahead:
+            lo = next(slices, None)
+            if lo is None:
+                return
+            pending.append(_aio.submit(read(survey_id, indices[lo : lo + size])))
+
+    try:
+        _fill()
+        while pending:
+            fut = pending.popleft()
+            try:
+                part = fut.result()
+            except RuntimeError:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"read {name} failed: {e}")
+            _fill()
+            yield from part
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
 def add_encrypted_chunks(survey_id: int, payloads: list[bytes]) -> Tuple[str, Optional[int]]:
     """Store encrypted file payloads (nonce||ciphertext_with_tag) via SSTORE2 pointers (bytes[])."""
     return _build_and_send_tx("addEncryptedChunks", int(survey_id), payloads)
@@ -220,79 +777,116 @@ def add_encrypted_chunks(survey_id: int, payloads: list[bytes]) -> Tuple[str, Op
 
 def get_onchain_record(survey_id: int) -> Optional[Dict[str, Any]]:
     """Return the public mapping 'surveys[surveyId]' as a dict: projectId, ipfsCid, checksum, status, submitter."""
-    contract = _get_contract()
-    if not contract:
-        return None
     try:
-        r = contract.functions.surveys(int(survey_id)).call()
-        # r is a tuple per struct order
-        if isinstance(r, (list, tuple)) and len(r) >= 5:
-            return {
-                "projectId": r[0],
-                "ipfsCid": r[1],
-                "checksum": r[2],
-                "status": r[3],
-                "submitter": r[4],
-            }
-        # Fallback: try attribute-style
-        return {
-            "projectId": getattr(r, "projectId", None),
-            "ipfsCid": getattr(r, "ipfsCid", None),
-            "checksum": getattr(r, "checksum", None),
-            "status": getattr(r, "status", None),
-            "submitter": getattr(r, "submitter", None),
-        }
+        return _aio.run(_aio.onchain_record(survey_id))
     except Exception:
         return None
 
 
+def get_survey_flags(survey_ids: Iterable[int]) -> Dict[int, Tuple[bool, int]]:
+    """Map survey id -> (has on-chain record, raw chunk count) for many surveys in one round trip."""
+    try:
+        return _aio.run(_aio.survey_flags(survey_ids))
+    except Exception:
+        return {}
+
+
+def get_contract_events(from_block: int, to_block: int) -> list[Dict[str, Any]]:
+    """Decoded SurveyRegistry events in a block range (see `async_eth.contract_events`)."""
+    try:
+        return _aio.run(_aio.contract_events(from_block, to_block))
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"read logs failed: {e}")
+
+
+def get_receipt_events(tx_hashes: Iterable[str]) -> list[Dict[str, Any]]:
+    """Decoded SurveyRegistry events emitted by the given transactions (see `async_eth.receipt_events`)."""
+    try:
+        return _aio.run(_aio.receipt_events(tx_hashes))
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"read receipt logs failed: {e}")
+
+
+def get_tx_known(tx_hashes: Iterable[str]) -> Dict[str, bool]:
+    """Whether the node still knows each transaction (mined or waiting in its pool), via one batch."""
+    hashes = list(dict.fromkeys(h for h in tx_hashes if h))
+    if not hashes:
+        return {}
+    results = rpc_batch([("eth_getTransactionByHash", [h]) for h in hashes])
+    for r in results:
+        if isinstance(r, Exception):
+            raise RuntimeError(f"read transactions failed: {r}")
+    return {h: bool(r) for h, r in zip(hashes, results)}
+
+
 def get_tx_receipt(tx_hash: str) -> Optional[Dict[str, Any]]:
-    if not w3:
-        return None
     try:
         # tx_hash should be 0x-prefixed hex string
-        receipt = w3.eth.get_transaction_receipt(tx_hash)
-        return {
-            "blockNumber": getattr(receipt, "blockNumber", None),
-            "status": getattr(receipt, "status", None),
-        }
+        receipt = _aio.run(_aio.tx_receipt(tx_hash))
     except Exception:
         return None
+    if receipt is None:
+        return None
+    return {
+        "blockNumber": getattr(receipt, "blockNumber", None),
+        "status": getattr(receipt, "status", None),
+    }
 
 
 def get_tx_details(tx_hash: str) -> Optional[Dict[str, Any]]:
     """Return gas and timing details for a transaction: blockNumber, status, gasUsed, effectiveGasPrice, feeWei, blockTimestamp."""
-    w3 = get_web3()
-    if not w3:
-        return None
     try:
-        rc = w3.eth.get_transaction_receipt(tx_hash)
-        if rc is None:
-            return None
-        block_number = getattr(rc, "blockNumber", None)
-        gas_used = getattr(rc, "gasUsed", None)
-        eff_price = getattr(rc, "effectiveGasPrice", None)
-        status = getattr(rc, "status", None)
-        ts = None
-        if block_number is not None:
-            try:
-                blk = w3.eth.get_block(block_number)
-                ts = getattr(blk, "timestamp", None)
-            except Exception:
-                ts = None
-        fee_wei = None
-        try:
-            if gas_used is not None and eff_price is not None:
-                fee_wei = int(gas_used) * int(eff_price)
-        except Exception:
-            fee_wei = None
-        return {
-            "blockNumber": block_number,
-            "status": status,
-            "gasUsed": gas_used,
-            "effectiveGasPrice": eff_price,
-            "feeWei": fee_wei,
-            "blockTimestamp": ts,
-        }
+        return _aio.run(_aio.tx_details(tx_hash))
     except Exception:
         return None
+
+
+def get_block_number() -> int:
+    try:
+        return _aio.run(_aio.block_number())
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"read blockNumber failed: {e}")
+
+
+def get_tx_receipts(tx_hashes: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Receipts (blockNumber, status, gasUsed, effectiveGasPrice) for several transactions via batched eth_getTransactionReceipt.
+
+    A hash without a receipt maps to None; an unreachable node raises RuntimeError.
+    """
+    try:
+        raw = _aio.run(_aio.tx_receipts(tx_hashes))
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"read receipts failed: {e}")
+    return {
+        h: None if rc is None else {k: _aio._int(rc.get(k)) for k in ("blockNumber", "status", "gasUsed", "effectiveGasPrice")}
+        for h, rc in raw.items()
+    }
+
+
+def get_block_timestamps(block_numbers: Iterable[int]) -> Dict[int, Optional[int]]:
+    """Unix timestamps by block number (cached per process; uncached blocks are fetched in one batch)."""
+    try:
+        return _aio.run(_aio.block_timestamps(block_numbers))
+    except Exception:
+        return {}
+
+
+def rpc_batch(calls: list[Tuple[str, list]], size: Optional[int] = None) -> list[Any]:
+    """Send raw JSON-RPC calls in batch payloads; failed calls come back as `RPCError` instances."""
+    return _aio.run(_aio.rpc_batch(calls, size))
+
+
+def get_tx_details_many(tx_hashes: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """`get_tx_details` for several transactions: one batched receipt request and one for their blocks. Keyed by hash."""
+    try:
+        return _aio.run(_aio.tx_details_many(tx_hashes))
+    except Exception:
+        return {}
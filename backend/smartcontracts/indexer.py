@@ -0,0 +1,193 @@
+"""Incremental SurveyRegistry event indexer.
+
+`sync()` scans ``eth_getLogs`` in ranges of ``CHAIN_INDEXER_BLOCK_RANGE`` blocks
+from the stored checkpoint up to the head minus ``CHAIN_INDEXER_CONFIRMATIONS - 1``
+and upserts `OnchainSurvey`, `OnchainFileHash` and `OnchainChunk` rows. Each range
+is applied in one DB transaction together with the checkpoint move, so a crash
+re-reads at most one range and the upserts make that harmless.
+
+Once the indexer has caught up with the chain head it last saw (within
+``CHAIN_INDEXER_READY_LAG`` blocks, on a sync no older than
+``CHAIN_INDEXER_READY_MAX_AGE_SECONDS``), the read helpers below (`onchain_record`,
+`chunk_count`, `enc_chunk_count`, `survey_flags`) answer from Postgres; while it is
+behind or stalled they fall back to live contract reads. Guards in front of chain
+writes should read the contract directly rather than use these helpers.
+"""
+import os
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import IndexerCheckpoint, OnchainChunk, OnchainFileHash, OnchainSurvey
+
+try:
+    BLOCK_RANGE = max(1, int(os.getenv("CHAIN_INDEXER_BLOCK_RANGE", "2000") or 2000))
+except Exception:
+    BLOCK_RANGE = 2000
+try:
+    CONFIRMATIONS = max(1, int(os.getenv("CHAIN_INDEXER_CONFIRMATIONS", "1") or 1))
+except Exception:
+    CONFIRMATIONS = 1
+try:
+    START_BLOCK = max(0, int(os.getenv("CHAIN_INDEXER_START_BLOCK", "0") or 0))
+except Exception:
+    START_BLOCK = 0
+try:
+    # Blocks the index may trail the head it last saw and still serve reads
+    READY_LAG = max(0, int(os.getenv("CHAIN_INDEXER_READY_LAG", "5") or 0))
+except Exception:
+    READY_LAG = 5
+try:
+    READY_MAX_AGE = max(1.0, float(os.getenv("CHAIN_INDEXER_READY_MAX_AGE_SECONDS", "300") or 300))
+except Exception:
+    READY_MAX_AGE = 300.0
+
+_STATUS = {"Submitted": 1, "Approved": 2, "Rejected": 3}
+
+
+def _contract_address() -> str:
+    from .eth import contract_address
+
+    return contract_address().lower()
+
+
+def index_ready() -> bool:
+    """True when a recent sync left the index within ``READY_LAG`` blocks of the confirmed head."""
+    address = _contract_address()
+    if not address:
+        return False
+    cp = IndexerCheckpoint.objects.filter(contract_address=address).only("last_block", "head_block", "updated_at").first()
+    if cp is None or cp.last_block < 0 or cp.head_block < 0:
+        return False
+    if cp.updated_at < timezone.now() - timedelta(seconds=READY_MAX_AGE):
+        # The indexer stopped running: the head it saw is no longer the chain's
+        return False
+    return cp.last_block >= cp.head_block - (CONFIRMATIONS - 1) - READY_LAG
+
+
+def _hex(v: Any) -> str:
+    if isinstance(v, (bytes, bytearray)):
+        return bytes(v).hex()
+    return str(v).lower().removeprefix("0x")
+
+
+def _apply(ev: Dict[str, Any]) -> None:
+    name, a, blk = ev["event"], ev["args"], ev["blockNumber"]
+    sid = int(a["surveyId"])
+    if name == "Submitted":
+        OnchainSurvey.objects.update_or_create(
+            survey_id=sid,
+            defaults={
+                "project_id": int(a["projectId"]),
+                "ipfs_cid": a["ipfsCid"],
+                "checksum": a["checksum"],
+                "status": 1,
+                "submitter": a["actor"],
+                "submitted_block": blk,
+                "updated_block": blk,
+            },
+        )
+    elif name in ("Approved", "Rejected"):
+        row, _ = OnchainSurvey.objects.get_or_create(survey_id=sid)
+        OnchainSurvey.objects.filter(pk=row.pk).update(status=_STATUS[name], updated_block=blk)
+    elif name == "FileAttached":
+        _, created = OnchainFileHash.objects.get_or_create(
+            tx_hash=ev["transactionHash"],
+            log_index=ev["logIndex"],
+            defaults={"survey_id": sid, "checksum": _hex(a["checksum"]), "block_number": blk},
+        )
+        if created:
+            OnchainSurvey.objects.get_or_create(survey_id=sid)
+            OnchainSurvey.objects.filter(survey_id=sid).update(file_hash_count=F("file_hash_count") + 1, updated_block=blk)
+    elif name in ("FileChunk", "EncryptedChunkStored"):
+        encrypted = name == "EncryptedChunkStored"
+        index = int(a["index"])
+        OnchainChunk.objects.update_or_create(
+            survey_id=sid,
+            encrypted=encrypted,
+            index=index,
+            defaults={
+                "size": int(a["size"]),
+                "chunk_hash": _hex(a["chunkHash"]),
+                "pointer": a.get("pointer", "") if encrypted else "",
+                "block_number": blk,
+                "tx_hash": ev["transactionHash"],
+            },
+        )
+        OnchainSurvey.objects.get_or_create(survey_id=sid)
+        field = "enc_chunk_count" if encrypted else "chunk_count"
+        OnchainSurvey.objects.filter(survey_id=sid).update(**{field: Greatest(F(field), index + 1), "updated_block": blk})
+
+
+def sync(max_ranges: int = 10) -> Tuple[int, int]:
+    """Index up to `max_ranges` block ranges. Returns (events applied, last indexed block)."""
+    from .eth import get_block_number, get_contract_events
+
+    address = _contract_address()
+    if not address:
+        raise RuntimeError("Ethereum not configured (missing contract)")
+    cp, _ = IndexerCheckpoint.objects.get_or_create(contract_address=address, defaults={"last_block": START_BLOCK - 1})
+    head = get_block_number()
+    target = head - (CONFIRMATIONS - 1)
+    applied = 0
+    for _ in range(max(1, max_ranges)):
+        start = cp.last_block + 1
+        if start > target:
+            break
+        end = min(target, start + BLOCK_RANGE - 1)
+        events = get_contract_events(start, end)
+        with db_transaction.atomic():
+            for ev in events:
+                _apply(ev)
+            cp.last_block = end
+            cp.save(update_fields=["last_block", "updated_at"])
+        applied += len(events)
+    # Stored on every pass (even with nothing to index) so index_ready() sees a live head
+    cp.head_block = head
+    cp.save(update_fields=["head_block", "updated_at"])
+    return applied, cp.last_block
+
+
+def onchain_record(survey_id: int) -> Optional[Dict[str, Any]]:
+    """On-chain record dict (see `eth.get_onchain_record`), from the index when it is ready."""
+    if index_ready():
+        row = OnchainSurvey.objects.filter(survey_id=int(survey_id)).first()
+        return row.as_record() if row is not None else None
+    from .eth import get_onchain_record
+
+    return get_onchain_record(survey_id)
+
+
+def chunk_count(survey_id: int) -> int:
+    """Raw on-chain chunk count, from the index when it is ready."""
+    if index_ready():
+        row = OnchainSurvey.objects.filter(survey_id=int(survey_id)).only("chunk_count").first()
+        return row.chunk_count if row is not None else 0
+    from .eth import get_file_chunk_count
+
+    return get_file_chunk_count(survey_id)
+
+
+def enc_chunk_count(survey_id: int) -> int:
+    """Encrypted (SSTORE2) on-chain chunk count, from the index when it is ready."""
+    if index_ready():
+        row = OnchainSurvey.objects.filter(survey_id=int(survey_id)).only("enc_chunk_count").first()
+        return row.enc_chunk_count if row is not None else 0
+    from .eth import get_encrypted_chunk_count
+
+    return get_encrypted_chunk_count(survey_id)
+
+
+def survey_flags(survey_ids: Iterable[int]) -> Dict[int, Tuple[bool, int]]:
+    """Map survey id -> (has record, raw chunk count) with one query (or one chain read before indexing starts)."""
+    ids = [int(i) for i in survey_ids]
+    if index_ready():
+        rows = OnchainSurvey.objects.filter(survey_id__in=ids).only("survey_id", "submitter", "chunk_count")
+        return {r.survey_id: (r.has_record, r.chunk_count) for r in rows}
+    from .eth import get_survey_flags
+
+    return get_survey_flags(ids)
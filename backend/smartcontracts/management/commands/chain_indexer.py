@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from smartcontracts.indexer import sync
+
+
+class Command(BaseCommand):
+    help = "Index SurveyRegistry events (records, file hashes, chunk metadata) into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Catch up once and exit")
+        parser.add_argument("--ranges", type=int, default=10, help="Block ranges scanned per poll")
+        parser.add_argument("--interval", type=float, default=3.0, help="Seconds to sleep once caught up")
+
+    def handle(self, *args, **options):
+        ranges = max(1, int(options["ranges"]))
+        interval = max(0.1, float(options["interval"]))
+        while True:
+            try:
+                n, last = sync(ranges)
+            except Exception as e:
+                self.stderr.write(f"indexer: {e}")
+                n, last = 0, None
+            if n:
+                self.stdout.write(f"indexed {n} event(s) up to block {last}")
+            if options["once"]:
+                break
+            time.sleep(interval)
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from smartcontracts.eth import chain_context_stats, gas_model_stats
+from smartcontracts.outbox import process_pending
+
+
+class Command(BaseCommand):
+    help = "Drain the blockchain outbox: send queued chain writes and record their transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process due jobs once and exit")
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per poll")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        batch = max(1, int(options["batch"]))
+        interval = max(0.1, float(options["interval"]))
+        while True:
+            n = process_pending(batch)
+            if n:
+                self.stdout.write(f"processed {n} chain job(s)")
+                if options["verbosity"] >= 2:
+                    self.stdout.write(f"chain context cache: {chain_context_stats()}")
+                    self.stdout.write(f"gas model: {gas_model_stats()}")
+            if options["once"]:
+                break
+            if n < batch:
+                time.sleep(interval)
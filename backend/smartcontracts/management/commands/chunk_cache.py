@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from smartcontracts.chunkcache import get_cache
+
+
+class Command(BaseCommand):
+    help = "Show the size of the on-disk chunk cache, or clear it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="Delete every cached chunk")
+
+    def handle(self, *args, **options):
+        cache = get_cache()
+        if cache is None:
+            self.stdout.write("chunk cache disabled (CHUNK_CACHE_MB=0)")
+            return
+        if options["clear"]:
+            self.stdout.write(f"removed {cache.clear()} cached chunk(s)")
+            return
+        st = cache.stats()
+        self.stdout.write(f"{cache.root}: {st['entries']} chunk(s), {st['bytes']} of {st['max_bytes']} bytes")
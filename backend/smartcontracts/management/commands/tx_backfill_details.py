@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from smartcontracts.confirmer import backfill_details
+
+
+class Command(BaseCommand):
+    help = "Store gas used, fee and block timestamp on confirmed/reverted transactions that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process a single batch and exit")
+        parser.add_argument("--batch", type=int, default=500, help="Transactions per batched receipt request")
+
+    def handle(self, *args, **options):
+        batch = max(1, int(options["batch"]))
+        total = 0
+        while True:
+            n = backfill_details(batch)
+            total += n
+            if options["once"] or n < batch:
+                break
+        self.stdout.write(f"stored details on {total} transaction(s)")
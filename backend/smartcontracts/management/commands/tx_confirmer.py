@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from smartcontracts.confirmer import process_due
+
+
+class Command(BaseCommand):
+    help = "Poll receipts of recorded transactions and store block number, status and confirmation depth."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Check due transactions once and exit")
+        parser.add_argument("--batch", type=int, default=100, help="Transactions checked per poll (one batched RPC request)")
+        parser.add_argument("--interval", type=float, default=3.0, help="Seconds to sleep when nothing is due")
+
+    def handle(self, *args, **options):
+        batch = max(1, int(options["batch"]))
+        interval = max(0.1, float(options["interval"]))
+        while True:
+            n = process_due(batch)
+            if n:
+                self.stdout.write(f"checked {n} transaction(s)")
+            if options["once"]:
+                break
+            if n < batch:
+                time.sleep(interval)
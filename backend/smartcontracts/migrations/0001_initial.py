@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('surveys', '0005_survey_enc_chunk_size_survey_enc_scheme_and_more'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('op', models.CharField(choices=[('record_submission', 'recordSubmission'), ('mark_approved', 'markApproved'), ('mark_rejected', 'markRejected'), ('add_file_hash', 'addFileHash')], max_length=32)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], db_index=True, default='pending', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=8)),
+                ('next_attempt_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chain_jobs', to='surveys.survey')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chain_jobs', to='transactions.transaction')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartcontracts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chainjob',
+            name='op',
+            field=models.CharField(choices=[('record_submission', 'recordSubmission'), ('mark_approved', 'markApproved'), ('mark_rejected', 'markRejected'), ('add_file_hash', 'addFileHash'), ('add_file_hashes', 'addFileHashes')], max_length=32),
+        ),
+    ]
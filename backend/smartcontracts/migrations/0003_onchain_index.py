@@ -0,0 +1,78 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartcontracts', '0002_chainjob_add_file_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42, unique=True)),
+                ('last_block', models.BigIntegerField(default=-1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OnchainChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_id', models.BigIntegerField()),
+                ('encrypted', models.BooleanField(default=False)),
+                ('index', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('chunk_hash', models.CharField(help_text='keccak256 of the stored bytes (hex)', max_length=64)),
+                ('pointer', models.CharField(blank=True, max_length=42)),
+                ('block_number', models.BigIntegerField()),
+                ('tx_hash', models.CharField(max_length=66)),
+            ],
+            options={
+                'ordering': ['survey_id', 'encrypted', 'index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OnchainFileHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_id', models.BigIntegerField(db_index=True)),
+                ('checksum', models.CharField(max_length=64)),
+                ('block_number', models.BigIntegerField()),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['block_number', 'log_index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OnchainSurvey',
+            fields=[
+                ('survey_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('project_id', models.BigIntegerField(blank=True, null=True)),
+                ('ipfs_cid', models.CharField(blank=True, max_length=255)),
+                ('checksum', models.CharField(blank=True, max_length=128)),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'None'), (1, 'Submitted'), (2, 'Approved'), (3, 'Rejected')], default=0)),
+                ('submitter', models.CharField(blank=True, max_length=42)),
+                ('chunk_count', models.PositiveIntegerField(default=0)),
+                ('enc_chunk_count', models.PositiveIntegerField(default=0)),
+                ('file_hash_count', models.PositiveIntegerField(default=0)),
+                ('submitted_block', models.BigIntegerField(blank=True, null=True)),
+                ('updated_block', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='onchainchunk',
+            constraint=models.UniqueConstraint(fields=('survey_id', 'encrypted', 'index'), name='uniq_onchain_chunk'),
+        ),
+        migrations.AddConstraint(
+            model_name='onchainfilehash',
+            constraint=models.UniqueConstraint(fields=('tx_hash', 'log_index'), name='uniq_onchain_file_hash_log'),
+        ),
+    ]
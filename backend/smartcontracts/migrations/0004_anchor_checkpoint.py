@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartcontracts', '0003_onchain_index'),
+        ('surveys', '0009_survey_file_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnchorCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_checksum', models.CharField(blank=True, max_length=64)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('chunks_per_tx', models.PositiveIntegerField(default=1)),
+                ('total_chunks', models.PositiveIntegerField(default=0)),
+                ('sent_chunks', models.PositiveIntegerField(default=0)),
+                ('confirmed_chunks', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('running', 'running'), ('failed', 'failed'), ('complete', 'complete')], db_index=True, default='running', max_length=16)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='anchor_checkpoint', to='surveys.survey')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnchorRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_index', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField()),
+                ('tx_hash', models.CharField(max_length=66, unique=True)),
+                ('block_number', models.BigIntegerField(blank=True, null=True)),
+                ('confirmed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranges', to='smartcontracts.anchorcheckpoint')),
+            ],
+            options={
+                'ordering': ['checkpoint', 'start_index', 'id'],
+            },
+        ),
+    ]
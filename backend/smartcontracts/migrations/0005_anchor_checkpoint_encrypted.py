@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartcontracts', '0004_anchor_checkpoint'),
+        ('surveys', '0009_survey_file_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anchorcheckpoint',
+            name='encrypted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='anchorcheckpoint',
+            name='survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anchor_checkpoints', to='surveys.survey'),
+        ),
+        migrations.AddConstraint(
+            model_name='anchorcheckpoint',
+            constraint=models.UniqueConstraint(fields=('survey', 'encrypted'), name='uniq_anchor_checkpoint'),
+        ),
+    ]
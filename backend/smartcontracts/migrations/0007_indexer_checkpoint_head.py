@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartcontracts', '0006_anchor_checkpoint_codec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexercheckpoint',
+            name='head_block',
+            field=models.BigIntegerField(default=-1),
+        ),
+    ]
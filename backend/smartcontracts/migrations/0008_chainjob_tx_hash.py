@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartcontracts', '0007_indexer_checkpoint_head'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chainjob',
+            name='tx_hash',
+            field=models.CharField(blank=True, default='', max_length=66),
+        ),
+    ]
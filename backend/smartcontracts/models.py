@@ -0,0 +1,169 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ChainJob(models.Model):
+    """Outbox row for a blockchain write; executed by the `chain_worker` command."""
+
+    OP_CHOICES = [
+        ("record_submission", "recordSubmission"),
+        ("mark_approved", "markApproved"),
+        ("mark_rejected", "markRejected"),
+        ("add_file_hash", "addFileHash"),
+        ("add_file_hashes", "addFileHashes"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "pending"),
+        ("running", "running"),
+        ("done", "done"),
+        ("failed", "failed"),
+    ]
+
+    survey = models.ForeignKey("surveys.Survey", on_delete=models.CASCADE, related_name="chain_jobs")
+    op = models.CharField(max_length=32, choices=OP_CHOICES)
+    args = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending", db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=8)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    # Hash of the last broadcast, saved before its receipt is awaited so a rerun can check it instead of resending
+    tx_hash = models.CharField(max_length=66, blank=True, default="")
+    transaction = models.ForeignKey("transactions.Transaction", null=True, blank=True, on_delete=models.SET_NULL, related_name="chain_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"{self.op}#{self.pk} ({self.status})"
+
+
+class IndexerCheckpoint(models.Model):
+    """Last block whose SurveyRegistry events have been indexed, per contract address."""
+
+    contract_address = models.CharField(max_length=42, unique=True)
+    last_block = models.BigIntegerField(default=-1)
+    # Chain head seen by the latest sync(); the index is only trusted close to it
+    head_block = models.BigIntegerField(default=-1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.contract_address}@{self.last_block}"
+
+
+class OnchainSurvey(models.Model):
+    """Indexed on-chain state of one survey (from Submitted/Approved/Rejected and chunk events)."""
+
+    STATUS_CHOICES = [(0, "None"), (1, "Submitted"), (2, "Approved"), (3, "Rejected")]
+
+    # Chain-side survey id; not a FK so records outlive (or predate) the DB row
+    survey_id = models.BigIntegerField(primary_key=True)
+    project_id = models.BigIntegerField(null=True, blank=True)
+    ipfs_cid = models.CharField(max_length=255, blank=True)
+    checksum = models.CharField(max_length=128, blank=True)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=0)
+    submitter = models.CharField(max_length=42, blank=True)
+    chunk_count = models.PositiveIntegerField(default=0)
+    enc_chunk_count = models.PositiveIntegerField(default=0)
+    file_hash_count = models.PositiveIntegerField(default=0)
+    submitted_block = models.BigIntegerField(null=True, blank=True)
+    updated_block = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def has_record(self) -> bool:
+        return bool(self.submitter) and int(self.submitter, 16) != 0
+
+    def as_record(self) -> dict:
+        """Same shape as `eth.get_onchain_record`."""
+        return {
+            "projectId": self.project_id,
+            "ipfsCid": self.ipfs_cid,
+            "checksum": self.checksum,
+            "status": self.status,
+            "submitter": self.submitter or "0x0000000000000000000000000000000000000000",
+        }
+
+
+class OnchainFileHash(models.Model):
+    survey_id = models.BigIntegerField(db_index=True)
+    checksum = models.CharField(max_length=64)
+    block_number = models.BigIntegerField()
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["block_number", "log_index"]
+        constraints = [models.UniqueConstraint(fields=["tx_hash", "log_index"], name="uniq_onchain_file_hash_log")]
+
+
+class OnchainChunk(models.Model):
+    """Metadata of one raw (FileChunk) or encrypted (EncryptedChunkStored) chunk."""
+
+    survey_id = models.BigIntegerField()
+    encrypted = models.BooleanField(default=False)
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    chunk_hash = models.CharField(max_length=64, help_text="keccak256 of the stored bytes (hex)")
+    pointer = models.CharField(max_length=42, blank=True)
+    block_number = models.BigIntegerField()
+    tx_hash = models.CharField(max_length=66)
+
+    class Meta:
+        ordering = ["survey_id", "encrypted", "index"]
+        constraints = [models.UniqueConstraint(fields=["survey_id", "encrypted", "index"], name="uniq_onchain_chunk")]
+
+
+class AnchorCheckpoint(models.Model):
+    """Progress of storing one survey file as on-chain chunks, so a failed run can resume.
+
+    The chunk size is fixed by the first run; a resume reuses it so indexes line up.
+    """
+
+    STATUS_CHOICES = [
+        ("running", "running"),
+        ("failed", "failed"),
+        ("complete", "complete"),
+    ]
+
+    survey = models.ForeignKey("surveys.Survey", on_delete=models.CASCADE, related_name="anchor_checkpoints")
+    # Raw chunks (addFileChunks) or AES-GCM payloads in SSTORE2 pointers (addEncryptedChunks)
+    encrypted = models.BooleanField(default=False)
+    # Compression codec of the raw chunks ("" = uncompressed); fixed by the first run like the chunk size
+    codec = models.CharField(max_length=8, blank=True, default="")
+    file_checksum = models.CharField(max_length=64, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    chunk_size = models.PositiveIntegerField()
+    chunks_per_tx = models.PositiveIntegerField(default=1)
+    total_chunks = models.PositiveIntegerField(default=0)
+    # Chunks covered by broadcast transactions / by mined ones (both count from index 0)
+    sent_chunks = models.PositiveIntegerField(default=0)
+    confirmed_chunks = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="running", db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["survey", "encrypted"], name="uniq_anchor_checkpoint")]
+
+    def __str__(self) -> str:
+        kind = "encrypted" if self.encrypted else "raw"
+        return f"survey {self.survey_id} {kind}: {self.confirmed_chunks}/{self.total_chunks} ({self.status})"
+
+
+class AnchorRange(models.Model):
+    """Chunk indexes [start_index, start_index + count) carried by one addFileChunks transaction."""
+
+    checkpoint = models.ForeignKey(AnchorCheckpoint, on_delete=models.CASCADE, related_name="ranges")
+    start_index = models.PositiveIntegerField()
+    count = models.PositiveIntegerField()
+    tx_hash = models.CharField(max_length=66, unique=True)
+    block_number = models.BigIntegerField(null=True, blank=True)
+    confirmed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["checkpoint", "start_index", "id"]
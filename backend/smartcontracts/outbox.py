@@ -0,0 +1,234 @@
+"""Durable outbox for blockchain writes.
+
+Request handlers call `enqueue()` inside their DB transaction and return immediately;
+the `chain_worker` management command drains the queue, sends the transactions and
+records a `Transaction` row for each completed job. Failures are retried with
+exponential backoff until `max_attempts` is reached. A job's transaction hash is
+stored as soon as it is broadcast, so a rerun (a retry, or a lease reclaimed from a
+dead worker) checks that transaction instead of sending the write a second time.
+"""
+import os
+from datetime import timedelta
+from typing import Callable, Optional, Tuple
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChainJob
+
+try:
+    BACKOFF_BASE = float(os.getenv("CHAIN_JOB_BACKOFF_SECONDS", "5") or 5)
+except Exception:
+    BACKOFF_BASE = 5.0
+try:
+    BACKOFF_CAP = float(os.getenv("CHAIN_JOB_BACKOFF_CAP_SECONDS", "900") or 900)
+except Exception:
+    BACKOFF_CAP = 900.0
+try:
+    # A job left 'running' longer than this is assumed orphaned by a dead worker
+    LEASE_SECONDS = int(os.getenv("CHAIN_JOB_LEASE_SECONDS", "300") or 300)
+except Exception:
+    LEASE_SECONDS = 300
+try:
+    # How long recordSubmission waits for background IPFS pinning to supply a CID
+    WAIT_FOR_CID_SECONDS = int(os.getenv("CHAIN_WAIT_FOR_CID_SECONDS", "600") or 600)
+except Exception:
+    WAIT_FOR_CID_SECONDS = 600
+
+
+class Deferred(Exception):
+    """Raised by a handler whose preconditions are not met yet; retried without counting an attempt."""
+
+    def __init__(self, reason: str, delay: float = 15.0):
+        super().__init__(reason)
+        self.delay = delay
+
+
+OnSent = Callable[[str], None]
+
+
+def _record_submission(job: ChainJob, on_sent: OnSent) -> Tuple[str, Optional[int]]:
+    from .eth import record_submission
+    s = job.survey
+    if not s.ipfs_cid and s.ipfs_pin_status == "pending" and (timezone.now() - job.created_at).total_seconds() < WAIT_FOR_CID_SECONDS:
+        raise Deferred("waiting for IPFS pin to supply the CID")
+    # Resolved at run time so the latest CID/checksum is anchored
+    return record_submission(s.id, s.project_id, s.ipfs_cid or "", s.checksum_sha256 or "", on_sent=on_sent)
+
+
+def _mark_approved(job: ChainJob, on_sent: OnSent) -> Tuple[str, Optional[int]]:
+    from .eth import mark_approved
+    return mark_approved(job.survey_id, on_sent=on_sent)
+
+
+def _mark_rejected(job: ChainJob, on_sent: OnSent) -> Tuple[str, Optional[int]]:
+    from .eth import mark_rejected
+    return mark_rejected(job.survey_id, on_sent=on_sent)
+
+
+def _add_file_hash(job: ChainJob, on_sent: OnSent) -> Tuple[str, Optional[int]]:
+    from .eth import add_file_hash
+    return add_file_hash(job.survey_id, str(job.args[0]), on_sent=on_sent)
+
+
+def _add_file_hashes(job: ChainJob, on_sent: OnSent) -> Tuple[str, Optional[int]]:
+    from .eth import add_file_hashes
+    return add_file_hashes(job.survey_id, [str(h) for h in job.args], on_sent=on_sent)
+
+
+def _link_file_hashes(job: ChainJob, tx) -> None:
+    from surveys.models import SurveyFileHash
+
+    SurveyFileHash.objects.filter(
+        survey_id=job.survey_id, checksum_sha256__in=[str(h) for h in job.args], transaction__isnull=True
+    ).update(transaction=tx)
+
+
+HANDLERS: dict[str, Callable[[ChainJob, OnSent], Tuple[str, Optional[int]]]] = {
+    "record_submission": _record_submission,
+    "mark_approved": _mark_approved,
+    "mark_rejected": _mark_rejected,
+    "add_file_hash": _add_file_hash,
+    "add_file_hashes": _add_file_hashes,
+}
+
+# Bookkeeping run in the same DB transaction as the job's Transaction row
+ON_DONE: dict[str, Callable[[ChainJob, object], None]] = {
+    "add_file_hash": _link_file_hashes,
+    "add_file_hashes": _link_file_hashes,
+}
+
+
+def enqueue(survey, op: str, *args) -> ChainJob:
+    """Queue a chain write for a survey. Becomes visible to workers when the caller's transaction commits."""
+    if op not in HANDLERS:
+        raise ValueError(f"Unknown chain operation: {op}")
+    return ChainJob.objects.create(survey=survey, op=op, args=list(args))
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(BACKOFF_CAP, BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+
+
+def claim_jobs(limit: int = 10) -> list[ChainJob]:
+    """Lock and mark up to `limit` due jobs as running.
+
+    Jobs for one survey run strictly in enqueue order (addFileHash requires the
+    submission to exist on-chain), so a job is skipped while an older job for the
+    same survey is still unfinished. Once an older job has failed for good, the
+    later ones can never run either: they are marked failed with that cause.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    claimed: list[ChainJob] = []
+    with db_transaction.atomic():
+        due = (
+            ChainJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status="pending", next_attempt_at__lte=now) | Q(status="running", updated_at__lt=stale))
+            .order_by("id")[: limit * 4]
+        )
+        blocked: set[int] = set()
+        for job in due:
+            if len(claimed) >= limit:
+                break
+            if job.survey_id in blocked:
+                continue
+            earlier = (
+                ChainJob.objects.filter(survey_id=job.survey_id, id__lt=job.id, status__in=("pending", "running", "failed"))
+                .order_by("id")
+                .first()
+            )
+            if earlier is not None and earlier.status == "failed":
+                job.status = "failed"
+                job.last_error = f"earlier {earlier.op} job {earlier.id} failed: {earlier.last_error}"[:2000]
+                job.save(update_fields=["status", "last_error", "updated_at"])
+                continue
+            if earlier is not None:
+                blocked.add(job.survey_id)
+                continue
+            job.status = "running"
+            job.attempts += 1
+            job.save(update_fields=["status", "attempts", "updated_at"])
+            blocked.add(job.survey_id)
+            claimed.append(job)
+    return claimed
+
+
+def _sent(job: ChainJob, txh: str) -> None:
+    job.tx_hash = txh
+    job.save(update_fields=["tx_hash", "updated_at"])
+
+
+def _earlier_send(job: ChainJob) -> Optional[Tuple[str, Optional[int]]]:
+    """(tx_hash, block) when the job's previous broadcast already succeeded, else None to send.
+
+    Raises `Deferred` while that transaction is still pending.
+    """
+    from .eth import get_tx_known, get_tx_receipts
+
+    txh = job.tx_hash
+    rc = get_tx_receipts([txh]).get(txh)
+    if rc is not None and rc.get("status") == 1:
+        return txh, rc.get("blockNumber")
+    if rc is None and get_tx_known([txh]).get(txh):
+        raise Deferred(f"waiting for earlier transaction {txh}", delay=30.0)
+    # Reverted or dropped: nothing was written, so it is sent again
+    return None
+
+
+def run_job(job: ChainJob) -> bool:
+    """Execute one claimed job. Returns True on success; failures are rescheduled or marked failed."""
+    from transactions.models import Transaction
+
+    from .eth import ReceiptPending
+
+    handler = HANDLERS.get(job.op)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown chain operation: {job.op}")
+        done = _earlier_send(job) if job.tx_hash else None
+        try:
+            txh, blk = done if done is not None else handler(job, lambda h: _sent(job, h))
+        except ReceiptPending as e:
+            # Sent and stored in job.tx_hash: the next run checks it instead of resending
+            raise Deferred(str(e), delay=30.0)
+    except Deferred as d:
+        job.status = "pending"
+        job.attempts = max(0, job.attempts - 1)
+        job.last_error = str(d)
+        job.next_attempt_at = timezone.now() + timedelta(seconds=d.delay)
+        job.save(update_fields=["status", "attempts", "last_error", "next_attempt_at", "updated_at"])
+        return False
+    except Exception as e:
+        job.last_error = str(e)[:2000]
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+        else:
+            job.status = "pending"
+            job.next_attempt_at = timezone.now() + timedelta(seconds=backoff_seconds(job.attempts))
+        job.save(update_fields=["status", "last_error", "next_attempt_at", "updated_at"])
+        return False
+    with db_transaction.atomic():
+        tx = Transaction.objects.create(
+            survey_id=job.survey_id,
+            public_anchor_tx_hash=txh,
+            public_block_number=blk,
+            private_tx_hash=txh,
+        )
+        on_done = ON_DONE.get(job.op)
+        if on_done is not None:
+            on_done(job, tx)
+        job.transaction = tx
+        job.status = "done"
+        job.last_error = ""
+        job.save(update_fields=["transaction", "status", "last_error", "updated_at"])
+    return True
+
+
+def process_pending(limit: int = 10) -> int:
+    """Claim and run up to `limit` due jobs. Returns how many were attempted."""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
@@ -0,0 +1,170 @@
+"""Gas-aware chunk packing for raw on-chain file storage.
+
+`plan_chunks()` picks the chunk size and the number of chunks per
+``addFileChunks`` transaction so that each transaction uses about
+``CHUNK_FILL_RATIO`` of the live block gas limit. Gas is modelled as a per-tx
+base, a per-chunk overhead (array slot, keccak, ``FileChunk`` event) and a
+per-byte storage cost; once the gas model has learned ``addFileChunks`` from our
+own receipts, its observed per-byte rate replaces the configured one.
+
+Encrypted chunks (``addEncryptedChunks``) are written as SSTORE2 contract code:
+cheaper per byte, a contract creation per chunk, and at most
+``SSTORE2_MAX_BYTES`` per payload.
+
+Compressed frames vary in size, so `group_payloads()` packs the actual payloads
+into transactions under the gas of a planned full transaction.
+"""
+import math
+import os
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+try:
+    FILL_RATIO = min(0.95, max(0.05, float(os.getenv("CHUNK_FILL_RATIO", "0.85") or 0.85)))
+except Exception:
+    FILL_RATIO = 0.85
+try:
+    # Upper bound for a single stored chunk (reads fetch one chunk per eth_call)
+    MAX_CHUNK_BYTES = max(1, int(os.getenv("RAW_CHUNK_KB", "24") or 24)) * 1024
+except Exception:
+    MAX_CHUNK_BYTES = 24 * 1024
+try:
+    # Optional cap on chunks per transaction; 0 lets the gas budget decide
+    MAX_PAYLOADS_PER_TX = max(0, int(os.getenv("MAX_PAYLOADS_PER_TX", "0") or 0))
+except Exception:
+    MAX_PAYLOADS_PER_TX = 0
+try:
+    GAS_PER_BYTE = float(os.getenv("CHUNK_GAS_PER_BYTE", "720") or 720)
+except Exception:
+    GAS_PER_BYTE = 720.0
+try:
+    GAS_PER_CHUNK = int(os.getenv("CHUNK_GAS_PER_CHUNK", "50000") or 50000)
+except Exception:
+    GAS_PER_CHUNK = 50_000
+try:
+    ENC_GAS_PER_BYTE = float(os.getenv("ENC_CHUNK_GAS_PER_BYTE", "230") or 230)
+except Exception:
+    ENC_GAS_PER_BYTE = 230.0
+try:
+    ENC_GAS_PER_CHUNK = int(os.getenv("ENC_CHUNK_GAS_PER_CHUNK", "65000") or 65000)
+except Exception:
+    ENC_GAS_PER_CHUNK = 65_000
+# Intrinsic cost plus call dispatch and the survey lookup
+GAS_PER_TX = 30_000
+DEFAULT_BLOCK_GAS_LIMIT = 30_000_000
+# EIP-170 code size limit minus the STOP byte SSTORE2 prepends
+SSTORE2_MAX_BYTES = 24_575
+
+
+def _profile(fn_name: str) -> Tuple[int, float, int]:
+    """(gas per chunk, configured gas per byte, largest payload) for a chunk-storing function."""
+    if fn_name == "addEncryptedChunks":
+        return ENC_GAS_PER_CHUNK, ENC_GAS_PER_BYTE, SSTORE2_MAX_BYTES
+    return GAS_PER_CHUNK, GAS_PER_BYTE, MAX_CHUNK_BYTES
+
+
+class ChunkPlan(NamedTuple):
+    chunk_size: int
+    chunks_per_tx: int
+    chunk_count: int
+    tx_count: int
+    gas_per_tx: int
+    expected_gas: int
+    block_gas_limit: int
+    fill_ratio: float
+    gas_per_byte: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+def tx_gas(chunks: int, nbytes: int, per_byte: float, per_chunk: int = GAS_PER_CHUNK) -> int:
+    return int(GAS_PER_TX + chunks * per_chunk + nbytes * per_byte)
+
+
+def plan_chunks(
+    total_bytes: int,
+    block_gas_limit: Optional[int] = None,
+    fill_ratio: Optional[float] = None,
+    fn_name: str = "addFileChunks",
+    overhead: int = 0,
+) -> ChunkPlan:
+    """Chunk size and chunks per transaction for storing `total_bytes` bytes through `fn_name`.
+
+    `overhead` is the number of bytes each stored payload adds to its chunk (e.g. nonce and tag).
+    """
+    from . import eth
+
+    if block_gas_limit is None:
+        try:
+            block_gas_limit = eth.block_gas_limit()
+        except Exception:
+            block_gas_limit = DEFAULT_BLOCK_GAS_LIMIT
+    fill = FILL_RATIO if fill_ratio is None else min(0.95, max(0.05, fill_ratio))
+    per_chunk, per_byte, max_payload = _profile(fn_name)
+    per_byte = max(per_byte, eth.gas_rate(fn_name, GAS_PER_TX) or 0.0)
+    max_chunk = max(1, min(MAX_CHUNK_BYTES, max_payload - overhead))
+    budget = int(block_gas_limit * fill)
+    # Bytes one transaction can carry with a single chunk, then split into equal chunks
+    # no larger than max_chunk (each extra chunk costs its overhead from the budget)
+    payload = max(1, int((budget - GAS_PER_TX - per_chunk) / per_byte) - overhead)
+    per_tx = max(1, math.ceil(payload / max_chunk))
+    if MAX_PAYLOADS_PER_TX:
+        per_tx = min(per_tx, MAX_PAYLOADS_PER_TX)
+    payload = max(per_tx, int((budget - GAS_PER_TX - per_tx * per_chunk) / per_byte) - per_tx * overhead)
+    chunk_size = max(1, min(max_chunk, payload // per_tx))
+
+    def gas(chunks: int, nbytes: int) -> int:
+        return tx_gas(chunks, nbytes + chunks * overhead, per_byte, per_chunk)
+
+    total = max(0, int(total_bytes))
+    chunk_count = math.ceil(total / chunk_size)
+    tx_count = math.ceil(chunk_count / per_tx)
+    expected = 0
+    if tx_count:
+        full = tx_count - 1
+        last_chunks = chunk_count - full * per_tx
+        expected = full * gas(per_tx, per_tx * chunk_size)
+        expected += gas(last_chunks, total - full * per_tx * chunk_size)
+    return ChunkPlan(
+        chunk_size=chunk_size,
+        chunks_per_tx=per_tx,
+        chunk_count=chunk_count,
+        tx_count=tx_count,
+        gas_per_tx=gas(per_tx, per_tx * chunk_size),
+        expected_gas=expected,
+        block_gas_limit=int(block_gas_limit),
+        fill_ratio=fill,
+        gas_per_byte=round(per_byte, 2),
+    )
+
+
+def group_payloads(
+    payloads: Iterable[bytes],
+    chunk_size: int,
+    chunks_per_tx: int,
+    fn_name: str = "addFileChunks",
+    overhead: int = 0,
+) -> Iterator[list]:
+    """Batch stored payloads into calls that cost no more gas than a planned full transaction.
+
+    With full-size payloads this yields `chunks_per_tx` per batch; smaller (compressed)
+    payloads are packed more densely, up to ``MAX_PAYLOADS_PER_TX`` when set.
+    """
+    from . import eth
+
+    per_chunk, per_byte, _ = _profile(fn_name)
+    per_byte = max(per_byte, eth.gas_rate(fn_name, GAS_PER_TX) or 0.0)
+    budget = tx_gas(chunks_per_tx, chunks_per_tx * (chunk_size + overhead), per_byte, per_chunk)
+    batch: list = []
+    nbytes = 0
+    for p in payloads:
+        if batch and (
+            tx_gas(len(batch) + 1, nbytes + len(p), per_byte, per_chunk) > budget
+            or (MAX_PAYLOADS_PER_TX and len(batch) >= MAX_PAYLOADS_PER_TX)
+        ):
+            yield batch
+            batch, nbytes = [], 0
+        batch.append(p)
+        nbytes += len(p)
+    if batch:
+        yield batch
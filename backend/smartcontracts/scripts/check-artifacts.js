@@ -0,0 +1,46 @@
+// Fails when the committed build output no longer matches the contract sources:
+// a source whose hash differs from the Hardhat compile cache, or an exported ABI
+// that differs from the compiled artifact. Plain Node, no compiler needed, so it
+// can run in CI next to the backend. Fix with `npm run build` and commit the result.
+import crypto from "crypto";
+import fs from "fs/promises";
+import path from "path";
+import { fileURLToPath } from "url";
+
+const root = path.resolve(path.dirname(fileURLToPath(import.meta.url)), "..");
+const artifactFile = path.join(root, "artifacts/contracts/SurveyRegistry.sol/SurveyRegistry.json");
+const abiCopies = [
+  path.join(root, "abi/survey_registry.json"),
+  path.resolve(root, "../../frontend/src/abi/survey_registry.json"),
+];
+
+async function main() {
+  const problems = [];
+  const cache = JSON.parse(await fs.readFile(path.join(root, "cache/solidity-files-cache.json"), "utf8"));
+  for (const entry of Object.values(cache.files)) {
+    // Hardhat's contentHash is the MD5 of the source file
+    const source = await fs.readFile(path.join(root, entry.sourceName));
+    const hash = crypto.createHash("md5").update(source).digest("hex");
+    if (hash !== entry.contentHash) {
+      problems.push(`${entry.sourceName} changed since the artifacts were compiled`);
+    }
+  }
+  const abi = JSON.stringify(JSON.parse(await fs.readFile(artifactFile, "utf8")).abi);
+  for (const file of abiCopies) {
+    const copy = JSON.stringify(JSON.parse(await fs.readFile(file, "utf8")));
+    if (copy !== abi) {
+      problems.push(`${path.relative(root, file)} does not match the compiled ABI`);
+    }
+  }
+  if (problems.length) {
+    console.error(problems.join("\n"));
+    console.error("Run `npm run build` and commit artifacts/, cache/ and the exported ABI files.");
+    process.exit(1);
+  }
+  console.log("Artifacts and ABI exports are up to date.");
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
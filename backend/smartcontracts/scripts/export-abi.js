@@ -9,11 +9,13 @@ const __dirname = path.dirname(__filename);
 async function main() {
   const artifact = await hre.artifacts.readArtifact("SurveyRegistry");
   const abi = artifact.abi;
-  const outDir = path.resolve(__dirname, "../abi");
-  const outFile = path.join(outDir, "survey_registry.json");
-  await fs.mkdir(outDir, { recursive: true });
-  await fs.writeFile(outFile, JSON.stringify(abi, null, 2) + "\n");
-  console.log("ABI exported to:", outFile);
+  const outDirs = [path.resolve(__dirname, "../abi"), path.resolve(__dirname, "../../../frontend/src/abi")];
+  for (const outDir of outDirs) {
+    const outFile = path.join(outDir, "survey_registry.json");
+    await fs.mkdir(outDir, { recursive: true });
+    await fs.writeFile(outFile, JSON.stringify(abi, null, 2) + "\n");
+    console.log("ABI exported to:", outFile);
+  }
 }
 
 main().catch((e) => {
@@ -0,0 +1,123 @@
+"""In-process eth-tester chain for the contract tests.
+
+`ChainTestCase` deploys the compiled SurveyRegistry artifact on an
+``EthereumTesterProvider``, serves that chain over a local JSON-RPC endpoint so the
+async read client (``ETH_RPC_URL``) sees the same state as the sync writer, and
+points `smartcontracts.eth` at both. Needs the optional ``eth-tester[py-evm]``
+package; tests are skipped without it.
+"""
+import hashlib
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from eth_account import Account
+from web3 import Web3
+from web3._utils.encoding import Web3JsonEncoder
+
+from smartcontracts import eth
+
+try:
+    from web3 import EthereumTesterProvider
+    import eth_tester  # noqa: F401
+except ImportError:  # pragma: no cover - optional test dependency
+    EthereumTesterProvider = None
+
+ROOT = eth.BASE_DIR / "smartcontracts"
+ARTIFACT = ROOT / "artifacts" / "contracts" / "SurveyRegistry.sol" / "SurveyRegistry.json"
+CACHE = ROOT / "cache" / "solidity-files-cache.json"
+
+
+def load_artifact() -> dict:
+    with open(ARTIFACT) as f:
+        return json.load(f)
+
+
+def stale_sources() -> list[str]:
+    """Contract sources changed since the artifacts were compiled (same check as ``npm run check:artifacts``)."""
+    with open(CACHE) as f:
+        cache = json.load(f)
+    stale = []
+    for entry in cache["files"].values():
+        with open(ROOT / entry["sourceName"], "rb") as f:
+            if hashlib.md5(f.read()).hexdigest() != entry["contentHash"]:
+                stale.append(entry["sourceName"])
+    return stale
+
+
+def skip_unless_compiled(*fn_names: str):
+    """Skip a test that needs the current contract sources compiled into the artifact."""
+    abi = {item.get("name") for item in load_artifact()["abi"]}
+    missing = [n for n in fn_names if n not in abi]
+    stale = stale_sources()
+    reason = "compiled artifact is stale (%s); run `npm run build`" % ", ".join(missing + stale)
+    return unittest.skipIf(missing or stale, reason)
+
+
+class RpcServer:
+    """Serve `provider` over HTTP JSON-RPC (single and batch requests), counting calls per method."""
+
+    def __init__(self, provider) -> None:
+        w3 = Web3(provider)
+        request = provider.request_func(w3, w3.middleware_onion)
+        self.calls: list[str] = []
+        lock = threading.Lock()
+        server = self
+
+        def one(req: dict) -> dict:
+            with lock:
+                server.calls.append(req["method"])
+                try:
+                    resp = dict(request(req["method"], req.get("params", [])))
+                except Exception as e:
+                    resp = {"error": {"code": -32000, "message": str(e)}}
+            resp.update(id=req.get("id"), jsonrpc="2.0")
+            return resp
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                out = [one(r) for r in body] if isinstance(body, list) else one(body)
+                data = json.dumps(out, cls=Web3JsonEncoder).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@unittest.skipUnless(EthereumTesterProvider is not None, "eth-tester not installed")
+class ChainTestCase(unittest.TestCase):
+    def setUp(self):
+        provider = EthereumTesterProvider()
+        self.w3 = Web3(provider)
+        funder = self.w3.eth.accounts[0]
+        self.acct = Account.create()
+        self.w3.eth.send_transaction({"from": funder, "to": self.acct.address, "value": Web3.to_wei(100, "ether")})
+        art = load_artifact()
+        txh = self.w3.eth.contract(abi=art["abi"], bytecode=art["bytecode"]).constructor().transact({"from": funder})
+        self.address = self.w3.eth.wait_for_transaction_receipt(txh).contractAddress
+        self.rpc = RpcServer(provider)
+        self.addCleanup(self.rpc.close)
+        env = mock.patch.dict(os.environ, {"ETH_PRIVATE_KEY": self.acct.key.hex(), "ETH_CHAIN_ID": "", "ETH_RPC_URL": self.rpc.url})
+        env.start()
+        self.addCleanup(env.stop)
+        eth.use_web3(self.w3, self.address)
+        self.addCleanup(eth.use_web3, None)
+        self.contract = eth._get_contract()
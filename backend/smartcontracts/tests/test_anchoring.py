@@ -0,0 +1,58 @@
+"""One anchoring run per `AnchorCheckpoint` at a time."""
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from projects.models import Project
+from smartcontracts import anchoring, eth, packing
+from smartcontracts.anchoring import AnchorError, anchor_file
+from smartcontracts.models import AnchorCheckpoint
+from surveys.models import Survey
+
+
+class CheckpointClaimTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="mgr")
+        self.survey = Survey.objects.create(project=Project.objects.create(name="P"), title="t", submitted_by=user)
+        self.cp = AnchorCheckpoint.objects.create(survey=self.survey, chunk_size=10, total_chunks=4, sent_chunks=2, status="running")
+        read = mock.patch.object(eth, "get_file_chunk_count", side_effect=RuntimeError("rpc down"))
+        read.start()
+        self.addCleanup(read.stop)
+
+    def _anchor(self, resume: bool) -> AnchorError:
+        with self.assertRaises(AnchorError) as cm:
+            anchor_file(self.survey, io.BytesIO(b"x" * 40), 40, resume=resume)
+        return cm.exception
+
+    def _age(self, seconds: int) -> None:
+        AnchorCheckpoint.objects.filter(pk=self.cp.pk).update(updated_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_resume_of_a_running_checkpoint_is_refused(self):
+        self.assertEqual(self._anchor(resume=True).status_code, 409)
+        self.cp.refresh_from_db()
+        self.assertEqual((self.cp.status, self.cp.last_error), ("running", ""))
+
+    def test_fresh_run_over_a_running_checkpoint_is_refused(self):
+        plan = mock.Mock(chunk_size=10, chunks_per_tx=1, chunk_count=4)
+        with mock.patch.object(packing, "plan_chunks", return_value=plan):
+            self.assertEqual(self._anchor(resume=False).status_code, 409)
+        self.assertTrue(AnchorCheckpoint.objects.filter(pk=self.cp.pk, sent_chunks=2).exists())
+
+    def test_failed_checkpoint_is_claimed_and_given_back(self):
+        AnchorCheckpoint.objects.filter(pk=self.cp.pk).update(status="failed")
+        err = self._anchor(resume=True)
+        self.assertEqual(err.status_code, 502)
+        self.cp.refresh_from_db()
+        self.assertEqual(self.cp.status, "failed")
+        self.assertIn("rpc down", self.cp.last_error)
+
+    def test_a_stale_running_checkpoint_can_be_taken_over(self):
+        self._age(anchoring.LEASE_SECONDS + 1)
+        self.assertEqual(self._anchor(resume=True).status_code, 502)
+        self._age(anchoring.LEASE_SECONDS - 60)
+        AnchorCheckpoint.objects.filter(pk=self.cp.pk).update(status="running")
+        self.assertEqual(self._anchor(resume=True).status_code, 409)
@@ -0,0 +1,51 @@
+"""Per-survey ordering in `smartcontracts.outbox.claim_jobs` and job outcomes in `run_job`."""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from projects.models import Project
+from smartcontracts import eth, outbox
+from smartcontracts.models import ChainJob
+from surveys.models import Survey
+from transactions.models import Transaction
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="mgr")
+        self.survey = Survey.objects.create(project=Project.objects.create(name="P"), title="t", submitted_by=user)
+
+    def test_later_jobs_wait_for_an_unfinished_one(self):
+        first = outbox.enqueue(self.survey, "record_submission")
+        second = outbox.enqueue(self.survey, "mark_approved")
+        self.assertEqual([j.id for j in outbox.claim_jobs()], [first.id])
+        self.assertEqual(outbox.claim_jobs(), [])
+        second.refresh_from_db()
+        self.assertEqual(second.status, "pending")
+
+    def test_a_failed_job_fails_the_later_ones(self):
+        first = outbox.enqueue(self.survey, "record_submission")
+        second = outbox.enqueue(self.survey, "add_file_hash", "ab" * 32)
+        third = outbox.enqueue(self.survey, "mark_approved")
+        ChainJob.objects.filter(pk=first.pk).update(status="failed", last_error="recordSubmission transaction 0x01 reverted")
+        self.assertEqual(outbox.claim_jobs(), [])
+        for job in (second, third):
+            job.refresh_from_db()
+            self.assertEqual(job.status, "failed")
+            self.assertEqual(job.attempts, 0)
+        self.assertIn(f"earlier record_submission job {first.id} failed: recordSubmission transaction 0x01 reverted", second.last_error)
+
+    def test_a_receipt_timeout_leaves_the_job_pending(self):
+        job = outbox.enqueue(self.survey, "mark_approved")
+
+        def sent_but_not_mined(survey_id, on_sent=None):
+            on_sent("0xabc")
+            raise eth.ReceiptPending("markApproved", "0xabc")
+
+        with mock.patch.object(eth, "mark_approved", sent_but_not_mined):
+            claimed = outbox.claim_jobs()
+            self.assertFalse(outbox.run_job(claimed[0]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tx_hash, job.attempts), ("pending", "0xabc", 0))
+        self.assertFalse(Transaction.objects.exists())
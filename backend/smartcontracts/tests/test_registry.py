@@ -0,0 +1,55 @@
+"""SurveyRegistry calls through `smartcontracts.eth` against the compiled artifact.
+
+Runs on the in-process chain from `smartcontracts.tests.chain`; each test is skipped
+while the committed artifact predates the contract source it exercises.
+"""
+import os
+
+from smartcontracts import eth
+from smartcontracts.tests.chain import ChainTestCase, skip_unless_compiled
+
+
+class RegistryTests(ChainTestCase):
+    @skip_unless_compiled("addFileHashes")
+    def test_add_file_hashes_stores_every_hash(self):
+        eth.record_submission(1, 1, "cid", "ab" * 32)
+        hashes = ["%064x" % n for n in (1, 2, 3)]
+        h, blk = eth.add_file_hashes(1, hashes)
+        self.assertIsNotNone(blk)
+        stored = self.contract.functions.getFileHashes(1).call()
+        self.assertEqual([bytes(x).hex() for x in stored], hashes)
+        events = [e for e in eth.get_receipt_events([h]) if e["event"] == "FileAttached"]
+        self.assertEqual(len(events), 3)
+
+    @skip_unless_compiled("getSurveyFlags")
+    def test_survey_flags_in_one_call(self):
+        eth.record_submission(1, 1, "cid-1", "ab" * 32)
+        eth.add_file_chunks(1, [b"a", b"b"])
+        eth.record_submission(2, 1, "cid-2", "cd" * 32)
+        eth.mark_approved(2)
+        self.rpc.calls.clear()
+        flags = eth.get_survey_flags([1, 2, 99])
+        self.assertEqual(flags, {1: (True, 2), 2: (True, 0), 99: (False, 0)})
+        self.assertEqual(self.rpc.calls, ["eth_call"])
+
+    def test_sstore2_init_code_deploys_the_data(self):
+        # Same creation bytes as SSTORE2.write(): the runtime code must be 0x00 || data
+        data = os.urandom(300)
+        code = b"\x00" + data
+        creation = b"\x63" + len(code).to_bytes(4, "big") + bytes.fromhex("80600e6000396000f3") + code
+        txh = self.w3.eth.send_transaction({"from": self.w3.eth.accounts[0], "data": creation})
+        rc = self.w3.eth.wait_for_transaction_receipt(txh)
+        self.assertEqual(rc.status, 1)
+        self.assertEqual(bytes(self.w3.eth.get_code(rc.contractAddress)), code)
+
+    @skip_unless_compiled()
+    def test_encrypted_chunks_round_trip(self):
+        from surveys import encryption
+
+        key = os.urandom(32)
+        chunks = [os.urandom(1000) for _ in range(5)]
+        eth.record_submission(7, 1, "cid", "ab" * 32)
+        eth.add_encrypted_chunks(7, [encryption.encrypt_chunk(key, 7, i, c) for i, c in enumerate(chunks)])
+        self.assertEqual(eth.get_encrypted_chunk_count(7), 5)
+        payloads = eth.iter_chunks(7, list(range(5)), encrypted=True)
+        self.assertEqual([encryption.decrypt_chunk(key, 7, i, p) for i, p in enumerate(payloads)], chunks)
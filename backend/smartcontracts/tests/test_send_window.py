@@ -0,0 +1,81 @@
+"""Nonce manager and pipelined sends against an in-process eth-tester chain.
+
+Needs the optional ``eth-tester[py-evm]`` package; skipped without it.
+"""
+import os
+import threading
+from unittest import mock
+
+from web3 import Web3
+
+from smartcontracts import eth
+from smartcontracts.tests.chain import ChainTestCase
+
+
+class SendWindowTests(ChainTestCase):
+    def _chunk_count(self, survey_id: int) -> int:
+        return int(self.contract.functions.getFileChunkCount(survey_id).call())
+
+    def test_use_web3_does_not_touch_the_environment(self):
+        self.assertNotIn(self.address, os.environ.values())
+        self.assertEqual(eth.contract_address(), self.address)
+
+    def test_nonces_are_unique_across_threads(self):
+        manager = eth.NonceManager()
+        got: list[int] = []
+        lock = threading.Lock()
+
+        def take():
+            for _ in range(50):
+                n = manager.next(self.w3, self.acct.address)
+                with lock:
+                    got.append(n)
+
+        threads = [threading.Thread(target=take) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(got), list(range(200)))
+        manager.resync(self.w3, self.acct.address)
+        self.assertEqual(manager.next(self.w3, self.acct.address), 0)
+
+    def test_send_window_keeps_call_order(self):
+        eth.record_submission(1, 1, "cid", "ab" * 32)
+        calls = [("addFileChunks", (1, [bytes([i]) * 500])) for i in range(10)]
+        seen, sent = [], []
+        results = eth.send_window(calls, window=4, on_result=lambda h, blk, st: seen.append(h), on_sent=lambda pos, h: sent.append((pos, h)))
+        hashes = [h for h, _, _ in results]
+        self.assertEqual(hashes, seen)
+        self.assertEqual([h for _, h in sent], hashes)
+        self.assertTrue(all(st == 1 and blk is not None for _, blk, st in results))
+        nonces = [self.w3.eth.get_transaction(h).nonce for h in hashes]
+        self.assertEqual(nonces, list(range(nonces[0], nonces[0] + 10)))
+        self.assertEqual(self._chunk_count(1), 10)
+        for i in range(10):
+            self.assertEqual(bytes(self.contract.functions.getFileChunk(1, i).call()), bytes([i]) * 500)
+
+    def test_send_window_reports_reverts(self):
+        # No submission for survey 2: addFileHash reverts with SURVEY_NOT_FOUND
+        results = eth.send_window([("addFileHash", (2, b"\x01" * 32))], window=2)
+        self.assertEqual(results[0][2], 0)
+
+    def test_send_window_recovers_from_a_stale_nonce(self):
+        eth.record_submission(3, 1, "cid", "cd" * 32)
+        eth.send_tx("addFileChunks", 3, [b"x"])
+        # Another sender used our next nonce behind the manager's back
+        raw = self.acct.sign_transaction({
+            "to": self.acct.address, "value": 0, "gas": 21_000, "nonce": self.w3.eth.get_transaction_count(self.acct.address, "pending"),
+            "maxFeePerGas": Web3.to_wei(50, "gwei"), "maxPriorityFeePerGas": Web3.to_wei(1, "gwei"), "chainId": self.w3.eth.chain_id,
+        })
+        self.w3.eth.send_raw_transaction(raw.rawTransaction)
+        results = eth.send_window([("addFileChunks", (3, [b"y"])), ("addFileChunks", (3, [b"z"]))], window=2)
+        self.assertTrue(all(st == 1 for _, _, st in results))
+        self.assertEqual(self._chunk_count(3), 3)
+
+    def test_a_receipt_timeout_is_not_success(self):
+        sent = []
+        with mock.patch.object(eth, "_wait_receipt", return_value=(None, False)):
+            with self.assertRaises(eth.ReceiptPending) as cm:
+                eth.record_submission(4, 1, "cid", "ef" * 32, on_sent=sent.append)
+        self.assertEqual(cm.exception.tx_hash, sent[-1])
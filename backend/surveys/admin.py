@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Survey
+from .models import Survey, StoredBlob
 
 
 @admin.register(Survey)
@@ -7,3 +7,9 @@ class SurveyAdmin(admin.ModelAdmin):
     list_display = ("id", "title", "project", "status", "created_at")
     list_filter = ("status", "project")
     search_fields = ("title", "ipfs_cid", "checksum_sha256")
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ("id", "sha256", "size", "ref_count", "ipfs_cid", "created_at")
+    search_fields = ("sha256", "name", "ipfs_cid")
@@ -0,0 +1,73 @@
+"""Process pool for CPU-bound per-chunk work (encryption, compression).
+
+Workers are started with ``spawn`` (forking a threaded server process is not
+safe), so functions run on the pool must be importable without Django. The pool
+size is ``ENC_WORKERS`` (0 = min(8, CPU count); 1 runs everything in-process).
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+class ChunkPoolError(RuntimeError):
+    """A pool worker died while processing chunks."""
+
+
+def pool_workers() -> int:
+    try:
+        n = int(os.getenv("ENC_WORKERS", "0") or 0)
+    except Exception:
+        n = 0
+    if n <= 0:
+        n = min(8, os.cpu_count() or 1)
+    return n
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=pool_workers(), mp_context=get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def ordered_map(fn: Callable[..., Any], args: Iterable[Tuple[Any, ...]]) -> Iterator[Any]:
+    """Yield ``fn(*a)`` for each tuple in `args`, in input order, computed on the pool.
+
+    At most two tasks per worker are outstanding, so a lazy `args` is consumed only
+    as fast as results are taken.
+    """
+    global _pool
+    workers = pool_workers()
+    if workers <= 1:
+        for a in args:
+            yield fn(*a)
+        return
+    pool = _get_pool()
+    pending: "deque[Any]" = deque()
+    try:
+        for a in args:
+            pending.append(pool.submit(fn, *a))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool as e:
+        # A worker died; start a fresh pool next time
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise ChunkPoolError(f"chunk worker failed: {e}")
+    finally:
+        for f in pending:
+            f.cancel()
@@ -0,0 +1,88 @@
+"""Self-describing compressed chunk frames for on-chain file storage.
+
+In compressed anchoring mode each stored chunk is a frame::
+
+    magic (2 bytes) | codec (1 byte) | original length (4 bytes, big-endian) | body
+
+with body = zlib or raw-LZMA2 output of the chunk, or the chunk itself (codec
+``raw``) when compression would not make it smaller. Frames depend only on the
+chunk and the codec, so a resumed upload re-frames to the same bytes and can be
+checked against the on-chain keccak. Like `surveys.encryption`, this module does
+not import Django: `encode_chunk` runs on the shared chunk process pool.
+"""
+import lzma
+import struct
+import zlib
+from typing import Iterable, Iterator, Tuple
+
+from .chunkpool import ordered_map
+
+CODEC_RAW = "raw"
+CODEC_ZLIB = "zlib"
+CODEC_LZMA = "lzma"
+# Codecs a survey can be anchored with (per chunk, `raw` is always the fallback)
+CODECS = (CODEC_ZLIB, CODEC_LZMA)
+
+MAGIC = b"\xe5\x5a"
+_HEADER = struct.Struct(">2sBI")
+# Bytes a frame adds to its body
+HEADER_BYTES = _HEADER.size
+
+_CODEC_IDS = {CODEC_RAW: 0, CODEC_ZLIB: 1, CODEC_LZMA: 2}
+_CODEC_NAMES = {v: k for k, v in _CODEC_IDS.items()}
+ZLIB_LEVEL = 9
+# Raw LZMA2 stream (no .xz container, which would cost ~60 bytes per chunk)
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+
+
+class CompressionError(RuntimeError):
+    """Unknown codec, or a stored payload that is not a valid frame."""
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == CODEC_LZMA:
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    raise CompressionError(f"Unsupported codec {codec!r}")
+
+
+def encode_chunk(codec: str, data: bytes) -> bytes:
+    """Frame `data` compressed with `codec`, or stored as-is if that is not smaller."""
+    body = _compress(codec, data)
+    if len(body) >= len(data):
+        codec, body = CODEC_RAW, data
+    return _HEADER.pack(MAGIC, _CODEC_IDS[codec], len(data)) + body
+
+
+def frame_codec(payload: bytes) -> str:
+    """Codec a frame was written with."""
+    if len(payload) < HEADER_BYTES or payload[:2] != MAGIC or payload[2] not in _CODEC_NAMES:
+        raise CompressionError("not a compressed chunk frame")
+    return _CODEC_NAMES[payload[2]]
+
+
+def decode_chunk(payload: bytes) -> bytes:
+    """Original chunk bytes of a frame; the declared length is enforced."""
+    codec = frame_codec(payload)
+    _, _, size = _HEADER.unpack_from(payload)
+    body = payload[HEADER_BYTES:]
+    try:
+        if codec == CODEC_RAW:
+            data = body
+        elif codec == CODEC_ZLIB:
+            d = zlib.decompressobj()
+            data = d.decompress(body, size + 1)
+        else:
+            d = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+            data = d.decompress(body, size + 1)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise CompressionError(f"corrupt {codec} frame: {e}")
+    if len(data) != size:
+        raise CompressionError(f"{codec} frame holds {len(data)} bytes, header says {size}")
+    return data
+
+
+def encode_chunks(codec: str, items: Iterable[Tuple[int, bytes]]) -> Iterator[bytes]:
+    """Frame (index, chunk) pairs on the process pool; frames come back in input order."""
+    return ordered_map(encode_chunk, ((codec, b) for _, b in items))
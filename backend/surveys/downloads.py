@@ -0,0 +1,149 @@
+"""Access-controlled downloads of stored survey files with HTTP Range support.
+
+`file_response()` answers ``GET``/``HEAD`` for a stored `FieldFile`:
+
+- ``Range: bytes=a-b`` (also ``a-`` and ``-n``) gives ``206 Partial Content``; a range
+  past the end gives ``416``. ``If-Range`` (ETag or Last-Modified) falls back to the
+  full file when the file changed. Multiple ranges are answered with the whole file.
+- ``FILE_DOWNLOAD_OFFLOAD=accel`` hands the file to nginx via ``X-Accel-Redirect``
+  (``FILE_DOWNLOAD_ACCEL_PREFIX`` must be an ``internal`` location aliasing
+  ``MEDIA_ROOT``); ``sendfile`` sets ``X-Sendfile`` for Apache/lighttpd. The web
+  server then handles ranges itself and Python never reads the bytes.
+- Otherwise a `FileResponse` streams the selected range. It exposes the open file
+  descriptor, so WSGI servers with ``wsgi.file_wrapper`` (e.g. gunicorn) send it
+  with ``os.sendfile`` bounded by Content-Length.
+"""
+import os
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def offload_mode() -> str:
+    mode = os.getenv("FILE_DOWNLOAD_OFFLOAD", "").strip().lower()
+    return mode if mode in ("accel", "sendfile") else ""
+
+
+def accel_prefix() -> str:
+    return "/" + (os.getenv("FILE_DOWNLOAD_ACCEL_PREFIX", "/protected-media/").strip().strip("/")) + "/"
+
+
+class _RangeFile:
+    """Read at most `length` bytes of `fh` starting at `start`; closes `fh` when closed."""
+
+    def __init__(self, fh, start: int, length: int) -> None:
+        fh.seek(start)
+        self._fh = fh
+        self._left = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._left <= 0:
+            return b""
+        n = self._left if size is None or size < 0 else min(size, self._left)
+        data = self._fh.read(n)
+        self._left -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        # Positioned at `start`; sendfile-capable servers stop at Content-Length
+        return self._fh.fileno()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end inclusive) of a single byte range; None to serve the whole file.
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    m = _RANGE_RE.match((header or "").replace(" ", ""))
+    if not m or (not m.group(1) and not m.group(2)):
+        # Malformed or multiple ranges: ignoring Range is allowed
+        return None
+    if not m.group(1):
+        n = int(m.group(2))
+        if n == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - n), size - 1
+    start = int(m.group(1))
+    if start >= size:
+        raise ValueError("range starts past the end")
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(value: str, etag: str, mtime: int) -> bool:
+    value = value.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        # Only strong validators may be used with If-Range
+        return value == etag
+    return parse_http_date_safe(value) == mtime
+
+
+def file_response(request, fieldfile, filename: str, etag: Optional[str] = None, content_type: Optional[str] = None):
+    """Serve `fieldfile` to an already authorised request (full, ranged or offloaded)."""
+    content_type = content_type or "application/octet-stream"
+    path = None
+    try:
+        path = fieldfile.path
+    except (NotImplementedError, ValueError):
+        pass
+    try:
+        size = fieldfile.size
+        mtime = int(os.stat(path).st_mtime) if path else 0
+    except OSError:
+        return HttpResponse(status=404)
+    etag = f'"{etag}"' if etag else f'"{size:x}-{mtime:x}"'
+
+    def _headers(resp):
+        resp["Accept-Ranges"] = "bytes"
+        resp["ETag"] = etag
+        if mtime:
+            resp["Last-Modified"] = http_date(mtime)
+        resp["Content-Disposition"] = content_disposition_header(True, filename)
+        return resp
+
+    mode = offload_mode()
+    if mode and path:
+        media = Path(settings.MEDIA_ROOT).resolve()
+        real = Path(path).resolve()
+        if real.is_relative_to(media):
+            resp = HttpResponse(content_type=content_type)
+            if mode == "accel":
+                resp["X-Accel-Redirect"] = accel_prefix() + quote(real.relative_to(media).as_posix())
+            else:
+                resp["X-Sendfile"] = str(real)
+            return _headers(resp)
+
+    rng = None
+    header = request.META.get("HTTP_RANGE", "")
+    if header and size:
+        if_range = request.META.get("HTTP_IF_RANGE", "")
+        if not if_range or _if_range_matches(if_range, etag, mtime):
+            try:
+                rng = parse_range(header, size)
+            except ValueError:
+                resp = HttpResponse(status=416)
+                resp["Content-Range"] = f"bytes */{size}"
+                return _headers(resp)
+    start, end = rng if rng is not None else (0, size - 1)
+    length = max(0, end - start + 1)
+    if request.method == "HEAD":
+        resp = HttpResponse(content_type=content_type, status=206 if rng else 200)
+    else:
+        fh = open(path, "rb") if path else fieldfile.open("rb")
+        resp = FileResponse(_RangeFile(fh, start, length), content_type=content_type, status=206 if rng else 200)
+    resp["Content-Length"] = str(length)
+    if rng is not None:
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return _headers(resp)
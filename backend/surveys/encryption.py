@@ -0,0 +1,152 @@
+"""Per-survey keys and chunk encryption for encrypted on-chain storage.
+
+Keys come from the server KEK in ``DATA_KEK_B64`` (version ``DATA_KEK_VERSION``;
+older versions can stay readable via ``DATA_KEK_B64_V<n>``):
+
+- ``envelope-aeskw-v1``: a random 256-bit data key, stored on the survey wrapped
+  with AES key wrap (RFC 3394) under the KEK.
+- ``kdf-hkdf-v1``: the data key is HKDF-SHA256(KEK, random salt, survey id); only
+  the salt is stored.
+
+Each chunk is sealed with AES-256-GCM as ``nonce || ciphertext || tag``, with the
+survey id and chunk index as associated data so chunks cannot be swapped. The
+nonce is derived from the chunk index and content, which makes encryption
+deterministic: a resumed upload re-encrypts to the same bytes and can be checked
+against the on-chain keccak. Chunks are processed on the shared chunk process
+pool (`surveys.chunkpool`).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import struct
+from typing import Iterable, Iterator, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.keywrap import aes_key_unwrap, aes_key_wrap
+from django.db import transaction as db_transaction
+
+from .chunkpool import ordered_map
+
+SCHEME_ENVELOPE = "envelope-aeskw-v1"
+SCHEME_HKDF = "kdf-hkdf-v1"
+SCHEMES = (SCHEME_ENVELOPE, SCHEME_HKDF)
+
+NONCE_BYTES = 12
+TAG_BYTES = 16
+# Bytes an encrypted payload adds to its plaintext chunk
+OVERHEAD = NONCE_BYTES + TAG_BYTES
+
+
+class EncryptionError(RuntimeError):
+    """Missing/invalid key material or a chunk that fails authentication."""
+
+
+def current_scheme() -> str:
+    scheme = os.getenv("ENC_SCHEME", SCHEME_ENVELOPE).strip() or SCHEME_ENVELOPE
+    if scheme not in SCHEMES:
+        raise EncryptionError(f"Unsupported ENC_SCHEME {scheme!r}")
+    return scheme
+
+
+def current_key_version() -> int:
+    try:
+        return max(1, int(os.getenv("DATA_KEK_VERSION", "1") or 1))
+    except Exception:
+        return 1
+
+
+def _kek(version: int) -> bytes:
+    raw = os.getenv(f"DATA_KEK_B64_V{version}", "").strip()
+    if not raw and version == current_key_version():
+        raw = os.getenv("DATA_KEK_B64", "").strip()
+    if not raw:
+        raise EncryptionError(f"No KEK configured for key version {version} (DATA_KEK_B64)")
+    try:
+        kek = base64.b64decode(raw, validate=True)
+    except Exception:
+        raise EncryptionError("DATA_KEK_B64 is not valid base64")
+    if len(kek) not in (16, 24, 32):
+        raise EncryptionError("DATA_KEK_B64 must decode to 16, 24 or 32 bytes")
+    return kek
+
+
+def _hkdf(kek: bytes, salt: bytes, survey_id: int) -> bytes:
+    info = b"esims-survey-dek:" + str(int(survey_id)).encode()
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=info).derive(kek)
+
+
+def survey_key(survey) -> bytes:
+    """The survey's 256-bit data key, from its stored key metadata."""
+    kek = _kek(int(survey.key_version or 1))
+    try:
+        if survey.enc_scheme == SCHEME_ENVELOPE and survey.wrapped_dek_b64:
+            return aes_key_unwrap(kek, base64.b64decode(survey.wrapped_dek_b64))
+        if survey.enc_scheme == SCHEME_HKDF and survey.kdf_salt_b64:
+            return _hkdf(kek, base64.b64decode(survey.kdf_salt_b64), survey.id)
+    except Exception as e:
+        raise EncryptionError(f"Cannot recover the survey data key: {e}")
+    raise EncryptionError("Survey has no encryption key")
+
+
+_KEY_FIELDS = ["enc_scheme", "key_version", "wrapped_dek_b64", "kdf_salt_b64"]
+
+
+def ensure_key(survey) -> bytes:
+    """Return the survey's data key, creating and storing its key metadata on first use.
+
+    The key is created under a row lock on the survey, so concurrent callers all end
+    up with the one key that was stored.
+    """
+    from .models import Survey
+
+    if survey.wrapped_dek_b64 or survey.kdf_salt_b64:
+        return survey_key(survey)
+    with db_transaction.atomic():
+        row = Survey.objects.select_for_update().get(pk=survey.pk)
+        if not (row.wrapped_dek_b64 or row.kdf_salt_b64):
+            scheme, version = current_scheme(), current_key_version()
+            kek = _kek(version)
+            if scheme == SCHEME_ENVELOPE:
+                row.wrapped_dek_b64 = base64.b64encode(aes_key_wrap(kek, os.urandom(32))).decode()
+                row.kdf_salt_b64 = None
+            else:
+                row.kdf_salt_b64 = base64.b64encode(os.urandom(16)).decode()
+                row.wrapped_dek_b64 = None
+            row.enc_scheme, row.key_version = scheme, version
+            row.save(update_fields=[*_KEY_FIELDS, "updated_at"])
+    for f in _KEY_FIELDS:
+        setattr(survey, f, getattr(row, f))
+    return survey_key(survey)
+
+
+def _aad(survey_id: int, index: int) -> bytes:
+    return struct.pack(">QQ", int(survey_id), int(index))
+
+
+def encrypt_chunk(key: bytes, survey_id: int, index: int, data: bytes) -> bytes:
+    aad = _aad(survey_id, index)
+    nonce_key = hashlib.sha256(b"esims-nonce-key" + key).digest()
+    nonce = hmac.new(nonce_key, aad + hashlib.sha256(data).digest(), hashlib.sha256).digest()[:NONCE_BYTES]
+    return nonce + AESGCM(key).encrypt(nonce, data, aad)
+
+
+def decrypt_chunk(key: bytes, survey_id: int, index: int, payload: bytes) -> bytes:
+    if len(payload) < OVERHEAD:
+        raise EncryptionError(f"chunk {index}: payload too short")
+    try:
+        return AESGCM(key).decrypt(payload[:NONCE_BYTES], payload[NONCE_BYTES:], _aad(survey_id, index))
+    except Exception:
+        raise EncryptionError(f"chunk {index}: authentication failed")
+
+
+def encrypt_chunks(key: bytes, survey_id: int, items: Iterable[Tuple[int, bytes]]) -> Iterator[bytes]:
+    """Encrypt (index, plaintext) pairs on the process pool; payloads come back in input order."""
+    return ordered_map(encrypt_chunk, ((key, survey_id, i, b) for i, b in items))
+
+
+def decrypt_chunks(key: bytes, survey_id: int, items: Iterable[Tuple[int, bytes]]) -> Iterator[bytes]:
+    """Decrypt (index, payload) pairs on the process pool; plaintexts come back in input order."""
+    return ordered_map(decrypt_chunk, ((key, survey_id, i, b) for i, b in items))
@@ -0,0 +1,221 @@
+"""Process-wide pooled IPFS HTTP API clients.
+
+`ipfshttpclient.connect()` performs a version handshake and opens a new HTTP session
+each time; callers here borrow an already-connected client from a small pool instead.
+Clients that raise are discarded so a restarted daemon is picked up transparently.
+"""
+import os
+import queue
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Iterator, Optional
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+try:
+    import ipfshttpclient  # type: ignore
+except Exception:  # pragma: no cover
+    ipfshttpclient = None  # type: ignore
+
+
+try:
+    PIN_BACKOFF_SECONDS = float(os.getenv("IPFS_PIN_BACKOFF_SECONDS", "10") or 10)
+except Exception:
+    PIN_BACKOFF_SECONDS = 10.0
+try:
+    PIN_MAX_ATTEMPTS = int(os.getenv("IPFS_PIN_MAX_ATTEMPTS", "10") or 10)
+except Exception:
+    PIN_MAX_ATTEMPTS = 10
+# Claimed surveys are leased by pushing their next attempt this far out
+PIN_LEASE_SECONDS = 600
+
+
+class IPFSClientPool:
+    def __init__(self, api_url: str, size: int = 4, timeout: Optional[float] = 120):
+        self.api_url = api_url
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue(maxsize=self.size)
+
+    def _connect(self) -> Any:
+        if ipfshttpclient is None:
+            raise RuntimeError("ipfshttpclient is not installed")
+        return ipfshttpclient.connect(self.api_url, session=True, timeout=self.timeout)  # type: ignore[attr-defined]
+
+    @contextmanager
+    def client(self) -> Iterator[Any]:
+        try:
+            c = self._idle.get_nowait()
+        except queue.Empty:
+            c = self._connect()
+        try:
+            yield c
+        except Exception:
+            try:
+                c.close()
+            except Exception:
+                pass
+            raise
+        try:
+            self._idle.put_nowait(c)
+        except queue.Full:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                c = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                c.close()
+            except Exception:
+                pass
+
+
+_pool: Optional[IPFSClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[IPFSClientPool]:
+    """Return the shared pool, or None when IPFS support is not installed."""
+    global _pool
+    if ipfshttpclient is None:
+        return None
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            api_url = os.getenv("IPFS_API_URL", "/dns/127.0.0.1/tcp/5001/http")
+            try:
+                size = int(os.getenv("IPFS_POOL_SIZE", "4") or 4)
+            except Exception:
+                size = 4
+            try:
+                timeout = float(os.getenv("IPFS_TIMEOUT_SECONDS", "120") or 120)
+            except Exception:
+                timeout = 120.0
+            _pool = IPFSClientPool(api_url, size=size, timeout=timeout)
+    return _pool
+
+
+def _cid_from_result(res: Any) -> str:
+    # add() returns a mapping (ipfshttpclient's ResponseBase) for one file and a list
+    # when the daemon also reports wrappers
+    if isinstance(res, list):
+        res = res[-1] if res else None
+    if isinstance(res, Mapping) and res.get("Hash"):
+        return str(res["Hash"])
+    if isinstance(res, (bytes, str)) and res:
+        return res.decode() if isinstance(res, bytes) else str(res)
+    raise RuntimeError(f"Unexpected IPFS add response: {res!r}")
+
+
+def add_file(f: Any) -> str:
+    """Stream a stored file (Django FieldFile) to IPFS and return its CIDv1.
+
+    Local files are passed by path and file-like storage objects by handle, so the
+    client streams the multipart body instead of loading the file into memory.
+    """
+    pool = get_pool()
+    if pool is None:
+        raise RuntimeError("IPFS integration not configured")
+    try:
+        path = f.path
+    except Exception:
+        path = None
+    with pool.client() as client:
+        if path:
+            return _cid_from_result(client.add(path, cid_version=1))
+        f.open("rb")
+        try:
+            return _cid_from_result(client.add(f.file, cid_version=1))
+        finally:
+            f.close()
+
+
+def request_pin(survey) -> None:
+    """Mark a survey's file for background pinning by the `ipfs_pinner` command."""
+    survey.ipfs_pin_status = "pending"
+    survey.ipfs_pin_attempts = 0
+    survey.ipfs_pin_error = ""
+    survey.ipfs_next_attempt_at = timezone.now()
+    survey.save(update_fields=["ipfs_pin_status", "ipfs_pin_attempts", "ipfs_pin_error", "ipfs_next_attempt_at", "updated_at"])
+
+
+def claim_pending(limit: int = 10) -> list:
+    from .models import Survey
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        rows = list(
+            Survey.objects.select_for_update(skip_locked=True)
+            .filter(ipfs_pin_status="pending", ipfs_next_attempt_at__lte=now)
+            .order_by("ipfs_next_attempt_at", "id")[:limit]
+        )
+        if rows:
+            Survey.objects.filter(pk__in=[r.pk for r in rows]).update(
+                ipfs_next_attempt_at=now + timedelta(seconds=PIN_LEASE_SECONDS)
+            )
+    return rows
+
+
+def pin_survey(survey) -> bool:
+    """Add one survey's file to IPFS and store the CID. Failures are rescheduled with backoff.
+
+    The upload can take minutes and the file may be replaced meanwhile (the
+    replacement queues its own pin), so results are written with an update that
+    only matches while the survey still holds the file that was pinned.
+    """
+    from .models import StoredBlob, Survey
+
+    if not survey.file:
+        Survey.objects.filter(pk=survey.pk).filter(Q(file="") | Q(file__isnull=True)).update(
+            ipfs_pin_status="", updated_at=timezone.now()
+        )
+        return False
+    same_file = Survey.objects.filter(pk=survey.pk, file=survey.file.name, checksum_sha256=survey.checksum_sha256)
+    try:
+        blob = StoredBlob.objects.filter(name=survey.file.name).first()
+        # Another survey with the same bytes may already have been pinned
+        cid = blob.ipfs_cid if blob is not None and blob.ipfs_cid else add_file(survey.file)
+    except Exception as e:
+        survey.ipfs_pin_attempts += 1
+        survey.ipfs_pin_error = str(e)[:2000]
+        if survey.ipfs_pin_attempts >= PIN_MAX_ATTEMPTS:
+            survey.ipfs_pin_status = "failed"
+        delay = min(3600.0, PIN_BACKOFF_SECONDS * (2 ** (survey.ipfs_pin_attempts - 1)))
+        survey.ipfs_next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        same_file.update(
+            ipfs_pin_status=survey.ipfs_pin_status,
+            ipfs_pin_attempts=survey.ipfs_pin_attempts,
+            ipfs_pin_error=survey.ipfs_pin_error,
+            ipfs_next_attempt_at=survey.ipfs_next_attempt_at,
+            updated_at=timezone.now(),
+        )
+        return False
+    if blob is not None and not blob.ipfs_cid:
+        # The CID belongs to the bytes, whichever survey still points at them
+        StoredBlob.objects.filter(pk=blob.pk).update(ipfs_cid=cid)
+    local = survey.ipfs_cid
+    # A mismatch means the daemon uses non-default import settings (chunker/layout)
+    error = f"daemon CID {cid} differs from locally computed {local}" if local and local != cid else ""
+    if not same_file.update(ipfs_cid=cid, ipfs_pin_status="pinned", ipfs_pin_error=error, updated_at=timezone.now()):
+        return False
+    survey.ipfs_cid, survey.ipfs_pin_status, survey.ipfs_pin_error = cid, "pinned", error
+    return True
+
+
+def pin_pending(limit: int = 10) -> int:
+    """Claim and pin up to `limit` due surveys. Returns how many were attempted."""
+    rows = claim_pending(limit)
+    for survey in rows:
+        pin_survey(survey)
+    return len(rows)
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from surveys.ipfs import pin_pending
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = "Pin uploaded survey files to IPFS in the background and fill in Survey.ipfs_cid."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process due surveys once and exit")
+        parser.add_argument("--batch", type=int, default=5, help="Surveys claimed per poll")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep when nothing is due")
+        parser.add_argument("--retry-failed", action="store_true", help="Re-queue surveys whose pinning gave up")
+        parser.add_argument("--backfill", action="store_true", help="Queue existing surveys that have a file but no CID")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["retry_failed"]:
+            n = Survey.objects.filter(ipfs_pin_status="failed").update(
+                ipfs_pin_status="pending", ipfs_pin_attempts=0, ipfs_next_attempt_at=now
+            )
+            self.stdout.write(f"re-queued {n} failed pin(s)")
+        if options["backfill"]:
+            n = (
+                Survey.objects.filter(ipfs_pin_status="")
+                .filter(Q(ipfs_cid="") | Q(ipfs_cid__isnull=True))
+                .exclude(Q(file="") | Q(file__isnull=True))
+                .update(ipfs_pin_status="pending", ipfs_pin_attempts=0, ipfs_next_attempt_at=now)
+            )
+            self.stdout.write(f"queued {n} survey(s) without a CID")
+        batch = max(1, int(options["batch"]))
+        interval = max(0.1, float(options["interval"]))
+        while True:
+            n = pin_pending(batch)
+            if n:
+                self.stdout.write(f"processed {n} pin(s)")
+            if options["once"]:
+                break
+            if n < batch:
+                time.sleep(interval)
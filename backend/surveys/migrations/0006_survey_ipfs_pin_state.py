@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_survey_enc_chunk_size_survey_enc_scheme_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='ipfs_next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='ipfs_pin_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='ipfs_pin_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='ipfs_pin_status',
+            field=models.CharField(blank=True, choices=[('', 'not requested'), ('pending', 'pending'), ('pinned', 'pinned'), ('failed', 'failed')], db_index=True, default='', max_length=16),
+        ),
+    ]
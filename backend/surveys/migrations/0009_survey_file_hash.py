@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0008_upload_session'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyFileHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checksum_sha256', models.CharField(max_length=64)),
+                ('name', models.CharField(blank=True, default='', max_length=255)),
+                ('kind', models.CharField(choices=[('primary', 'primary'), ('attachment', 'attachment')], default='attachment', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_hashes', to='surveys.survey')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='file_hashes', to='transactions.transaction')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
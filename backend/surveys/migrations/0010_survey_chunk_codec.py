@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0009_survey_file_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='chunk_codec',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0010_survey_chunk_codec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writer',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writer_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,9 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
+
+from .storage import get_survey_storage, survey_upload_to
 
 
 class Survey(models.Model):
@@ -8,6 +13,13 @@ class Survey(models.Model):
         ("rejected", "rejected"),
     ]
 
+    PIN_STATUS_CHOICES = [
+        ("", "not requested"),
+        ("pending", "pending"),
+        ("pinned", "pinned"),
+        ("failed", "failed"),
+    ]
+
     FILE_CATEGORY_CHOICES = [
         ("drawing_arch", "Drawing - Architectural"),
         ("drawing_struct", "Drawing - Structural"),
@@ -53,7 +65,8 @@ class Survey(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="submitted")
     submitted_by = models.ForeignKey("auth.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="submitted_surveys")
     # Optional file upload and metadata
-    file = models.FileField(upload_to="survey_uploads/%Y/%m/%d/", blank=True, null=True)
+    # Stored content-addressed (see surveys.storage) so identical uploads share one blob
+    file = models.FileField(upload_to=survey_upload_to, storage=get_survey_storage, max_length=255, blank=True, null=True)
     recovered_file = models.FileField(upload_to="survey_recovered/%Y/%m/%d/", blank=True, null=True)
     file_category = models.CharField(max_length=32, choices=FILE_CATEGORY_CHOICES, blank=True, null=True)
     file_mime_type = models.CharField(max_length=100, blank=True, null=True)
@@ -67,6 +80,80 @@ class Survey(models.Model):
     wrapped_dek_b64 = models.TextField(blank=True, null=True)
     kdf_salt_b64 = models.TextField(blank=True, null=True)
     enc_chunk_size = models.IntegerField(blank=True, null=True)
+    # Codec of the raw on-chain chunks: "" = plain bytes, else compressed frames (see surveys.compression)
+    chunk_codec = models.CharField(max_length=8, blank=True, default="")
+
+    # Background IPFS pinning state (see `manage.py ipfs_pinner`)
+    ipfs_pin_status = models.CharField(max_length=16, choices=PIN_STATUS_CHOICES, default="", blank=True, db_index=True)
+    ipfs_pin_attempts = models.PositiveIntegerField(default=0)
+    ipfs_pin_error = models.TextField(blank=True, default="")
+    ipfs_next_attempt_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self) -> str:
         return self.title
+
+
+class StoredBlob(models.Model):
+    """One content-addressed upload shared by every survey with the same SHA-256."""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    ipfs_cid = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.sha256
+
+
+class UploadSession(models.Model):
+    """A resumable upload in progress; bytes live in `temp_path` until finalized into a Survey."""
+
+    STATUS_CHOICES = [
+        ("open", "open"),
+        ("finalized", "finalized"),
+        ("aborted", "aborted"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey("auth.User", on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # Survey fields (project, title, description, file_category) applied on finalize
+    metadata = models.JSONField(default=dict, blank=True)
+    temp_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="open")
+    # Request currently appending a part, and until when its reservation holds (see UPLOAD_PART_LEASE_SECONDS)
+    writer = models.CharField(max_length=32, blank=True, default="")
+    writer_until = models.DateTimeField(null=True, blank=True)
+    survey = models.ForeignKey(Survey, null=True, blank=True, on_delete=models.SET_NULL, related_name="upload_sessions")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+
+
+class SurveyFileHash(models.Model):
+    """SHA-256 of a survey's primary file or an attachment, linked to the tx that anchored it."""
+
+    KIND_CHOICES = [
+        ("primary", "primary"),
+        ("attachment", "attachment"),
+    ]
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name="file_hashes")
+    checksum_sha256 = models.CharField(max_length=64)
+    name = models.CharField(max_length=255, blank=True, default="")
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default="attachment")
+    transaction = models.ForeignKey("transactions.Transaction", null=True, blank=True, on_delete=models.SET_NULL, related_name="file_hashes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return self.checksum_sha256
@@ -0,0 +1,143 @@
+"""On-disk state for resumable (tus-style) survey uploads.
+
+Each `UploadSession` owns one ``.part`` file that PATCH requests append to at the
+current offset. The running SHA-256, UnixFS CID builder and sniffing head are kept in a small
+process-local cache keyed by session and offset, so consecutive parts served by
+the same worker never re-read earlier bytes; a worker that lacks the state
+rebuilds it once from the part file.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+from .unixfs import UnixFSCidBuilder
+from .uploadhandlers import SNIFF_BYTES, sniff_mime
+
+READ_SIZE = 1024 * 1024
+# Sessions whose running hash is kept in memory per process
+HASH_CACHE_SIZE = 64
+try:
+    # How long one PATCH may hold a session's write reservation while its body streams in
+    PART_LEASE_SECONDS = int(os.getenv("UPLOAD_PART_LEASE_SECONDS", "900") or 900)
+except Exception:
+    PART_LEASE_SECONDS = 900
+
+
+def session_dir() -> Path:
+    # Outside MEDIA_ROOT so incomplete parts are never served as media
+    d = Path(os.getenv("UPLOAD_SESSION_DIR", "") or (Path(settings.BASE_DIR) / "var" / "upload_sessions"))
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+class _HashState:
+    def __init__(self) -> None:
+        self.sha = hashlib.sha256()
+        self.cid = UnixFSCidBuilder()
+        self.head = b""
+        self.offset = 0
+
+    def update(self, data: bytes) -> None:
+        self.sha.update(data)
+        self.cid.update(data)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[: SNIFF_BYTES - len(self.head)]
+        self.offset += len(data)
+
+
+_states: "OrderedDict[str, _HashState]" = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def _take_state(key: str, path: str, offset: int) -> _HashState:
+    with _states_lock:
+        st = _states.pop(key, None)
+    if st is not None and st.offset == offset:
+        return st
+    # Another worker handled the previous part (or we restarted): rebuild from disk
+    st = _HashState()
+    if offset:
+        with open(path, "rb") as fh:
+            remaining = offset
+            while remaining:
+                b = fh.read(min(READ_SIZE, remaining))
+                if not b:
+                    break
+                st.update(b)
+                remaining -= len(b)
+    return st
+
+
+def _put_state(key: str, st: _HashState) -> None:
+    with _states_lock:
+        _states[key] = st
+        _states.move_to_end(key)
+        while len(_states) > HASH_CACHE_SIZE:
+            _states.popitem(last=False)
+
+
+def append_part(session: Any, stream: Any, length: int) -> int:
+    """Append `length` bytes from `stream` at the session's current offset. Returns the new offset.
+
+    A short body (dropped connection) still persists what arrived, so the client
+    resumes from the returned offset.
+    """
+    key = str(session.pk)
+    path = session.temp_path
+    st = _take_state(key, path, session.offset)
+    remaining = length
+    try:
+        with open(path, "r+b" if os.path.exists(path) else "wb") as fh:
+            fh.seek(session.offset)
+            fh.truncate()
+            while remaining > 0:
+                b = stream.read(min(READ_SIZE, remaining))
+                if not b:
+                    break
+                fh.write(b)
+                st.update(b)
+                remaining -= len(b)
+    finally:
+        _put_state(key, st)
+    return st.offset
+
+
+class AssembledUpload(UploadedFile):
+    """An assembled part file that storage backends can move into place without copying."""
+
+    def __init__(self, path: str, name: str, size: int, sha256: str, cid: str, content_type: str):
+        super().__init__(open(path, "rb"), name=name, content_type=content_type, size=size)
+        self._path = path
+        self.sha256_hexdigest = sha256
+        self.ipfs_cid_v1 = cid
+        self.sniffed_content_type = content_type
+
+    def temporary_file_path(self) -> str:
+        return self._path
+
+
+def assembled_upload(session: Any) -> AssembledUpload:
+    key = str(session.pk)
+    st = _take_state(key, session.temp_path, session.offset)
+    mime = sniff_mime(st.head, session.filename)
+    return AssembledUpload(session.temp_path, session.filename, session.offset, st.sha.hexdigest(), st.cid.cid(), mime)
+
+
+def discard(session: Any) -> None:
+    with _states_lock:
+        _states.pop(str(session.pk), None)
+    try:
+        os.remove(session.temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def part_path(session_id: Any) -> str:
+    return str(session_dir() / f"{session_id}.part")
+
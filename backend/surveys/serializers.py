@@ -2,6 +2,22 @@ from rest_framework import serializers
 from .models import Survey
 
 
+class SurveyListSerializer(serializers.ListSerializer):
+    """Resolve the on-chain flags of every survey on the page in one lookup (index query or chain read)."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        flags: dict = {}
+        try:
+            from smartcontracts.indexer import survey_flags  # type: ignore
+
+            flags = survey_flags(obj.id for obj in items)
+        except Exception:
+            flags = {}
+        self.context["onchain_flags"] = flags
+        return super().to_representation(items)
+
+
 class SurveySerializer(serializers.ModelSerializer):
     # Indicate if this survey has an on-chain record and/or raw on-chain file chunks
     has_onchain_record = serializers.SerializerMethodField(read_only=True)
@@ -23,6 +39,7 @@ class SurveySerializer(serializers.ModelSerializer):
             "file_category",
             "file_mime_type",
             "file_ext",
+            "chunk_codec",
             "has_onchain_record",
             "has_onchain_file",
             "created_at",
@@ -34,11 +51,13 @@ class SurveySerializer(serializers.ModelSerializer):
             "recovered_file",
             "file_mime_type",
             "file_ext",
+            "chunk_codec",
             "has_onchain_record",
             "has_onchain_file",
             "created_at",
             "updated_at",
         ]
+        list_serializer_class = SurveyListSerializer
         extra_kwargs = {
             # Backend will compute from the uploaded file when provided
             "checksum_sha256": {"required": False},
@@ -46,9 +65,19 @@ class SurveySerializer(serializers.ModelSerializer):
             "ipfs_cid": {"required": False},
         }
 
+    def _flags(self, obj: Survey):
+        flags = self.context.get("onchain_flags")
+        if flags is None:
+            return None
+        # Surveys missing from a prefetched page read as "not on chain"
+        return flags.get(obj.id, (False, 0))
+
     def get_has_onchain_record(self, obj: Survey) -> bool:  # type: ignore[name-defined]
+        flags = self._flags(obj)
+        if flags is not None:
+            return bool(flags[0])
         try:
-            from smartcontracts.eth import get_onchain_record  # type: ignore
+            from smartcontracts.indexer import onchain_record as get_onchain_record  # type: ignore
         except Exception:
             return False
         try:
@@ -58,8 +87,11 @@ class SurveySerializer(serializers.ModelSerializer):
             return False
 
     def get_has_onchain_file(self, obj: Survey) -> bool:  # type: ignore[name-defined]
+        flags = self._flags(obj)
+        if flags is not None:
+            return flags[1] > 0
         try:
-            from smartcontracts.eth import get_file_chunk_count  # type: ignore
+            from smartcontracts.indexer import chunk_count as get_file_chunk_count  # type: ignore
         except Exception:
             return False
         try:
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Survey
+from .storage import release_blob
+
+
+@receiver(post_delete, sender=Survey)
+def release_survey_blob(sender, instance, **kwargs):
+    if instance.file:
+        release_blob(instance.file.name)
@@ -0,0 +1,136 @@
+"""Content-addressed, deduplicating storage for survey uploads.
+
+Files whose SHA-256 is known are stored once under
+``survey_blobs/<aa>/<bb>/<sha256>.<ext>``; every survey pointing at the same content
+shares that blob. `StoredBlob` rows count the references so the bytes are removed
+only when the last survey using them is deleted.
+"""
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+CAS_PREFIX = "survey_blobs/"
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def blob_name(sha256: str, ext: str = "") -> str:
+    sha256 = sha256.lower()
+    ext = ext.lstrip(".").lower()
+    base = f"{CAS_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}"
+    return f"{base}.{ext}" if ext else base
+
+
+def is_sha256(value: Optional[str]) -> bool:
+    return bool(value and _SHA256_RE.match(value.lower()))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that never renames or rewrites content-addressed names."""
+
+    def get_available_name(self, name, max_length=None):
+        if str(name).replace("\\", "/").startswith(CAS_PREFIX):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not str(name).replace("\\", "/").startswith(CAS_PREFIX):
+            return super()._save(name, content)
+        if self.exists(name):
+            # Same name means same bytes; keep the existing blob
+            return name
+        # Write under a unique name and link it into place: the base class would retry a
+        # taken name through get_available_name, which never changes a blob name
+        part = super()._save(f"{name}.{uuid.uuid4().hex}.part", content)
+        try:
+            os.link(self.path(part), self.path(name))
+        except FileExistsError:
+            # A concurrent upload of the same bytes stored the blob first
+            pass
+        except OSError:
+            # No hard links on this filesystem
+            os.replace(self.path(part), self.path(name))
+        finally:
+            try:
+                os.unlink(self.path(part))
+            except FileNotFoundError:
+                pass
+        return name
+
+
+_storage: Optional[ContentAddressedStorage] = None
+
+
+def get_survey_storage() -> ContentAddressedStorage:
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def survey_upload_to(instance: Any, filename: str) -> str:
+    """Place uploads by content hash when the digest of the bytes being saved is known."""
+    upload = getattr(getattr(instance, "file", None), "file", None)
+    digest = getattr(upload, "sha256_hexdigest", None)
+    if is_sha256(digest):
+        return blob_name(str(digest), Path(filename).suffix)
+    return timezone.now().strftime("survey_uploads/%Y/%m/%d/") + filename
+
+
+def acquire_blob(sha256: str, name: str, size: int = 0) -> Tuple[Any, bool]:
+    """Add a reference to the blob holding `sha256`, creating its row at `name` if there is none.
+
+    Returns the blob and whether its bytes are already stored; when they are not, the
+    caller writes them to ``blob.name``. The lookup, the existence check and the
+    increment share one row lock, and `release_blob` deletes bytes only under that lock
+    once no reference is left, so bytes found here stay on disk.
+    """
+    from .models import StoredBlob
+
+    with db_transaction.atomic():
+        blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+            sha256=sha256.lower(), defaults={"name": name, "size": size, "ref_count": 0}
+        )
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        stored = get_survey_storage().exists(blob.name)
+    blob.refresh_from_db()
+    return blob, stored
+
+
+def release_blob(name: Optional[str]) -> None:
+    """Drop a reference to the blob at `name`, deleting the bytes once a refcount of 0 is committed."""
+    from .models import StoredBlob
+
+    if not name or not name.startswith(CAS_PREFIX):
+        return
+    with db_transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+            return
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=0)
+    db_transaction.on_commit(lambda: _collect_blob(name))
+
+
+def _collect_blob(name: str) -> None:
+    from .models import StoredBlob
+
+    with db_transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None or blob.ref_count:
+            # Referenced again since the release committed
+            return
+        try:
+            get_survey_storage().delete(name)
+        except Exception:
+            # Keep the row: the next upload of these bytes references them again
+            return
+        blob.delete()
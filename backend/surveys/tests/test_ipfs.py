@@ -0,0 +1,155 @@
+"""`surveys.ipfs` client pool and pinner against a stub IPFS HTTP API."""
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from projects.models import Project
+from surveys import ipfs
+from surveys.models import StoredBlob, Survey
+
+
+class StubDaemon:
+    """Answers ``/api/v0/version`` and ``/api/v0/add``; `on_add(body)` may return a CID or raise."""
+
+    CID = "bafkreistubstubstubstubstubstubstubstubstubstubstubstubstu"
+
+    def __init__(self) -> None:
+        self.paths: list[str] = []
+        self.on_add = lambda body: self.CID
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    out = b""
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        chunk = self.rfile.read(size + 2)[:size]
+                        if not size:
+                            return out
+                        out += chunk
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_POST(self) -> None:
+                path = self.path.split("?")[0]
+                body = self._body()
+                stub.paths.append(path)
+                code, out = 200, {"Version": "0.8.0"}
+                if path == "/api/v0/add":
+                    try:
+                        out = {"Name": "file", "Hash": stub.on_add(body), "Size": str(len(body))}
+                    except Exception as e:
+                        code, out = 500, {"Message": str(e), "Code": 0, "Type": "error"}
+                data = json.dumps(out).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.api_url = "/ip4/127.0.0.1/tcp/%d/http" % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@unittest.skipUnless(ipfs.ipfshttpclient is not None, "ipfshttpclient not installed")
+class IPFSTestCase(TestCase):
+    def setUp(self):
+        self.daemon = StubDaemon()
+        self.addCleanup(self.daemon.close)
+        self.pool = ipfs.IPFSClientPool(self.daemon.api_url, size=2, timeout=10)
+        self.addCleanup(self.pool.close)
+        patch = mock.patch.object(ipfs, "_pool", self.pool)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+
+class ClientPoolTests(IPFSTestCase):
+    def test_clients_are_reused(self):
+        for _ in range(3):
+            with self.pool.client() as c:
+                c.add_bytes(b"x")
+        self.assertEqual(self.daemon.paths.count("/api/v0/version"), 1)
+        self.assertEqual(self.daemon.paths.count("/api/v0/add"), 3)
+
+    def test_a_failing_client_is_discarded(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.client():
+                raise RuntimeError("broken connection")
+        with self.pool.client() as c:
+            c.add_bytes(b"x")
+        self.assertEqual(self.daemon.paths.count("/api/v0/version"), 2)
+
+
+class PinnerTests(IPFSTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        user = User.objects.create(username="mgr")
+        self.survey = Survey.objects.create(
+            project=Project.objects.create(name="P"), title="t", submitted_by=user,
+            checksum_sha256="a" * 64, file=ContentFile(b"first", name="a.bin"),
+        )
+        ipfs.request_pin(self.survey)
+
+    def test_pinning_stores_the_cid(self):
+        bodies = []
+        self.daemon.on_add = lambda body: bodies.append(body) or StubDaemon.CID
+        self.assertEqual(ipfs.pin_pending(), 1)
+        self.survey.refresh_from_db()
+        self.assertEqual((self.survey.ipfs_cid, self.survey.ipfs_pin_status), (StubDaemon.CID, "pinned"))
+        self.assertIn(b"first", bodies[0])
+
+    def test_a_file_replaced_during_pinning_keeps_its_own_state(self):
+        add_file = ipfs.add_file
+
+        def add_then_replace(f):
+            cid = add_file(f)
+            # The survey got new bytes while the old ones were being added
+            Survey.objects.filter(pk=self.survey.pk).update(file="survey_uploads/b.bin", checksum_sha256="b" * 64, ipfs_cid="", ipfs_pin_status="pending")
+            return cid
+
+        with mock.patch.object(ipfs, "add_file", add_then_replace):
+            ipfs.pin_pending()
+        self.assertIn("/api/v0/add", self.daemon.paths)
+        self.survey.refresh_from_db()
+        self.assertEqual((self.survey.file.name, self.survey.ipfs_cid, self.survey.ipfs_pin_status), ("survey_uploads/b.bin", "", "pending"))
+
+    def test_failures_are_rescheduled(self):
+        def fail(body):
+            raise RuntimeError("daemon out of disk")
+
+        self.daemon.on_add = fail
+        ipfs.pin_pending()
+        self.survey.refresh_from_db()
+        self.assertEqual((self.survey.ipfs_pin_status, self.survey.ipfs_pin_attempts), ("pending", 1))
+        self.assertIn("daemon out of disk", self.survey.ipfs_pin_error)
+        self.assertGreater(self.survey.ipfs_next_attempt_at, self.survey.updated_at)
+
+    def test_a_pinned_blob_is_not_added_again(self):
+        StoredBlob.objects.create(sha256="a" * 64, name=self.survey.file.name, ref_count=1, ipfs_cid="bafkreiknown")
+        ipfs.pin_pending()
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.ipfs_cid, "bafkreiknown")
+        self.assertNotIn("/api/v0/add", self.daemon.paths)
@@ -0,0 +1,63 @@
+"""Reference counting of content-addressed blobs in `surveys.storage`."""
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from surveys.models import StoredBlob
+from surveys.storage import acquire_blob, blob_name, get_survey_storage, release_blob
+
+SHA = "ab" * 32
+
+
+class BlobRefcountTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = get_survey_storage()
+        self.name = blob_name(SHA, "bin")
+
+    def _store(self) -> StoredBlob:
+        blob, stored = acquire_blob(SHA, self.name, 5)
+        if not stored:
+            self.storage.save(blob.name, ContentFile(b"bytes"))
+        return blob
+
+    def _release(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            release_blob(self.name)
+
+    def test_bytes_go_with_the_last_reference(self):
+        self._store()
+        _, stored = acquire_blob(SHA, self.name)
+        self.assertTrue(stored)
+        self._release()
+        self.assertTrue(self.storage.exists(self.name))
+        self._release()
+        self.assertFalse(self.storage.exists(self.name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_bytes_are_kept_until_refcount_zero_is_committed(self):
+        self._store()
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_blob(self.name)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 0)
+        self.assertTrue(self.storage.exists(self.name))
+        # Uploaded again before the release's transaction committed
+        blob, stored = acquire_blob(SHA, self.name)
+        self.assertTrue(stored)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.storage.exists(self.name))
+        self.assertEqual(StoredBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+    def test_missing_bytes_are_reported_for_rewriting(self):
+        blob = self._store()
+        self.storage.delete(blob.name)
+        _, stored = acquire_blob(SHA, self.name)
+        self.assertFalse(stored)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
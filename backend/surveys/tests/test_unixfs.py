@@ -0,0 +1,158 @@
+"""CID parity of `surveys.unixfs` with ``ipfs add``.
+
+Fixtures are all-zero files plus one pseudo-random file (`_pattern`) of 175 full
+chunks and a partial one, so the balanced layout needs a second level.
+
+`DAEMON_V0` holds what kubo's ``ipfs add --only-hash`` (defaults: CIDv0, dag-pb
+leaves, 256 KiB chunks, balanced layout) returned for those inputs. `LayoutTests`
+runs the builder's tree code with dag-pb leaves and must reproduce them, which
+pins the layout, link sizes and parent encoding to the daemon. `EXPECTED` holds
+the CIDv1 raw-leaf values: the empty file is the daemon's well-known CID, a single
+chunk is just its sha2-256 raw CID, and the larger ones are the daemon-checked
+layout over raw leaves. `DaemonParityTests` compares them with
+``ipfs add --only-hash --cid-version=1 --raw-leaves`` whenever ``ipfs`` is on PATH.
+"""
+import base64
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from typing import BinaryIO
+from unittest import mock
+
+from surveys import unixfs
+from surveys.unixfs import CHUNK_SIZE, MAX_LINKS, UnixFSCidBuilder, cid_of_stream
+
+PATTERN_SIZE = (MAX_LINKS + 1) * CHUNK_SIZE + 1000
+
+# fixture -> CIDv1 of its bytes; ints are that many zero bytes
+EXPECTED = {
+    0: "bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku",
+    CHUNK_SIZE: "bafkreiekhhjkxu4ztk3tyng3er3ijhg56mb44oe3gwbgquhzu4afrg2ksa",
+    CHUNK_SIZE + 1: "bafybeigllfqgfpqydppr6cmv56g7ax4wyhruzswvcefv6j5kj77nzttfki",
+    MAX_LINKS * CHUNK_SIZE: "bafybeibxsa3ioclowpaq7b6gxl65gzqneopfr3fnhedak6sqr4bjz5lnyq",
+    (MAX_LINKS + 1) * CHUNK_SIZE: "bafybeigfps5vzivfspwgm3uwsfyl5s6bn3ysh7uqidgauxgopw4yi66lse",
+    "pattern": "bafybeigelitm7qh4fwojwle35roiz4tj2rq2qpyhpa4vpulm4p4phu6cz4",
+}
+
+# fixture -> kubo 0.22 `ipfs add --only-hash` (CIDv0, dag-pb leaves)
+DAEMON_V0 = {
+    0: "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH",
+    CHUNK_SIZE: "QmRk1rduJvo5DfEYAaLobS2za9tDszk35hzaNSDCJ74DA7",
+    CHUNK_SIZE + 1: "QmbVuw4C4vcmVKqxoWtgDVobvcHrSn51qsmQmyxjk4sB2Q",
+    MAX_LINKS * CHUNK_SIZE: "QmY4HSz1oVGdUzb8poVYPLsoqBZjH6LZrtgnme9wWn2Qko",
+    (MAX_LINKS + 1) * CHUNK_SIZE: "QmaL1KiQRV8secNszpjjFPg722T53c77k2dz5UsNua59ZT",
+    "pattern": "QmdixGhHsqygsuQS5E8X5kcrgozXMrdDMoqTDammZTgurE",
+}
+
+
+def _pattern() -> bytes:
+    """`PATTERN_SIZE` bytes of sha256(counter) output."""
+    out = bytearray()
+    i = 0
+    while len(out) < PATTERN_SIZE:
+        out += hashlib.sha256(i.to_bytes(8, "big")).digest()
+        i += 1
+    return bytes(out[:PATTERN_SIZE])
+
+
+def _fixture(key) -> BinaryIO:
+    return io.BytesIO(_pattern()) if key == "pattern" else _Zeros(key)
+
+
+class _Zeros(io.RawIOBase):
+    """`size` zero bytes without holding them in memory."""
+
+    def __init__(self, size: int) -> None:
+        self._left = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self._left)
+        b[:n] = bytes(n)
+        self._left -= n
+        return n
+
+
+def _cid_in_pieces(size: int, piece: int) -> str:
+    b = UnixFSCidBuilder()
+    zeros = bytes(piece)
+    left = size
+    while left:
+        n = min(piece, left)
+        b.update(zeros[:n])
+        left -= n
+    return b.cid()
+
+
+_B58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _cid_v0(codec: int, block: bytes) -> bytes:
+    return bytes([unixfs.MH_SHA2_256, 32]) + hashlib.sha256(block).digest()
+
+
+def _base58(cid: bytes) -> str:
+    n = int.from_bytes(cid, "big")
+    out = ""
+    while n:
+        n, r = divmod(n, 58)
+        out = _B58[r] + out
+    return "1" * (len(cid) - len(cid.lstrip(b"\0"))) + out
+
+
+def _dag_pb_leaf(data: bytes) -> unixfs._Node:
+    # UnixFS File node holding the chunk (Type, Data, filesize), wrapped in a dag-pb Data field
+    fsnode = unixfs._field_varint(1, unixfs.UNIXFS_FILE)
+    if data:
+        fsnode += unixfs._field_bytes(2, data)
+    block = unixfs._field_bytes(1, fsnode + unixfs._field_varint(3, len(data)))
+    return unixfs._Node(_cid_v0(unixfs.CODEC_DAG_PB, block), len(block), len(data))
+
+
+class UnixFSCidTests(unittest.TestCase):
+    def test_expected_cids(self):
+        for key, cid in EXPECTED.items():
+            with self.subTest(fixture=key):
+                self.assertEqual(cid_of_stream(_fixture(key)), cid)
+
+    def test_update_boundaries_do_not_matter(self):
+        # Pieces that straddle chunk boundaries must give the same tree
+        for size in (CHUNK_SIZE, CHUNK_SIZE + 1):
+            for piece in (1000, CHUNK_SIZE - 1, CHUNK_SIZE + 7):
+                with self.subTest(size=size, piece=piece):
+                    self.assertEqual(_cid_in_pieces(size, piece), EXPECTED[size])
+
+    def test_single_chunk_is_a_raw_leaf(self):
+        raw = bytes([1, unixfs.CODEC_RAW, unixfs.MH_SHA2_256, 32]) + hashlib.sha256(bytes(CHUNK_SIZE)).digest()
+        self.assertEqual(EXPECTED[CHUNK_SIZE], "b" + base64.b32encode(raw).decode().lower().rstrip("="))
+        self.assertTrue(EXPECTED[CHUNK_SIZE + 1].startswith("bafybei"))
+
+
+class LayoutTests(unittest.TestCase):
+    def test_dag_pb_leaves_match_the_daemon(self):
+        with mock.patch.object(unixfs, "_cid", _cid_v0), mock.patch.object(unixfs, "_leaf", _dag_pb_leaf), \
+                mock.patch.object(unixfs, "cid_to_str", _base58):
+            for key, cid in DAEMON_V0.items():
+                with self.subTest(fixture=key):
+                    self.assertEqual(cid_of_stream(_fixture(key)), cid)
+
+
+@unittest.skipUnless(shutil.which("ipfs"), "ipfs binary not available")
+class DaemonParityTests(unittest.TestCase):
+    def test_matches_ipfs_add(self):
+        with tempfile.TemporaryDirectory() as repo:
+            env = {**os.environ, "IPFS_PATH": repo}
+            subprocess.run(["ipfs", "init", "--profile=test"], env=env, check=True, capture_output=True)
+            for key, cid in EXPECTED.items():
+                with self.subTest(fixture=key):
+                    out = subprocess.run(
+                        ["ipfs", "add", "--only-hash", "--cid-version=1", "--raw-leaves", "-Q"],
+                        input=_fixture(key).read(), env=env, check=True, capture_output=True,
+                    )
+                    self.assertEqual(out.stdout.decode().strip(), cid)
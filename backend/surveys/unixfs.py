@@ -0,0 +1,135 @@
+"""Local UnixFS CIDv1 computation matching `ipfs add --cid-version=1` defaults.
+
+The daemon's defaults for CIDv1 are: fixed-size 256 KiB chunks, raw leaves, a
+balanced DAG with at most 174 links per node and sha2-256 everywhere. Feeding a
+file through `UnixFSCidBuilder` in any number of `update()` calls yields the same
+CID the daemon would return, without talking to it. Memory use is bounded by one
+chunk plus at most 174 pending links per tree level.
+"""
+import base64
+import hashlib
+from typing import BinaryIO, NamedTuple
+
+CHUNK_SIZE = 262144
+MAX_LINKS = 174
+
+CODEC_RAW = 0x55
+CODEC_DAG_PB = 0x70
+MH_SHA2_256 = 0x12
+UNIXFS_FILE = 2
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _field_bytes(field: int, value: bytes) -> bytes:
+    return _varint((field << 3) | 2) + _varint(len(value)) + value
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _cid(codec: int, block: bytes) -> bytes:
+    digest = hashlib.sha256(block).digest()
+    return b"\x01" + _varint(codec) + _varint(MH_SHA2_256) + _varint(len(digest)) + digest
+
+
+def cid_to_str(cid: bytes) -> str:
+    """Multibase base32 (lowercase, unpadded) form, e.g. ``bafy...`` / ``bafk...``."""
+    return "b" + base64.b32encode(cid).decode("ascii").lower().rstrip("=")
+
+
+class _Node(NamedTuple):
+    cid: bytes
+    # Cumulative size of the block and everything below it (dag-pb link Tsize)
+    tsize: int
+    # Bytes of file content under this node (UnixFS blocksize)
+    filesize: int
+
+
+def _leaf(data: bytes) -> _Node:
+    return _Node(_cid(CODEC_RAW, data), len(data), len(data))
+
+
+def _parent(children: list[_Node]) -> _Node:
+    filesize = sum(c.filesize for c in children)
+    unixfs = _field_varint(1, UNIXFS_FILE) + _field_varint(3, filesize)
+    for c in children:
+        unixfs += _field_varint(4, c.filesize)
+    # dag-pb canonical order: Links (field 2) first, then Data (field 1); names are empty
+    block = b"".join(
+        _field_bytes(2, _field_bytes(1, c.cid) + _field_bytes(2, b"") + _field_varint(3, c.tsize))
+        for c in children
+    ) + _field_bytes(1, unixfs)
+    return _Node(_cid(CODEC_DAG_PB, block), len(block) + sum(c.tsize for c in children), filesize)
+
+
+class UnixFSCidBuilder:
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        # _levels[0] holds leaves, _levels[i] holds full nodes of depth i
+        self._levels: list[list[_Node]] = [[]]
+        self.size = 0
+
+    def _push(self, level: int, node: _Node) -> None:
+        while True:
+            if level == len(self._levels):
+                self._levels.append([])
+            self._levels[level].append(node)
+            if len(self._levels[level]) < MAX_LINKS:
+                return
+            node = _parent(self._levels[level])
+            self._levels[level] = []
+            level += 1
+
+    def update(self, data: bytes) -> None:
+        self.size += len(data)
+        self._buf += data
+        while len(self._buf) >= CHUNK_SIZE:
+            self._push(0, _leaf(bytes(self._buf[:CHUNK_SIZE])))
+            del self._buf[:CHUNK_SIZE]
+
+    def cid_bytes(self) -> bytes:
+        levels = [list(lv) for lv in self._levels]
+        if self._buf or self.size == 0:
+            levels[0].append(_leaf(bytes(self._buf)))
+        # Close partial groups bottom-up so every leaf ends up at the same depth,
+        # which is what the daemon's balanced layout produces
+        i = 0
+        while True:
+            higher = any(levels[j] for j in range(i + 1, len(levels)))
+            if len(levels[i]) == 1 and not higher:
+                return levels[i][0].cid
+            if levels[i]:
+                if i + 1 == len(levels):
+                    levels.append([])
+                levels[i + 1].append(_parent(levels[i]))
+            i += 1
+
+    def cid(self) -> str:
+        return cid_to_str(self.cid_bytes())
+
+
+def cid_of_stream(fh: BinaryIO, read_size: int = 1024 * 1024) -> str:
+    b = UnixFSCidBuilder()
+    while True:
+        chunk = fh.read(read_size)
+        if not chunk:
+            break
+        b.update(chunk)
+    return b.cid()
+
+
+def cid_of_file(path: str) -> str:
+    with open(path, "rb") as fh:
+        return cid_of_stream(fh)
@@ -0,0 +1,77 @@
+import hashlib
+import mimetypes
+from typing import Optional
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from .unixfs import UnixFSCidBuilder
+
+# Leading byte signatures for the formats field crews actually upload.
+# Checked in order, so more specific prefixes come first.
+MAGIC_SIGNATURES: list[tuple[bytes, str]] = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"LASF", "application/vnd.las"),
+    (b"AC10", "image/vnd.dwg"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"Rar!\x1a\x07", "application/vnd.rar"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"PK\x05\x06", "application/zip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+]
+
+# How many leading bytes are kept for sniffing
+SNIFF_BYTES = 512
+
+
+def sniff_mime(head: bytes, name: str = "", declared: str = "") -> str:
+    """Best-effort MIME detection from the first bytes of a file.
+
+    The filename wins for container formats (docx/xlsx/kmz are all zips), otherwise
+    a known magic prefix wins over the extension and the browser-declared type.
+    """
+    guessed, _ = mimetypes.guess_type(name or "")
+    sniffed: Optional[str] = None
+    for sig, mime in MAGIC_SIGNATURES:
+        if head.startswith(sig):
+            sniffed = mime
+            break
+    if sniffed in ("application/zip", "application/x-ole-storage") and guessed:
+        return guessed
+    return sniffed or guessed or declared or ""
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream every uploaded file to a temp file while hashing and sniffing it.
+
+    The resulting ``TemporaryUploadedFile`` carries ``sha256_hexdigest``, ``ipfs_cid_v1``,
+    ``size`` and ``sniffed_content_type`` so callers never have to re-read the upload.
+    Because the file lives on disk, ``FileSystemStorage`` moves it into place instead
+    of copying.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._sha = hashlib.sha256()
+        self._cid = UnixFSCidBuilder()
+        self._head = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha.update(raw_data)
+        self._cid.update(raw_data)
+        if len(self._head) < SNIFF_BYTES:
+            self._head += raw_data[: SNIFF_BYTES - len(self._head)]
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        f.sha256_hexdigest = self._sha.hexdigest()  # type: ignore[attr-defined]
+        f.ipfs_cid_v1 = self._cid.cid()  # type: ignore[attr-defined]
+        f.sniffed_content_type = sniff_mime(self._head, self.file_name or "", self.content_type or "")  # type: ignore[attr-defined]
+        return f
@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
-from .views import SurveyViewSet
+from .views import SurveyViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 router.register(r"surveys", SurveyViewSet, basename="survey")
+router.register(r"uploads", UploadSessionViewSet, basename="upload")
 
 urlpatterns = router.urls
@@ -2,27 +2,225 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-import mimetypes
 from pathlib import Path
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 import hashlib
+import itertools
 import os
-from django.http import HttpResponse
-try:
-    import ipfshttpclient  # type: ignore
-except Exception:  # pragma: no cover
-    ipfshttpclient = None  # type: ignore
+import tempfile
+import uuid
+from datetime import timedelta
+from django.core.files import File
+from django.db import DatabaseError, transaction as db_transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 
-from .models import Survey
+from . import compression, encryption, resumable
+from .models import Survey, SurveyFileHash, UploadSession
 from .serializers import SurveySerializer
+from .downloads import file_response
+from .ipfs import request_pin
+from .storage import acquire_blob, blob_name, get_survey_storage, is_sha256, release_blob
+from .uploadhandlers import HashingFileUploadHandler, sniff_mime
 from users.models import Profile
-from transactions.models import Transaction
+from smartcontracts import outbox as chain_outbox
+from smartcontracts.models import AnchorCheckpoint, ChainJob
 try:
     from smartcontracts.eth import record_submission as eth_record_submission, mark_approved as eth_mark_approved, mark_rejected as eth_mark_rejected
 except Exception:  # pragma: no cover - optional integration
     eth_record_submission = eth_mark_approved = eth_mark_rejected = None
 
 
+def _upload_sha256(upload) -> str | None:
+    """Return the SHA-256 of an uploaded file, reusing the digest computed while streaming."""
+    digest = getattr(upload, "sha256_hexdigest", None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    try:
+        for chunk in upload.chunks():  # type: ignore[attr-defined]
+            if chunk:
+                sha.update(chunk)
+        return sha.hexdigest()
+    except Exception:
+        return None
+
+
+def _save_with_upload(serializer, upload, **kwargs) -> Survey:
+    """Save a survey and its primary file: reuse identical stored content, count the blob reference and queue pinning."""
+    file_mime = None
+    file_ext = None
+    computed_checksum = None
+    if upload is not None:
+        file_mime = getattr(upload, "sniffed_content_type", None) or sniff_mime(b"", upload.name, getattr(upload, "content_type", "") or "")
+        file_ext = Path(upload.name).suffix.lstrip(".").lower()
+        computed_checksum = _upload_sha256(upload)
+        kwargs["file"] = upload
+    reuse = {}
+    blob = None
+    if upload is not None and is_sha256(computed_checksum):
+        # Reference the blob before writing, so a concurrent release cannot delete the bytes
+        blob, stored = acquire_blob(str(computed_checksum), blob_name(str(computed_checksum), file_ext or ""), getattr(upload, "size", 0) or 0)
+        try:
+            if not stored:
+                get_survey_storage().save(blob.name, upload)
+        except Exception:
+            release_blob(blob.name)
+            raise
+        reuse["file"] = blob.name
+        if stored and blob.ipfs_cid and not serializer.validated_data.get("ipfs_cid"):
+            # Identical bytes are already stored and pinned
+            reuse["ipfs_cid"] = blob.ipfs_cid
+            reuse["ipfs_pin_status"] = "pinned"
+    local_cid = getattr(upload, "ipfs_cid_v1", None)
+    if local_cid and "ipfs_cid" not in reuse and not serializer.validated_data.get("ipfs_cid"):
+        # Computed while streaming, so the CID can be anchored before the daemon pins it
+        reuse["ipfs_cid"] = local_cid
+    if upload is not None and "ipfs_pin_status" not in reuse:
+        # New bytes: the CID and pin state of a replaced file no longer apply
+        reuse["ipfs_pin_status"] = ""
+        if "ipfs_cid" not in reuse and not serializer.validated_data.get("ipfs_cid"):
+            reuse["ipfs_cid"] = ""
+    try:
+        survey = serializer.save(
+            file_mime_type=file_mime or "",
+            file_ext=file_ext or "",
+            **({"checksum_sha256": computed_checksum} if computed_checksum else {}),
+            **{**kwargs, **reuse},
+        )
+    except Exception:
+        if blob is not None:
+            release_blob(blob.name)
+        raise
+    # Pin to IPFS in the background (ipfs_pinner); the upload never waits on the daemon
+    if getattr(survey, "file", None) and survey.ipfs_pin_status != "pinned":
+        request_pin(survey)
+    return survey
+
+
+def _queue_submission_writes(request, survey, extra: list[tuple[str, str]]) -> None:
+    """Record a new survey's file hashes and queue its chain writes (managers only, unless skip_chain).
+
+    `extra` holds (name, sha256) for each attachment. All hashes of the survey are
+    anchored with one addFileHashes call per FILE_HASH_BATCH_MAX hashes.
+    """
+    hashes = []
+    if survey.checksum_sha256:
+        hashes.append(SurveyFileHash(survey=survey, checksum_sha256=survey.checksum_sha256, name=survey.file.name if survey.file else "", kind="primary"))
+    for name, hx in extra:
+        hashes.append(SurveyFileHash(survey=survey, checksum_sha256=hx, name=name, kind="attachment"))
+    SurveyFileHash.objects.bulk_create(hashes)
+
+    user = request.user
+    role = getattr(getattr(user, "profile", None), "role", None)
+    is_manager = bool(user.is_staff or user.is_superuser or role in ("admin", "manager"))
+    skip_chain = False
+    try:
+        q = request.query_params
+        h = request.headers
+        skip_chain = (str(q.get("skip_chain", "")).lower() in ("1", "true", "yes")) or (
+            str(h.get("X-Skip-Chain", "")).lower() in ("1", "true", "yes")
+        )
+    except Exception:
+        skip_chain = False
+    if eth_record_submission is not None and is_manager and not skip_chain:
+        # Queue the writes; chain_worker sends them after this request commits
+        chain_outbox.enqueue(survey, "record_submission")
+        _enqueue_file_hashes(survey, [fh.checksum_sha256 for fh in hashes])
+
+
+def _enqueue_file_hashes(survey, checksums: list[str]) -> list:
+    try:
+        batch = max(1, int(os.getenv("FILE_HASH_BATCH_MAX", "200") or 200))
+    except Exception:
+        batch = 200
+    jobs = []
+    for i in range(0, len(checksums), batch):
+        part = checksums[i:i + batch]
+        if len(part) == 1:
+            jobs.append(chain_outbox.enqueue(survey, "add_file_hash", part[0]))
+        else:
+            jobs.append(chain_outbox.enqueue(survey, "add_file_hashes", *part))
+    return jobs
+
+
+def _open_survey_file(survey):
+    """Open the survey's stored file for sequential binary reads (caller closes)."""
+    path = getattr(survey.file, "path", None)
+    if path:
+        return open(path, "rb")
+    survey.file.open("rb")
+    return survey.file
+
+
+def _recovery_response(survey, parts, stream: bool, extra=None):
+    """Write recovered chunks (an in-order iterator of file bytes) to storage and answer.
+
+    Chunks go to a temporary file as they arrive while the SHA-256 is computed; the
+    file is stored as `recovered_file` only if it matches ``checksum_sha256``. With
+    `stream`, the bytes are also sent to the client as they arrive; a checksum
+    mismatch then aborts the transfer, so the client sees an incomplete download.
+    `extra` is merged into the JSON answer once all chunks are read.
+    """
+    expected = (survey.checksum_sha256 or "").lower()
+    name = f"recovered_{survey.id}.{survey.file_ext or 'bin'}"
+    parts = iter(parts)
+    try:
+        # Read the first slice before answering so an unreachable node is still an error status
+        first = next(parts, b"")
+    except (encryption.EncryptionError, compression.CompressionError) as e:
+        return Response({"detail": f"Recovery failed: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+    except Exception as e:
+        return Response({"detail": f"Failed to read chunks: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+    def _write(tmp, sha):
+        for part in itertools.chain((first,), parts):
+            sha.update(part)
+            tmp.write(part)
+            yield part
+
+    def _store(tmp, sha) -> None:
+        if expected and sha.hexdigest() != expected:
+            raise ValueError("Recovered file does not match the survey checksum")
+        tmp.seek(0)
+        survey.recovered_file.save(name, File(tmp), save=True)
+
+    if stream:
+        def _body():
+            sha = hashlib.sha256()
+            with tempfile.TemporaryFile() as tmp:
+                yield from _write(tmp, sha)
+                _store(tmp, sha)
+
+        resp = StreamingHttpResponse(_body(), content_type="application/octet-stream")
+        resp["Content-Disposition"] = f"attachment; filename={name}"
+        if expected:
+            resp["X-Checksum-SHA256"] = expected
+        return resp
+
+    sha = hashlib.sha256()
+    size = 0
+    with tempfile.TemporaryFile() as tmp:
+        try:
+            for part in _write(tmp, sha):
+                size += len(part)
+        except (encryption.EncryptionError, compression.CompressionError) as e:
+            return Response({"detail": f"Recovery failed: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        except Exception as e:
+            return Response({"detail": f"Failed to read chunks: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        try:
+            _store(tmp, sha)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+    return Response({
+        "recovered_bytes": size,
+        "stored": True,
+        "sha256": sha.hexdigest(),
+        "download_url": survey.recovered_file.url if getattr(survey.recovered_file, "url", None) else None,
+        **(extra or {}),
+    })
+
+
 class SurveyViewSet(viewsets.ModelViewSet):
     queryset = Survey.objects.select_related("project", "submitted_by").all()
     serializer_class = SurveySerializer
@@ -44,133 +242,32 @@ class SurveyViewSet(viewsets.ModelViewSet):
         # default: surveyor sees own submissions only
         return base.filter(submitted_by=user)
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Hash and sniff uploads while they stream to disk so the body is read once
+        request.upload_handlers = [HashingFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         upload = self.request.FILES.get("file")
-        file_mime = None
-        file_ext = None
-        computed_checksum = None
-        if upload is not None:
-            # Guess using filename; browsers may include content_type but rely on path for consistency
-            guessed, _ = mimetypes.guess_type(upload.name)
-            file_mime = guessed or getattr(upload, "content_type", "") or ""
-            file_ext = Path(upload.name).suffix.lstrip(".").lower()
-            # Compute SHA-256 of the uploaded file contents
-            sha = hashlib.sha256()
-            try:
-                for chunk in upload.chunks():  # type: ignore[attr-defined]
-                    if chunk:
-                        sha.update(chunk)
-                computed_checksum = sha.hexdigest()
-            except Exception:
-                try:
-                    data = upload.read()
-                    if data:
-                        sha.update(data)
-                    computed_checksum = sha.hexdigest()
-                except Exception:
-                    computed_checksum = None
-        survey = serializer.save(
-            submitted_by=self.request.user,
-            file_mime_type=file_mime or "",
-            file_ext=file_ext or "",
-            **({"checksum_sha256": computed_checksum} if computed_checksum else {}),
-        )
-        # Try to upload to IPFS and set CID
-        if ipfshttpclient is not None and getattr(survey, "file", None):
-            try:
-                api_url = os.getenv("IPFS_API_URL", "/dns/127.0.0.1/tcp/5001/http")
-                client = ipfshttpclient.connect(api_url)  # type: ignore[attr-defined]
-                f = survey.file
-                path = getattr(f, "path", None)
-                if path:
-                    res = client.add(path, cid_version=1)  # type: ignore[call-arg]
-                else:
-                    data = f.read()
-                    res = client.add_bytes(data)  # type: ignore[assignment]
-                    # add_bytes returns CID string directly in some versions
-                    if isinstance(res, (bytes, str)):
-                        survey.ipfs_cid = res.decode() if isinstance(res, bytes) else str(res)
-                        survey.save(update_fields=["ipfs_cid", "updated_at"])
-                        res = None
-                if isinstance(res, dict) and res.get("Hash"):
-                    survey.ipfs_cid = res["Hash"]
-                    survey.save(update_fields=["ipfs_cid", "updated_at"])
-            except Exception:
-                pass
-        # Optional: write to Ethereum and store tx (unless skip_chain requested)
-        # Only managers/admins can submit to chain from backend
-        user = self.request.user
-        role = getattr(getattr(user, "profile", None), "role", None)
-        is_manager = bool(user.is_staff or user.is_superuser or role in ("admin", "manager"))
+        survey = _save_with_upload(serializer, upload, submitted_by=self.request.user)
         # Collect any extra files for per-file hashing
         extra_files = []
         try:
             extra_files = list(self.request.FILES.getlist("extra_files")) + list(self.request.FILES.getlist("extra_files[]"))
         except Exception:
             extra_files = []
-        extra_hashes = []
-        for ef in extra_files:
-            try:
-                sha_e = hashlib.sha256()
-                for chunk in ef.chunks():  # type: ignore[attr-defined]
-                    if chunk:
-                        sha_e.update(chunk)
-                extra_hashes.append(sha_e.hexdigest())
-            except Exception:
-                try:
-                    data = ef.read()
-                    if data:
-                        sha_e = hashlib.sha256()
-                        sha_e.update(data)
-                        extra_hashes.append(sha_e.hexdigest())
-                except Exception:
-                    pass
+        # Digests were computed by HashingFileUploadHandler while the body streamed in
+        extra = [(str(ef.name or ""), _upload_sha256(ef)) for ef in extra_files]
+        _queue_submission_writes(self.request, survey, [(name, hx) for name, hx in extra if hx])
 
-        skip_chain = False
-        try:
-            q = self.request.query_params
-            h = self.request.headers
-            skip_chain = (str(q.get("skip_chain", "")).lower() in ("1", "true", "yes")) or (
-                str(h.get("X-Skip-Chain", "")).lower() in ("1", "true", "yes")
-            )
-        except Exception:
-            skip_chain = False
-        if eth_record_submission is not None and is_manager and not skip_chain:
-            try:
-                txh, blk = eth_record_submission(survey.id, survey.project_id, survey.ipfs_cid, survey.checksum_sha256)
-                Transaction.objects.create(
-                    survey=survey,
-                    public_anchor_tx_hash=txh,
-                    public_block_number=blk,
-                    private_tx_hash=txh,  # fallback for compatibility
-                )
-                # Also attach the file hash(es) to the per-survey list (best-effort)
-                try:
-                    from smartcontracts.eth import add_file_hash as eth_add_file_hash  # local import to avoid optionality issues
-                    if survey.checksum_sha256:
-                        txh2, blk2 = eth_add_file_hash(survey.id, survey.checksum_sha256)
-                        Transaction.objects.create(
-                            survey=survey,
-                            public_anchor_tx_hash=txh2,
-                            public_block_number=blk2,
-                            private_tx_hash=txh2,
-                        )
-                    for hx in extra_hashes:
-                        try:
-                            txh3, blk3 = eth_add_file_hash(survey.id, hx)
-                            Transaction.objects.create(
-                                survey=survey,
-                                public_anchor_tx_hash=txh3,
-                                public_block_number=blk3,
-                                private_tx_hash=txh3,
-                            )
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
-            except Exception:
-                # Do not block normal flow if chain is misconfigured
-                pass
+    def perform_update(self, serializer):
+        upload = self.request.FILES.get("file")
+        if upload is None:
+            serializer.save()
+            return
+        old_name = serializer.instance.file.name if serializer.instance.file else None
+        _save_with_upload(serializer, upload)
+        release_blob(old_name)
 
     @action(detail=True, methods=["post"], url_path="record-chain")
     def record_chain(self, request, pk=None):
@@ -181,48 +278,24 @@ class SurveyViewSet(viewsets.ModelViewSet):
         survey = self.get_object()
         if eth_record_submission is None:
             return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        # Guard: disallow if already anchored or recorded
+        # Guard: disallow if already anchored or recorded. Read the contract itself: the
+        # event index may lag the chain, and a duplicate write cannot be undone
         try:
-            from smartcontracts.eth import get_file_chunk_count as eth_get_count
-            cnt = eth_get_count(survey.id)
-            if cnt and int(cnt) > 0:
-                return Response({"detail": "Full file already anchored on-chain"}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            pass
-        try:
-            from smartcontracts.eth import get_onchain_record as eth_get_onchain_record
-            rec = eth_get_onchain_record(survey.id)
-            if rec and rec.get("submitter") and str(rec.get("submitter")).lower() != "0x0000000000000000000000000000000000000000":
-                return Response({"detail": "Submission already recorded on-chain"}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            pass
-        tx_hashes = []
-        try:
-            txh, blk = eth_record_submission(survey.id, survey.project_id, survey.ipfs_cid or "", survey.checksum_sha256 or "")
-            tx_hashes.append(txh)
-            Transaction.objects.create(
-                survey=survey,
-                public_anchor_tx_hash=txh,
-                public_block_number=blk,
-                private_tx_hash=txh,
-            )
-            # Best-effort: also attach primary file hash if present
-            try:
-                from smartcontracts.eth import add_file_hash as eth_add_file_hash
-                if survey.checksum_sha256:
-                    txh2, blk2 = eth_add_file_hash(survey.id, survey.checksum_sha256)
-                    tx_hashes.append(txh2)
-                    Transaction.objects.create(
-                        survey=survey,
-                        public_anchor_tx_hash=txh2,
-                        public_block_number=blk2,
-                        private_tx_hash=txh2,
-                    )
-            except Exception:
-                pass
+            from smartcontracts.eth import get_file_chunk_count, get_onchain_record
+            cnt = get_file_chunk_count(survey.id)
+            rec = get_onchain_record(survey.id)
         except Exception as e:
-            return Response({"detail": f"On-chain submit failed: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
-        return Response({"transactions": tx_hashes})
+            return Response({"detail": f"Failed to read on-chain state: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        if cnt and int(cnt) > 0:
+            return Response({"detail": "Full file already anchored on-chain"}, status=status.HTTP_400_BAD_REQUEST)
+        if rec and rec.get("submitter") and str(rec.get("submitter")).lower() != "0x0000000000000000000000000000000000000000":
+            return Response({"detail": "Submission already recorded on-chain"}, status=status.HTTP_400_BAD_REQUEST)
+        jobs = [chain_outbox.enqueue(survey, "record_submission")]
+        if survey.checksum_sha256:
+            if not survey.file_hashes.filter(kind="primary").exists():
+                SurveyFileHash.objects.create(survey=survey, checksum_sha256=survey.checksum_sha256, name=survey.file.name if survey.file else "", kind="primary")
+            jobs.extend(_enqueue_file_hashes(survey, [survey.checksum_sha256]))
+        return Response({"jobs": [j.id for j in jobs], "transactions": []}, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=["post"], url_path="anchor-file")
     def anchor_file(self, request, pk=None):
@@ -231,88 +304,95 @@ class SurveyViewSet(viewsets.ModelViewSet):
         if not (user.is_staff or user.is_superuser or role in ("admin", "manager")):
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
         survey = self.get_object()
-        # Guard: disallow if already anchored
-        try:
-            from smartcontracts.eth import get_file_chunk_count as eth_get_count
-            cnt = eth_get_count(survey.id)
+        # resume=true continues a partial upload after the chunks already on-chain;
+        # mode=encrypted stores AES-GCM sealed chunks through SSTORE2 instead of raw bytes;
+        # compress=zlib|lzma stores raw chunks as compressed frames
+        resume = str(request.query_params.get("resume") or request.data.get("resume") or "").lower() in ("1", "true", "yes")
+        encrypted = str(request.query_params.get("mode") or request.data.get("mode") or "raw").lower() == "encrypted"
+        codec = str(request.query_params.get("compress") or request.data.get("compress") or "").lower()
+        if codec in ("0", "false", "no", "none", "raw"):
+            codec = ""
+        if codec and (encrypted or codec not in compression.CODECS):
+            return Response(
+                {"detail": f"compress must be one of {', '.join(compression.CODECS)} (raw mode only)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Guard: disallow if already (or partially) anchored
+        if not resume:
+            cp = AnchorCheckpoint.objects.filter(survey=survey, encrypted=encrypted).first()
+            if cp is not None and cp.status == "complete":
+                return Response({"detail": "Full file already anchored on-chain"}, status=status.HTTP_400_BAD_REQUEST)
+            if cp is not None and cp.sent_chunks > 0:
+                return Response(
+                    {"detail": f"File partially anchored ({cp.confirmed_chunks} of {cp.total_chunks} chunks); retry with resume=true"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            # Live contract read, not the event index (which may lag): a second run would
+            # append a duplicate chunk set
+            try:
+                from smartcontracts.eth import get_encrypted_chunk_count, get_file_chunk_count
+                cnt = get_encrypted_chunk_count(survey.id) if encrypted else get_file_chunk_count(survey.id)
+            except Exception as e:
+                return Response({"detail": f"Failed to read on-chain chunk count: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
             if cnt and int(cnt) > 0:
                 return Response({"detail": "Full file already anchored on-chain"}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            pass
         if not getattr(survey, "file", None):
             return Response({"detail": "No file uploaded for this survey"}, status=status.HTTP_400_BAD_REQUEST)
-        # Read file bytes and chunk (raw)
         try:
-            f = survey.file
-            path = getattr(f, "path", None)
-            try:
-                CHUNK = int(os.getenv("RAW_CHUNK_KB", "24")) * 1024
-            except Exception:
-                CHUNK = 24 * 1024
-            chunks: list[bytes] = []
-            if path:
-                with open(path, "rb") as fh:
-                    while True:
-                        b = fh.read(CHUNK)
-                        if not b:
-                            break
-                        chunks.append(b)
-            else:
-                data = f.read()
-                for i in range(0, len(data), CHUNK):
-                    chunks.append(data[i:i+CHUNK])
+            fh = _open_survey_file(survey)
+            size = survey.file.size
         except Exception:
             return Response({"detail": "Failed to read file"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Submit raw chunks on-chain (private chain)
         try:
-            from smartcontracts.eth import add_file_chunks as eth_add_file_chunks
+            from smartcontracts.anchoring import AnchorError, anchor_file as chain_anchor_file
         except Exception:
+            fh.close()
             return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        tx_hashes = []
-        # Ensure the survey exists on-chain first
-        try:
-            if eth_record_submission is not None:
-                try:
-                    tx0, blk0 = eth_record_submission(survey.id, survey.project_id, survey.ipfs_cid or "", survey.checksum_sha256 or "")
-                    Transaction.objects.create(
-                        survey=survey,
-                        public_anchor_tx_hash=tx0,
-                        public_block_number=blk0,
-                        private_tx_hash=tx0,
-                    )
-                except Exception:
-                    pass
-        except Exception:
-            pass
-        # Batch writes
+        # The chunks need the survey's on-chain record; that write goes through the outbox
+        # like every other one, so a missing record is queued (once) and the caller retries
+        from smartcontracts.eth import get_onchain_record
+        rec = get_onchain_record(survey.id)
+        if rec is None:
+            fh.close()
+            return Response({"detail": "Failed to read the on-chain record"}, status=status.HTTP_502_BAD_GATEWAY)
+        if int(str(rec.get("submitter") or "0x0"), 16) == 0:
+            fh.close()
+            job = ChainJob.objects.filter(survey=survey, op="record_submission", status__in=("pending", "running")).first()
+            if job is None:
+                job = chain_outbox.enqueue(survey, "record_submission")
+            return Response(
+                {"detail": "Submission not recorded on-chain yet; retry once the queued record_submission job is done", "jobs": [job.id]},
+                status=status.HTTP_409_CONFLICT,
+            )
+        # Chunk size and chunks per transaction sized to fill blocks (CHUNK_FILL_RATIO); progress
+        # is checkpointed per transaction so a failed run can be resumed
         try:
-            MAX_PER_TX = int(os.getenv("MAX_PAYLOADS_PER_TX", "1") or 1)
-            if MAX_PER_TX <= 0:
-                MAX_PER_TX = 1
-        except Exception:
-            MAX_PER_TX = 1
-        try:
-            if chunks:
-                for i in range(0, len(chunks), MAX_PER_TX):
-                    batch = chunks[i:i+MAX_PER_TX]
-                    txh, blk = eth_add_file_chunks(survey.id, batch)
-                    tx_hashes.append(txh)
-                    Transaction.objects.create(
-                        survey=survey,
-                        public_anchor_tx_hash=txh,
-                        public_block_number=blk,
-                        private_tx_hash=txh,
-                    )
-        except Exception as e:
-            return Response({"detail": f"On-chain storage failed: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+            result = chain_anchor_file(survey, fh, size, resume=resume, encrypted=encrypted, codec=codec)
+        except AnchorError as e:
+            body = {"detail": str(e)}
+            if e.transactions:
+                body["transactions"] = e.transactions
+            return Response(body, status=e.status_code)
+        finally:
+            fh.close()
+        return Response(result)
 
-        return Response({
-            "anchored_chunks": len(chunks),
-            "transactions": tx_hashes,
-            "mode": "raw",
-            "chunk_size": CHUNK,
-        })
+    @action(detail=True, methods=["get"], url_path="download")
+    def download_file(self, request, pk=None):
+        """Stored upload (``?which=recovered`` for the file rebuilt from chain), with Range/If-Range support."""
+        # get_object() applies the role rules of get_queryset
+        survey = self.get_object()
+        recovered = str(request.query_params.get("which") or "original").lower() == "recovered"
+        f = survey.recovered_file if recovered else survey.file
+        if not f:
+            return Response({"detail": "No file stored for this survey"}, status=status.HTTP_404_NOT_FOUND)
+        ext = survey.file_ext or "bin"
+        if recovered:
+            return file_response(request, f, f"recovered_{survey.id}.{ext}")
+        # The upload is content-addressed by its SHA-256, which makes a strong ETag
+        return file_response(request, f, f"survey_{survey.id}.{ext}", etag=survey.checksum_sha256 or None, content_type=survey.file_mime_type)
 
     @action(detail=True, methods=["get"], url_path="chunks")
     def list_chunks(self, request, pk=None):
@@ -322,11 +402,11 @@ class SurveyViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
         survey = self.get_object()
         try:
-            from smartcontracts.eth import get_file_chunk_count as eth_get_count
+            from smartcontracts.indexer import chunk_count as onchain_chunk_count
         except Exception:
             return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         try:
-            total = eth_get_count(survey.id)
+            total = onchain_chunk_count(survey.id)
         except Exception as e:
             return Response({"detail": f"Failed to read chunk count: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
         return Response({"count": int(total)})
@@ -343,22 +423,85 @@ class SurveyViewSet(viewsets.ModelViewSet):
         except Exception:
             return Response({"detail": "Invalid chunk index"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            from smartcontracts.eth import get_file_chunk_count as eth_get_count, read_file_chunk as eth_get_chunk
+            from smartcontracts.chunkcache import read_chunk as cached_read_chunk
+            from smartcontracts.indexer import chunk_count as onchain_chunk_count
         except Exception:
             return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         try:
-            total = eth_get_count(survey.id)
+            total = onchain_chunk_count(survey.id)
             if idx < 0 or idx >= int(total):
                 return Response({"detail": "Chunk index out of range"}, status=status.HTTP_400_BAD_REQUEST)
-            payload = eth_get_chunk(survey.id, idx)
+            # Served from the on-disk chunk cache once read (verified against the indexed keccak)
+            payload = cached_read_chunk(survey.id, idx)
             if not payload:
                 return Response({"detail": "Empty chunk"}, status=status.HTTP_502_BAD_GATEWAY)
+            if survey.chunk_codec:
+                # Compressed frame: serve the original chunk bytes
+                payload = compression.decode_chunk(payload)
             resp = HttpResponse(payload, content_type="application/octet-stream")
             resp["Content-Disposition"] = f"attachment; filename=chunk_{survey.id}_{idx}.bin"
             return resp
         except Exception as e:
             return Response({"detail": f"Failed to read chunk: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
 
+    @action(detail=True, methods=["get"], url_path="enc-chunks")
+    def list_enc_chunks(self, request, pk=None):
+        user = request.user
+        role = getattr(getattr(user, "profile", None), "role", None)
+        if not (user.is_staff or user.is_superuser or role in ("admin", "manager")):
+            return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        survey = self.get_object()
+        try:
+            from smartcontracts.indexer import enc_chunk_count as onchain_enc_chunk_count
+        except Exception:
+            return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        try:
+            total = onchain_enc_chunk_count(survey.id)
+        except Exception as e:
+            return Response({"detail": f"Failed to read chunk count: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response({
+            "count": int(total),
+            "chunk_size": survey.enc_chunk_size,
+            "enc_scheme": survey.enc_scheme,
+            "key_version": survey.key_version,
+        })
+
+    @action(detail=True, methods=["get"], url_path=r"enc-chunks/(?P<index>\d+)/download")
+    def download_enc_chunk(self, request, pk=None, index: str = "0"):
+        """Decrypted chunk bytes; ``?raw=1`` returns the stored payload (nonce || ciphertext || tag)."""
+        user = request.user
+        role = getattr(getattr(user, "profile", None), "role", None)
+        if not (user.is_staff or user.is_superuser or role in ("admin", "manager")):
+            return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        survey = self.get_object()
+        try:
+            idx = int(index)
+        except Exception:
+            return Response({"detail": "Invalid chunk index"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            from smartcontracts.chunkcache import read_chunk as cached_read_chunk
+            from smartcontracts.indexer import enc_chunk_count as onchain_enc_chunk_count
+        except Exception:
+            return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        raw = str(request.query_params.get("raw") or "").lower() in ("1", "true", "yes")
+        try:
+            total = onchain_enc_chunk_count(survey.id)
+            if idx < 0 or idx >= int(total):
+                return Response({"detail": "Chunk index out of range"}, status=status.HTTP_400_BAD_REQUEST)
+            payload = cached_read_chunk(survey.id, idx, encrypted=True)
+            if not payload:
+                return Response({"detail": "Empty chunk"}, status=status.HTTP_502_BAD_GATEWAY)
+        except Exception as e:
+            return Response({"detail": f"Failed to read chunk: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        if not raw:
+            try:
+                payload = encryption.decrypt_chunk(encryption.survey_key(survey), survey.id, idx, payload)
+            except encryption.EncryptionError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        resp = HttpResponse(payload, content_type="application/octet-stream")
+        resp["Content-Disposition"] = f"attachment; filename=chunk_{survey.id}_{idx}{'.enc' if raw else ''}.bin"
+        return resp
+
     @action(detail=True, methods=["get"], url_path="onchain-record")
     def onchain_record(self, request, pk=None):
         user = request.user
@@ -367,11 +510,11 @@ class SurveyViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
         survey = self.get_object()
         try:
-            from smartcontracts.eth import get_onchain_record as eth_get_onchain_record
+            from smartcontracts.indexer import onchain_record as onchain_get_record
         except Exception:
             return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         try:
-            rec = eth_get_onchain_record(survey.id)
+            rec = onchain_get_record(survey.id)
         except Exception as e:
             return Response({"detail": f"Failed to read on-chain record: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
         if not rec or not rec.get("submitter") or str(rec.get("submitter")).lower() == "0x0000000000000000000000000000000000000000":
@@ -392,41 +535,65 @@ class SurveyViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="recover-file")
     def recover_file(self, request, pk=None):
+        """Reassemble the raw on-chain file; ``?stream=1`` also streams it to the client."""
         user = request.user
         role = getattr(getattr(user, "profile", None), "role", None)
         if not (user.is_staff or user.is_superuser or role in ("admin", "manager")):
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
         survey = self.get_object()
-        # Read raw chunks from chain and reassemble
         try:
-            from smartcontracts.eth import get_file_chunk_count as eth_get_count, read_file_chunk as eth_get_chunk
+            from smartcontracts.chunkcache import iter_chunks as cached_chunks
+            from smartcontracts.indexer import chunk_count as onchain_chunk_count
         except Exception:
             return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         try:
-            total = eth_get_count(survey.id)
+            total = onchain_chunk_count(survey.id)
         except Exception as e:
             return Response({"detail": f"Failed to read chunk count: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
         if total <= 0:
             return Response({"detail": "No on-chain chunks found for this survey"}, status=status.HTTP_400_BAD_REQUEST)
-        # Reassemble
+        stream = str(request.query_params.get("stream") or "").lower() in ("1", "true", "yes")
+
+        cache = {}
+
+        def _parts():
+            # Cached chunks come from disk; the rest are read ahead concurrently over the pooled async client
+            for i, payload in enumerate(cached_chunks(survey.id, total, counts=cache)):
+                if not payload:
+                    raise RuntimeError(f"Invalid payload at chunk {i}")
+                # Compressed frames are decoded back to the original chunk bytes
+                yield compression.decode_chunk(payload) if survey.chunk_codec else payload
+
+        return _recovery_response(survey, _parts(), stream, {"cache": cache})
+
+    @action(detail=True, methods=["post"], url_path="recover-enc-file")
+    def recover_enc_file(self, request, pk=None):
+        """Reassemble and decrypt the encrypted on-chain file; ``?stream=1`` also streams it."""
+        user = request.user
+        role = getattr(getattr(user, "profile", None), "role", None)
+        if not (user.is_staff or user.is_superuser or role in ("admin", "manager")):
+            return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        survey = self.get_object()
         try:
-            from django.core.files.base import ContentFile
+            from smartcontracts.chunkcache import iter_chunks as cached_chunks
+            from smartcontracts.indexer import enc_chunk_count as onchain_enc_chunk_count
         except Exception:
-            return Response({"detail": "Django file system unavailable"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({"detail": "Blockchain integration not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         try:
-            parts: list[bytes] = []
-            for i in range(total):
-                payload = eth_get_chunk(survey.id, i)
-                if not payload:
-                    return Response({"detail": f"Invalid payload at chunk {i}"}, status=status.HTTP_502_BAD_GATEWAY)
-                parts.append(payload)
-            data = b"".join(parts)
-            ext = survey.file_ext or "bin"
-            name = f"recovered_{survey.id}.{ext}"
-            survey.recovered_file.save(name, ContentFile(data), save=True)
-            return Response({"recovered_bytes": len(data), "stored": True, "download_url": survey.recovered_file.url if getattr(survey.recovered_file, "url", None) else None})
+            total = onchain_enc_chunk_count(survey.id)
         except Exception as e:
-            return Response({"detail": f"Recovery failed: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({"detail": f"Failed to read chunk count: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        if total <= 0:
+            return Response({"detail": "No encrypted on-chain chunks found for this survey"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            key = encryption.survey_key(survey)
+        except encryption.EncryptionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        stream = str(request.query_params.get("stream") or "").lower() in ("1", "true", "yes")
+        # Ciphertext comes from the chunk cache or is read ahead in slices, then decrypted in order on the process pool
+        cache = {}
+        payloads = enumerate(cached_chunks(survey.id, total, encrypted=True, counts=cache))
+        return _recovery_response(survey, encryption.decrypt_chunks(key, survey.id, payloads), stream, {"cache": cache})
 
     @action(detail=True, methods=["post"], url_path="approve")
     def approve(self, request, pk=None):
@@ -450,16 +617,7 @@ class SurveyViewSet(viewsets.ModelViewSet):
         except Exception:
             skip_chain = False
         if eth_mark_approved is not None and not skip_chain:
-            try:
-                txh, blk = eth_mark_approved(survey.id)
-                Transaction.objects.create(
-                    survey=survey,
-                    public_anchor_tx_hash=txh,
-                    public_block_number=blk,
-                    private_tx_hash=txh,
-                )
-            except Exception:
-                pass
+            chain_outbox.enqueue(survey, "mark_approved")
         return Response(SurveySerializer(survey).data)
 
     @action(detail=True, methods=["post"], url_path="reject")
@@ -484,15 +642,146 @@ class SurveyViewSet(viewsets.ModelViewSet):
         except Exception:
             skip_chain = False
         if eth_mark_rejected is not None and not skip_chain:
-            try:
-                txh, blk = eth_mark_rejected(survey.id)
-                Transaction.objects.create(
-                    survey=survey,
-                    public_anchor_tx_hash=txh,
-                    public_block_number=blk,
-                    private_tx_hash=txh,
-                )
-            except Exception:
-                pass
+            chain_outbox.enqueue(survey, "mark_rejected")
         return Response(SurveySerializer(survey).data)
 
+
+
+class UploadSessionViewSet(viewsets.ViewSet):
+    """Resumable uploads in the style of tus.
+
+    POST /uploads/ creates a session from JSON metadata (filename, size, project, title,
+    description, file_category). PATCH /uploads/{id}/ appends the raw body at the
+    `Upload-Offset` header; HEAD or GET reports the current offset so a client can
+    resume after a dropped connection. POST /uploads/{id}/finalize/ turns the complete
+    file into a Survey without reading it again.
+    """
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = (JSONParser, FormParser)
+
+    def _get_session(self, request, pk, lock: bool = False):
+        qs = UploadSession.objects.filter(user=request.user, status="open")
+        if lock:
+            qs = qs.select_for_update(nowait=True)
+        return qs.filter(pk=pk).first()
+
+    @staticmethod
+    def _offset_headers(resp, session):
+        resp["Upload-Offset"] = str(session.offset)
+        resp["Upload-Length"] = str(session.total_size)
+        resp["Cache-Control"] = "no-store"
+        return resp
+
+    def create(self, request):
+        data = request.data
+        filename = Path(str(data.get("filename") or "")).name
+        try:
+            size = int(data.get("size"))
+        except Exception:
+            size = -1
+        if not filename or size < 0:
+            return Response({"detail": "filename and size are required"}, status=status.HTTP_400_BAD_REQUEST)
+        metadata = {k: data.get(k) for k in ("project", "title", "description", "file_category") if data.get(k) not in (None, "")}
+        ser = SurveySerializer(data=metadata)
+        ser.is_valid(raise_exception=True)
+        if not metadata.get("file_category"):
+            return Response({"file_category": "This field is required when a file is uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+        session = UploadSession(user=request.user, filename=filename, total_size=size, metadata=metadata)
+        session.temp_path = resumable.part_path(session.pk)
+        open(session.temp_path, "wb").close()
+        session.save()
+        resp = Response({"id": str(session.pk), "offset": 0, "size": size}, status=status.HTTP_201_CREATED)
+        resp["Location"] = request.build_absolute_uri(f"{session.pk}/")
+        return self._offset_headers(resp, session)
+
+    def retrieve(self, request, pk=None):
+        session = self._get_session(request, pk)
+        if session is None:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        resp = Response({"id": str(session.pk), "offset": session.offset, "size": session.total_size, "filename": session.filename})
+        return self._offset_headers(resp, session)
+
+    def partial_update(self, request, pk=None):
+        try:
+            client_offset = int(request.headers.get("Upload-Offset", ""))
+        except Exception:
+            return Response({"detail": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            length = int(request.headers.get("Content-Length", "") or 0)
+        except Exception:
+            length = 0
+        # Lock only to check and reserve the offset; the body streams in outside any DB
+        # transaction and the new offset is committed under a second short lock
+        writer = uuid.uuid4().hex
+        try:
+            with db_transaction.atomic():
+                session = self._get_session(request, pk, lock=True)
+                if session is None:
+                    return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+                now = timezone.now()
+                if session.writer and session.writer_until and session.writer_until > now:
+                    return Response({"detail": "Another part is being written to this upload"}, status=status.HTTP_409_CONFLICT)
+                if client_offset != session.offset:
+                    return self._offset_headers(Response({"detail": "Offset mismatch", "offset": session.offset}, status=status.HTTP_409_CONFLICT), session)
+                if session.offset + length > session.total_size:
+                    return Response({"detail": "Part exceeds declared upload size"}, status=status.HTTP_400_BAD_REQUEST)
+                stream = request.stream
+                if stream is None or not length:
+                    return self._offset_headers(Response(status=status.HTTP_204_NO_CONTENT), session)
+                session.writer = writer
+                session.writer_until = now + timedelta(seconds=resumable.PART_LEASE_SECONDS)
+                session.save(update_fields=["writer", "writer_until", "updated_at"])
+        except DatabaseError:
+            return Response({"detail": "Another part is being written to this upload"}, status=status.HTTP_409_CONFLICT)
+        new_offset = None
+        try:
+            new_offset = resumable.append_part(session, stream, length)
+        finally:
+            with db_transaction.atomic():
+                session = UploadSession.objects.select_for_update().filter(pk=session.pk, writer=writer).first()
+                if session is not None:
+                    if new_offset is not None and session.status == "open":
+                        session.offset = new_offset
+                    session.writer = ""
+                    session.writer_until = None
+                    session.save(update_fields=["offset", "writer", "writer_until", "updated_at"])
+        if session is None or session.status != "open":
+            # The reservation expired and another request took over, or the upload was aborted
+            return Response({"detail": "Upload changed while this part was written; check the offset"}, status=status.HTTP_409_CONFLICT)
+        return self._offset_headers(Response(status=status.HTTP_204_NO_CONTENT), session)
+
+    def destroy(self, request, pk=None):
+        session = self._get_session(request, pk)
+        if session is None:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        resumable.discard(session)
+        session.status = "aborted"
+        session.save(update_fields=["status", "updated_at"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"], url_path="finalize")
+    def finalize(self, request, pk=None):
+        try:
+            with db_transaction.atomic():
+                session = self._get_session(request, pk, lock=True)
+                if session is None:
+                    return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+                if session.offset != session.total_size:
+                    return self._offset_headers(Response({"detail": "Upload incomplete", "offset": session.offset}, status=status.HTTP_400_BAD_REQUEST), session)
+                ser = SurveySerializer(data=session.metadata, context={"request": request})
+                ser.is_valid(raise_exception=True)
+                upload = resumable.assembled_upload(session)
+                try:
+                    survey = _save_with_upload(ser, upload, submitted_by=request.user)
+                finally:
+                    upload.close()
+                session.status = "finalized"
+                session.survey = survey
+                session.save(update_fields=["status", "survey", "updated_at"])
+        except DatabaseError:
+            return Response({"detail": "Upload is busy"}, status=status.HTTP_409_CONFLICT)
+        # Storage moved the part file into place unless identical content was already stored
+        resumable.discard(session)
+        _queue_submission_writes(request, survey, [])
+        return Response(SurveySerializer(survey, context={"request": request}).data, status=status.HTTP_201_CREATED)
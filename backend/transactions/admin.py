@@ -4,5 +4,6 @@ from .models import Transaction
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ("id", "survey", "private_tx_hash", "public_anchor_tx_hash", "created_at")
+    list_display = ("id", "survey", "private_tx_hash", "public_anchor_tx_hash", "confirm_state", "confirmations", "created_at")
+    list_filter = ("confirm_state",)
     search_fields = ("private_tx_hash", "public_anchor_tx_hash", "anchor_batch_id")
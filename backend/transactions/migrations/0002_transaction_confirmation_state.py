@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='confirm_checks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='confirm_next_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='confirm_state',
+            field=models.CharField(choices=[('pending', 'pending'), ('mined', 'mined'), ('confirmed', 'confirmed'), ('reverted', 'reverted'), ('dropped', 'dropped')], db_index=True, default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='confirmations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='receipt_status',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
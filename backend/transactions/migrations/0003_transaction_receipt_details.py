@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_transaction_confirmation_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='block_timestamp',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='effective_gas_price',
+            field=models.DecimalField(blank=True, decimal_places=0, max_digits=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='fee_wei',
+            field=models.DecimalField(blank=True, decimal_places=0, max_digits=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='finalized',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='gas_used',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,15 +1,44 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Transaction(models.Model):
+    CONFIRM_STATE_CHOICES = [
+        ("pending", "pending"),
+        ("mined", "mined"),
+        ("confirmed", "confirmed"),
+        ("reverted", "reverted"),
+        ("dropped", "dropped"),
+    ]
+
     survey = models.ForeignKey("surveys.Survey", on_delete=models.CASCADE, related_name="transactions")
     private_tx_hash = models.CharField(max_length=100)
     public_anchor_tx_hash = models.CharField(max_length=100, blank=True, null=True)
     anchor_batch_id = models.CharField(max_length=100, blank=True, null=True)
     private_block_number = models.BigIntegerField(blank=True, null=True)
     public_block_number = models.BigIntegerField(blank=True, null=True)
+    # Confirmation state, maintained by the `tx_confirmer` command
+    receipt_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    confirmations = models.PositiveIntegerField(default=0)
+    confirm_state = models.CharField(max_length=16, choices=CONFIRM_STATE_CHOICES, default="pending", db_index=True)
+    confirm_checks = models.PositiveIntegerField(default=0)
+    confirm_next_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Receipt details, stored once the receipt is final (confirmed or reverted)
+    gas_used = models.BigIntegerField(blank=True, null=True)
+    effective_gas_price = models.DecimalField(max_digits=40, decimal_places=0, blank=True, null=True)
+    fee_wei = models.DecimalField(max_digits=40, decimal_places=0, blank=True, null=True)
+    block_timestamp = models.BigIntegerField(blank=True, null=True)
+    finalized = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.private_tx_hash
+
+    def store_details(self, gas_used, effective_gas_price, block_timestamp) -> None:
+        """Fill the receipt columns and mark the row final (caller saves)."""
+        self.gas_used = gas_used
+        self.effective_gas_price = effective_gas_price
+        self.fee_wei = gas_used * effective_gas_price if gas_used is not None and effective_gas_price is not None else None
+        self.block_timestamp = block_timestamp
+        self.finalized = True
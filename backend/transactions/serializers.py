@@ -31,6 +31,8 @@ class TransactionSerializer(serializers.ModelSerializer):
             "public_block_number",
             "etherscan_url",
             "status",
+            "confirmations",
+            "confirm_state",
             "gas_used",
             "effective_gas_price",
             "fee_wei",
@@ -40,17 +42,33 @@ class TransactionSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        read_only_fields = ["confirmations", "confirm_state"]
 
     def _details(self, obj: Transaction) -> Optional[dict[str, Any]]:
+        if obj.finalized:
+            # Final receipts are stored on the row by `tx_confirmer`
+            return {
+                "gasUsed": obj.gas_used,
+                "effectiveGasPrice": None if obj.effective_gas_price is None else int(obj.effective_gas_price),
+                "feeWei": None if obj.fee_wei is None else int(obj.fee_wei),
+                "blockTimestamp": obj.block_timestamp,
+            }
         if get_tx_details is None:
             return None
         txh = obj.public_anchor_tx_hash or obj.private_tx_hash
         if not txh:
             return None
-        try:
-            return get_tx_details(txh)  # type: ignore[misc]
-        except Exception:
-            return None
+        prefetched = self.context.get("tx_details")
+        if prefetched is not None:
+            return prefetched.get(txh)
+        # One lookup per object even though several fields read it
+        memo = self.context.setdefault("_tx_details_memo", {})
+        if txh not in memo:
+            try:
+                memo[txh] = get_tx_details(txh)  # type: ignore[misc]
+            except Exception:
+                memo[txh] = None
+        return memo[txh]
 
     def get_etherscan_url(self, obj: Transaction):  # type: ignore[name-defined]
         tx = obj.public_anchor_tx_hash or obj.private_tx_hash
@@ -70,8 +88,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         return f"{base}/tx/{tx}"
 
     def get_status(self, obj: Transaction):
-        d = self._details(obj)
-        return None if not d else d.get("status")
+        return obj.receipt_status
 
     def get_gas_used(self, obj: Transaction):
         d = self._details(obj)
@@ -3,9 +3,9 @@ from rest_framework.response import Response
 from .models import Transaction
 from .serializers import TransactionSerializer
 try:
-    from smartcontracts.eth import get_tx_receipt
+    from smartcontracts.eth import get_tx_details_many
 except Exception:  # pragma: no cover
-    get_tx_receipt = None
+    get_tx_details_many = None
 
 
 class TransactionViewSet(viewsets.ModelViewSet):
@@ -23,23 +23,19 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return qs.order_by("-created_at")
 
     def list(self, request, *args, **kwargs):
-        # Opportunistically fill missing block numbers for filtered results
+        # Receipt state and, for final rows, gas/fee/timestamp come from the DB (kept fresh
+        # by `tx_confirmer`); only rows that are not final yet are read from the node here
         qs = self.get_queryset()
-        survey_id = request.query_params.get("survey")
-        if survey_id and get_tx_receipt is not None:
-            for t in qs:
-                if not t.public_block_number and (t.public_anchor_tx_hash or t.private_tx_hash):
-                    txh = t.public_anchor_tx_hash or t.private_tx_hash
-                    try:
-                        rec = get_tx_receipt(txh)
-                        if rec and rec.get("blockNumber"):
-                            t.public_block_number = rec["blockNumber"]
-                            t.save(update_fields=["public_block_number", "updated_at"])
-                    except Exception:
-                        pass
         page = self.paginate_queryset(qs)
+        rows = list(page if page is not None else qs)
+        details: dict = {}
+        open_rows = [t for t in rows if not t.finalized]
+        if get_tx_details_many is not None and open_rows:
+            try:
+                details = get_tx_details_many(t.public_anchor_tx_hash or t.private_tx_hash for t in open_rows)
+            except Exception:
+                details = {}
+        ser = self.get_serializer(rows, many=True, context={**self.get_serializer_context(), "tx_details": details})
         if page is not None:
-            ser = self.get_serializer(page, many=True)
             return self.get_paginated_response(ser.data)
-        ser = self.get_serializer(qs, many=True)
         return Response(ser.data)